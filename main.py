@@ -1,18 +1,25 @@
+import time
+_START = time.perf_counter() # Startup times are measured from here
+
 import sys
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
-from tkinter import messagebox
 import customtkinter as ctk
-from plan_generator import (generate_plans,
-                            DEFAULT_MIN_ROOM_DIM, DEFAULT_MIN_BATH_DIM,
+from plan_generator import (DEFAULT_MIN_ROOM_DIM, DEFAULT_MIN_BATH_DIM,
                             DEFAULT_MIN_STOR_BALC_DIM, DEFAULT_ASPECT_RATIO_LIMIT,
                             DEFAULT_WALL_THICKNESS_SCALE, DEFAULT_LABEL_FONT_SIZE_SCALE, # Import new defaults
-                            PERSIAN_NAMES)
-from plan_drawer import draw_plan
+                            PERSIAN_NAMES, NUM_PLANS, compile_settings, GenerationCancelled)
+from plan_drawer import PlanRenderer
+from plan_cache import PlanCache
+from plan_store import PlanStore
+import plan_trace
 import traceback
 
-# Set default theme and appearance mode early
-ctk.set_appearance_mode("System")
-ctk.set_default_color_theme("blue")
+GENERATION_POLL_MS = 30 # How often the Tk thread checks for worker results
+FEASIBILITY_STEP = 0.2 # m, grid step of the feasibility map window
+FEASIBILITY_CELL = 3 # Pixels per grid point in the feasibility map window
 
 class WelcomeScreen(ctk.CTkToplevel):
     """ Initial welcome screen """
@@ -64,9 +71,7 @@ class WelcomeScreen(ctk.CTkToplevel):
 
     def start_main_app(self):
         self.destroy()
-        self.parent.deiconify()
-        self.parent.focus_force()
-        self.parent.entry_width.focus_set()
+        self.parent.show_main_window()
 
     def close_app(self):
         self.destroy()
@@ -240,8 +245,10 @@ class SettingsDialog(ctk.CTkToplevel):
 
 
         except ValueError as e:
+            from tkinter import messagebox # Only needed to report bad input
             messagebox.showerror("خطای ورودی", f"مقدار نامعتبر است: {e}", parent=self)
         except Exception as e:
+             from tkinter import messagebox
              messagebox.showerror("خطا", f"خطای ناشناخته: {e}", parent=self)
 
     def close_dialog(self):
@@ -252,7 +259,14 @@ class SettingsDialog(ctk.CTkToplevel):
 
 class HousePlanApp(ctk.CTk):
     def __init__(self):
+        # Settings saved by the previous session; plans are only read from the store when requested
+        plan_store = PlanStore()
+        saved_settings = plan_store.load_settings()
+        # Theme and appearance mode are set here, before the first widget, rather than at import time
+        ctk.set_appearance_mode(saved_settings.get('appearance_mode', "System"))
+        ctk.set_default_color_theme(saved_settings.get('color_theme', "blue"))
         super().__init__()
+        self.plan_store = plan_store
 
         self.title("مولد نقشه خانه")
         screen_width = self.winfo_screenwidth()
@@ -267,6 +281,7 @@ class HousePlanApp(ctk.CTk):
 
         # Use a consistent Persian font if available
         self.persian_font = "Tahoma" if sys.platform == "win32" else "Arial" # Fallback
+        self.startup_times = {'imports': time.perf_counter() - _START} # Stage -> seconds since startup
 
         # --- App Settings ---
         self.app_settings = {
@@ -279,7 +294,44 @@ class HousePlanApp(ctk.CTk):
             'appearance_mode': ctk.get_appearance_mode(), # Store initial mode
             'color_theme': "blue" # Default theme
         }
+        self.app_settings.update((k, v) for k, v in saved_settings.items() if k in self.app_settings)
+        self.compiled_settings = compile_settings(self.app_settings) # Rebuilt whenever settings are saved
         self.settings_window = None # To track if settings window is open
+        self.feasibility_window = None
+        self._feasibility_map = None # Built for the current settings when the map window is first opened
+        # Reuses plans for repeated (width, length, settings), also across restarts through the store
+        self.plan_cache = PlanCache(store=self.plan_store)
+
+        self.num_plans = NUM_PLANS
+        self.main_window_built = False
+        self.current_plans = [[] for _ in range(self.num_plans)] # Adjust list size
+        self.current_dimensions = (0, 0)
+        self._redraw_jobs = [None] * self.num_plans # Adjust list size
+        self._dirty = [False] * self.num_plans # Hidden tabs whose plan changed since they were last drawn
+        self._status_clear_job = None
+
+        # --- Background generation ---
+        # A single worker keeps PlanCache single-threaded; superseded requests are cancelled, not queued
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-generator")
+        self._generation_results = queue.Queue()
+        self._generation_id = 0
+        self._active_generation = None
+        self._drawn_generation = None # Generation whose plans are currently shown
+        self._received_count = 0
+        self._cancel_event = None
+        self._poll_job = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # The welcome screen comes up first; the main widgets are built while it is shown
+        self.show_welcome_screen()
+        self._record_startup('welcome')
+        self.after_idle(self.build_main_window)
+
+    def build_main_window(self):
+        """Builds the input bar, status line and plan tabs (once). Plan canvases are created on first view."""
+        if self.main_window_built:
+            return
+        self.main_window_built = True
 
         # --- Top Frame (Inputs & Buttons) ---
         self.top_frame = ctk.CTkFrame(self)
@@ -288,27 +340,28 @@ class HousePlanApp(ctk.CTk):
         # Configure columns for RTL
         self.top_frame.columnconfigure(0, weight=0) # Button Help
         self.top_frame.columnconfigure(1, weight=0) # Button Settings
-        self.top_frame.columnconfigure(2, weight=1) # Spacer
-        self.top_frame.columnconfigure(3, weight=0) # Entry Length
-        self.top_frame.columnconfigure(4, weight=0) # Label Length
-        self.top_frame.columnconfigure(5, weight=0) # Entry Width
-        self.top_frame.columnconfigure(6, weight=0) # Label Width
-        self.top_frame.columnconfigure(7, weight=0) # Button Generate
+        self.top_frame.columnconfigure(2, weight=0) # Button Feasibility map
+        self.top_frame.columnconfigure(3, weight=1) # Spacer
+        self.top_frame.columnconfigure(4, weight=0) # Entry Length
+        self.top_frame.columnconfigure(5, weight=0) # Label Length
+        self.top_frame.columnconfigure(6, weight=0) # Entry Width
+        self.top_frame.columnconfigure(7, weight=0) # Label Width
+        self.top_frame.columnconfigure(8, weight=0) # Button Generate
 
         # --- Widgets (Added RTL order) ---
         self.generate_button = ctk.CTkButton(self.top_frame, text="تولید نقشه ها", width=120, command=self.generate_and_display_plans, font=(self.persian_font, 12))
-        self.generate_button.grid(row=0, column=7, rowspan=2, padx=(10, 0), pady=10, sticky="ns")
+        self.generate_button.grid(row=0, column=8, rowspan=2, padx=(10, 0), pady=10, sticky="ns")
 
         self.label_width = ctk.CTkLabel(self.top_frame, text=":عرض (متر)", font=(self.persian_font, 12))
-        self.label_width.grid(row=0, column=6, padx=(5, 10), pady=(10,5), sticky="e")
+        self.label_width.grid(row=0, column=7, padx=(5, 10), pady=(10,5), sticky="e")
         self.entry_width = ctk.CTkEntry(self.top_frame, placeholder_text="مثال: 10.5", width=80, justify='right')
-        self.entry_width.grid(row=0, column=5, padx=(0, 5), pady=(10,5), sticky="e")
+        self.entry_width.grid(row=0, column=6, padx=(0, 5), pady=(10,5), sticky="e")
         self.entry_width.bind("<Return>", lambda event: self.entry_length.focus_set())
 
         self.label_length = ctk.CTkLabel(self.top_frame, text=":طول (متر)", font=(self.persian_font, 12))
-        self.label_length.grid(row=1, column=6, padx=(5, 10), pady=(5,10), sticky="e")
+        self.label_length.grid(row=1, column=7, padx=(5, 10), pady=(5,10), sticky="e")
         self.entry_length = ctk.CTkEntry(self.top_frame, placeholder_text="مثال: 15.0", width=80, justify='right')
-        self.entry_length.grid(row=1, column=5, padx=(0, 5), pady=(5,10), sticky="e")
+        self.entry_length.grid(row=1, column=6, padx=(0, 5), pady=(5,10), sticky="e")
         self.entry_length.bind("<Return>", lambda event: self.generate_and_display_plans())
 
         # Settings and Help Buttons
@@ -318,6 +371,9 @@ class HousePlanApp(ctk.CTk):
         self.help_button = ctk.CTkButton(self.top_frame, text="راهنما", width=80, fg_color="grey", command=self.show_help, font=(self.persian_font, 12))
         self.help_button.grid(row=0, column=0, rowspan=2, padx=(0, 5), pady=10, sticky="ns")
 
+        self.feasibility_button = ctk.CTkButton(self.top_frame, text="نقشه امکان‌پذیری", width=110, fg_color="grey", command=self.show_feasibility_map, font=(self.persian_font, 12))
+        self.feasibility_button.grid(row=0, column=2, rowspan=2, padx=(5, 5), pady=10, sticky="ns")
+
 
         # --- Status Label ---
         self.status_label = ctk.CTkLabel(self, text="لطفا ابعاد خانه را وارد کرده و دکمه تولید را بزنید.", text_color="gray", anchor='e', font=(self.persian_font, 11))
@@ -325,30 +381,51 @@ class HousePlanApp(ctk.CTk):
 
 
         # --- Tab View for Plans ---
-        self.tab_view = ctk.CTkTabview(self, anchor="ne")
+        self.tab_view = ctk.CTkTabview(self, anchor="ne", command=self.on_tab_changed)
         self.tab_view.pack(pady=10, padx=20, fill="both", expand=True)
 
         self.plan_tabs = []
-        self.plan_canvases = []
-        # Create only 3 tabs
-        self.num_plans = 3
+        self.plan_tab_names = []
+        self.plan_canvases = [None] * self.num_plans
+        self.plan_renderers = [None] * self.num_plans # Retained-mode drawers: resizes move items instead of redrawing
+        # One tab per generated plan; only the visible tab is drawn
         for i in range(self.num_plans):
             tab_name = f"نقشه {i+1}"
-            tab = self.tab_view.add(tab_name)
-            self.plan_tabs.append(tab)
-            canvas = tk.Canvas(tab, bg="white", highlightthickness=0)
+            self.plan_tabs.append(self.tab_view.add(tab_name))
+            self.plan_tab_names.append(tab_name)
+        self._plan_canvas(0) # The first tab is visible from the start
+        self._record_startup('main_window')
+        self.restore_last_lot()
+
+    def restore_last_lot(self):
+        """Shows the plans of the lot from the previous session (normally straight from the plan store)."""
+        last_lot = self.plan_store.load_settings("last_lot")
+        if last_lot.get('width') and last_lot.get('length'):
+            self.entry_width.insert(0, f"{last_lot['width']:g}")
+            self.entry_length.insert(0, f"{last_lot['length']:g}")
+            self.generate_and_display_plans()
+
+    def _plan_canvas(self, index):
+        """Canvas of plan `index`, created (with its renderer) the first time the tab is shown."""
+        canvas = self.plan_canvases[index]
+        if canvas is None:
+            canvas = tk.Canvas(self.plan_tabs[index], bg="white", highlightthickness=0)
             canvas.pack(fill="both", expand=True, padx=1, pady=1)
-            self.plan_canvases.append(canvas)
-            canvas.bind("<Configure>", lambda event, c=canvas, idx=i: self.schedule_redraw(c, idx))
-
-        self.current_plans = [[] for _ in range(self.num_plans)] # Adjust list size
-        self.current_dimensions = (0, 0)
-        self._redraw_jobs = [None] * self.num_plans # Adjust list size
-        self._status_clear_job = None
-
-        # Show Welcome Screen after main window is set up but hidden
-        self.show_welcome_screen()
-
+            self.plan_canvases[index] = canvas
+            self.plan_renderers[index] = PlanRenderer(canvas)
+            canvas.bind("<Configure>", lambda event, c=canvas, idx=index: self.schedule_redraw(c, idx))
+        return canvas
+
+    def show_main_window(self):
+        """Shows the main window once the welcome screen is dismissed."""
+        self.build_main_window()
+        self.deiconify()
+        self.focus_force()
+        self.entry_width.focus_set()
+
+    def _record_startup(self, stage):
+        self.startup_times[stage] = time.perf_counter() - _START
+        plan_trace.note(f"Startup: {stage} ready", seconds=self.startup_times[stage])
 
     def show_welcome_screen(self):
         welcome = WelcomeScreen(self)
@@ -366,7 +443,11 @@ class HousePlanApp(ctk.CTk):
     def update_app_settings(self, new_settings):
         """Callback from SettingsDialog to update main app settings and apply appearance."""
         self.app_settings = new_settings
-        print("App settings updated:", self.app_settings)
+        self.compiled_settings = compile_settings(new_settings)
+        self.plan_store.save_settings(new_settings)
+        plan_trace.note("App settings updated", **self.app_settings)
+        if self.feasibility_window is not None and self.feasibility_window.winfo_exists():
+            self.feasibility_window.destroy() # Its map was built for the old settings
 
         # Apply Appearance Settings immediately if they changed
         try:
@@ -394,6 +475,81 @@ class HousePlanApp(ctk.CTk):
             self.settings_window.focus() # Bring existing window to front
 
 
+    def show_feasibility_map(self):
+        """
+        Opens a heatmap of how many layouts work for each lot size under the current
+        settings (plan_feasibility, needs NumPy). Clicking a cell generates that lot.
+        """
+        if self.feasibility_window is not None and self.feasibility_window.winfo_exists():
+            self.feasibility_window.focus()
+            return
+        try:
+            from plan_feasibility import build_feasibility_map # Imported on demand: pulls in NumPy
+        except ImportError:
+            self.set_status("برای نقشه امکان‌پذیری کتابخانه NumPy لازم است (pip install numpy).", color="orange", clear_after=7)
+            return
+        if self._feasibility_map is None or self._feasibility_map.settings_digest != self.compiled_settings.digest:
+            self._feasibility_map = build_feasibility_map(self.compiled_settings, step=FEASIBILITY_STEP)
+        fmap = self._feasibility_map
+
+        win = self.feasibility_window = ctk.CTkToplevel(self)
+        win.transient(self)
+        win.title("نقشه امکان‌پذیری")
+        layout_choices = {"همه نقشه‌ها": None}
+        layout_choices.update((f"نقشه {i+1}", name) for i, name in enumerate(fmap.layouts))
+        controls = ctk.CTkFrame(win, fg_color="transparent")
+        controls.pack(pady=(10, 5), padx=10, fill="x")
+        layout_menu = ctk.CTkOptionMenu(controls, values=list(layout_choices), width=120, font=(self.persian_font, 12))
+        layout_menu.pack(side="right", padx=5)
+        dropped_button = ctk.CTkSegmentedButton(controls, values=["0", "1", "2"], font=(self.persian_font, 12))
+        dropped_button.set("1")
+        dropped_button.pack(side="right", padx=5)
+        ctk.CTkLabel(controls, text=":اتاق حذف‌شده مجاز", font=(self.persian_font, 12)).pack(side="right", padx=5)
+
+        grid_w, grid_l = fmap.shape
+        canvas = tk.Canvas(win, width=grid_w * FEASIBILITY_CELL, height=grid_l * FEASIBILITY_CELL, bg="white",
+                           highlightthickness=0, cursor="crosshair")
+        canvas.pack(padx=10, pady=5)
+        legend = ctk.CTkLabel(win, justify="right", font=(self.persian_font, 11), wraplength=grid_w * FEASIBILITY_CELL)
+        legend.pack(padx=10, pady=(0, 10), fill="x")
+
+        marked_lot = [self.current_dimensions] # Lot shown with a marker
+
+        def render(*_):
+            from plan_feasibility import HEATMAP_COLORS, heatmap_levels
+            layout = layout_choices[layout_menu.get()]
+            levels = heatmap_levels(fmap, layout, int(dropped_button.get()))
+            image = tk.PhotoImage(width=grid_w, height=grid_l)
+            image.put(" ".join("{" + " ".join(HEATMAP_COLORS[v] for v in row) + "}" for row in levels.tolist()))
+            canvas.image = image.zoom(FEASIBILITY_CELL) # The canvas does not keep a reference itself
+            canvas.delete("all")
+            canvas.create_image(0, 0, image=canvas.image, anchor="nw")
+            width, length = marked_lot[0]
+            if fmap.widths[0] <= width <= fmap.widths[-1] and fmap.lengths[0] <= length <= fmap.lengths[-1]:
+                x = ((width - fmap.widths[0]) / FEASIBILITY_STEP + 0.5) * FEASIBILITY_CELL
+                y = ((length - fmap.lengths[0]) / FEASIBILITY_STEP + 0.5) * FEASIBILITY_CELL
+                canvas.create_oval(x - 5, y - 5, x + 5, y + 5, outline="red", width=2)
+            legend.configure(text=f"عرض {fmap.widths[0]:g} تا {fmap.widths[-1]:g} متر از چپ به راست، "
+                                  f"طول {fmap.lengths[0]:g} تا {fmap.lengths[-1]:g} متر از بالا به پایین. "
+                                  + ("رنگ تیره‌تر = نقشه‌های قابل اجرای بیشتر." if layout is None else
+                                     "رنگ سبز = نقشه قابل اجراست.")
+                                  + " برای تولید نقشه، روی یک نقطه کلیک کنید.")
+
+        def pick(event):
+            i = min(max(event.x // FEASIBILITY_CELL, 0), grid_w - 1)
+            j = min(max(event.y // FEASIBILITY_CELL, 0), grid_l - 1)
+            for entry, value in ((self.entry_width, fmap.widths[i]), (self.entry_length, fmap.lengths[j])):
+                entry.delete(0, "end")
+                entry.insert(0, f"{value:g}")
+            marked_lot[0] = (fmap.widths[i], fmap.lengths[j])
+            render()
+            self.generate_and_display_plans()
+
+        layout_menu.configure(command=render)
+        dropped_button.configure(command=render)
+        canvas.bind("<Button-1>", pick)
+        render()
+
     def show_help(self):
         """Displays a help message box."""
         help_text = """
@@ -408,6 +564,7 @@ class HousePlanApp(ctk.CTk):
    - نقشه ۳: طرح L شکل برای نشیمن.
 
 ۴. تنظیمات: با کلیک روی دکمه "تنظیمات" می‌توانید حداقل ابعاد قابل قبول برای اتاق‌ها، حداکثر نسبت طول به عرض، مقیاس ضخامت دیوار، مقیاس فونت برچسب، حالت نمایش (روشن/تیره) و تم رنگی برنامه را تغییر دهید. تنظیمات ابعادی و ترسیم بر روی نقشه‌های بعدی که تولید می‌کنید تاثیر می‌گذارد.
+۵. نقشه امکان‌پذیری: نشان می‌دهد برای هر طول و عرض چند طرح قابل اجراست (با تعداد اتاق حذف‌شده‌ای که انتخاب می‌کنید)؛ با کلیک روی یک نقطه، نقشه‌های آن ابعاد تولید می‌شود.
 
 نکته: نقشه‌های تولید شده صرفاً پیشنهادی و شماتیک هستند. رنگ‌ها برای تفکیک بهتر فضاها استفاده شده‌اند.
 """
@@ -419,7 +576,7 @@ class HousePlanApp(ctk.CTk):
         parent_y = self.winfo_y()
         parent_w = self.winfo_width()
         parent_h = self.winfo_height()
-        help_win.geometry(f"500x520+{parent_x + parent_w // 2 - 250}+{parent_y + parent_h // 2 - 260}") # Increased height
+        help_win.geometry(f"500x580+{parent_x + parent_w // 2 - 250}+{parent_y + parent_h // 2 - 290}") # Increased height
 
         help_label = ctk.CTkLabel(help_win, text=help_text, justify="right", anchor="ne", font=(self.persian_font, 12), wraplength=460)
         help_label.pack(pady=20, padx=20, fill="both", expand=True)
@@ -428,10 +585,7 @@ class HousePlanApp(ctk.CTk):
         close_button.pack(pady=10)
 
     def generate_and_display_plans(self):
-        """Gets input, generates plans using current settings, and displays them."""
-        self.set_status("در حال تولید نقشه‌ها...", color="blue")
-        self.update_idletasks()
-
+        """Gets input and starts generating plans on the background worker; results are drawn when ready."""
         try:
             width_str = self.entry_width.get()
             length_str = self.entry_length.get()
@@ -443,48 +597,132 @@ class HousePlanApp(ctk.CTk):
             if width <= 0 or length <= 0:
                  self.set_status("خطا: طول و عرض باید مثبت باشند.", color="orange", clear_after=5)
                  return
-
-            min_dim_req = self.app_settings['min_room_dim'] * 1.5
-            if width < min_dim_req or length < min_dim_req:
-                 self.set_status(f"هشدار: ابعاد کوچک است (حداقل ~{min_dim_req:.1f} متر توصیه می شود).", color="#FFA500", clear_after=10)
-
-            print(f"\n=== Generating plans for {width}m x {length}m with settings: {self.app_settings} ===")
-            self.current_dimensions = (width, length)
-            # Generate only 3 plans
-            self.current_plans = generate_plans(width, length, self.app_settings)
-            print(f"=== Plan generation complete. Received {len(self.current_plans)} layouts. ===")
-
-            self.update_idletasks()
-            success_count = 0
-            # Loop through the 3 canvases/plans
-            for i in range(self.num_plans):
-                if i < len(self.current_plans) and i < len(self.plan_canvases): # Ensure indices are valid
-                    plan_data = self.current_plans[i]
-                    canvas = self.plan_canvases[i]
-                    if canvas.winfo_width() > 1 and canvas.winfo_height() > 1:
-                         # Pass current settings to draw_plan
-                         draw_plan(canvas, plan_data, width, length, self.app_settings)
-                         success_count += 1
-                    else:
-                         print(f"Skipping draw for plan {i+1}: Canvas not ready ({canvas.winfo_width()}x{canvas.winfo_height()}). Scheduling redraw.")
-                         self.schedule_redraw(canvas, i, delay=150)
-
-            if success_count == self.num_plans:
-                 self.set_status(f"آماده شد: {self.num_plans} نقشه برای {width}m x {length}m تولید شد.", color="green", clear_after=10)
-            else:
-                 self.set_status(f"هشدار: {success_count}/{self.num_plans} نقشه ترسیم شد. برخی نیاز به تغییر اندازه پنجره دارند.", color="orange", clear_after=10)
-
         except ValueError:
             self.set_status("خطای ورودی: لطفا اعداد معتبر برای طول و عرض وارد کنید.", color="red", clear_after=5)
             traceback.print_exc()
+            return
+
+        plan_trace.note(f"Generating plans for {width}m x {length}m", **self.app_settings)
+        self.plan_store.save_settings({'width': width, 'length': length}, name="last_lot")
+        self.start_generation(width, length)
+
+    def start_generation(self, width, length):
+        """Aborts any in-flight generation and submits a new one to the worker thread."""
+        if self._cancel_event is not None:
+            self._cancel_event.set() # Superseded: the worker stops at the next layout boundary
+        self._generation_id += 1
+        self._active_generation = self._generation_id
+        self._cancel_event = threading.Event()
+        self.set_status("در حال تولید نقشه‌ها...", color="blue")
+        self._executor.submit(self._generation_worker, self._generation_id, width, length,
+                              self.compiled_settings, self._cancel_event)
+        if self._poll_job is None:
+            self._poll_job = self.after(GENERATION_POLL_MS, self._poll_generation)
+
+    def _generation_worker(self, generation_id, width, length, settings, cancel_event):
+        """Runs on the worker thread. Never touches Tk; reports through the results queue only."""
+        if cancel_event.is_set():
+            self._generation_results.put(('cancelled', generation_id, None))
+            return
+        try:
+            for index, layout_name, plan, timings in self.plan_cache.iter_plans(
+                    width, length, settings, should_cancel=cancel_event.is_set):
+                # Each plan goes to the UI as soon as it is ready
+                self._generation_results.put(('plan', generation_id, (width, length, index, plan)))
+        except GenerationCancelled:
+            self._generation_results.put(('cancelled', generation_id, None))
         except Exception as e:
-            self.set_status(f"خطای غیرمنتظره در تولید نقشه: {e}", color="red", clear_after=10)
-            print(f"Error during generation/display: {e}")
             traceback.print_exc()
+            self._generation_results.put(('error', generation_id, e))
+        else:
+            self._generation_results.put(('done', generation_id, (width, length)))
+
+    def _poll_generation(self):
+        """Marshals worker results back onto the Tk thread (re-scheduled with after() while busy)."""
+        self._poll_job = None
+        while True:
+            try:
+                kind, generation_id, payload = self._generation_results.get_nowait()
+            except queue.Empty:
+                break
+            if generation_id != self._active_generation:
+                continue # Result of a superseded request
+            if kind == 'plan':
+                width, length, index, plan = payload
+                self.display_plan(width, length, index, plan)
+                self.set_status(f"در حال تولید نقشه‌ها... ({index + 1}/{self.num_plans})", color="blue")
+                continue
+            self._active_generation = None
+            if kind == 'done':
+                self.finish_display(*payload)
+            elif kind == 'error':
+                self.set_status(f"خطای غیرمنتظره در تولید نقشه: {payload}", color="red", clear_after=10)
+                print(f"Error during generation: {payload}")
+        if self._active_generation is not None:
+            self._poll_job = self.after(GENERATION_POLL_MS, self._poll_generation)
+
+    def display_plan(self, width, length, index, plan):
+        """Stores one freshly generated plan and draws it if its tab is visible (Tk thread only)."""
+        if self._drawn_generation != self._active_generation:
+            # First plan of a new generation: start from a clean slate
+            self.current_dimensions = (width, length)
+            self.current_plans = [[] for _ in range(self.num_plans)]
+            self._drawn_generation = self._active_generation
+            self._received_count = 0
+        if index >= self.num_plans:
+            return
+        self.current_plans[index] = plan
+        self._received_count += 1
+        self.request_draw(index)
+
+    def finish_display(self, width, length):
+        """Reports the outcome once every plan of a generation has been received."""
+        plan_trace.note("Plan generation complete", **self.plan_cache.info())
+        success_count = self._received_count
+        min_dim_req = self.app_settings['min_room_dim'] * 1.5
+        if width < min_dim_req or length < min_dim_req:
+             self.set_status(f"هشدار: ابعاد کوچک است (حداقل ~{min_dim_req:.1f} متر توصیه می شود).", color="#FFA500", clear_after=10)
+        elif success_count == self.num_plans:
+             self.set_status(f"آماده شد: {self.num_plans} نقشه برای {width}m x {length}m تولید شد.", color="green", clear_after=10)
+        else:
+             self.set_status(f"هشدار: {success_count}/{self.num_plans} نقشه تولید شد.", color="orange", clear_after=10)
+
+    def is_plan_visible(self, index):
+        """True if plan `index` is on the currently selected tab."""
+        return self.tab_view.get() == self.plan_tab_names[index]
+
+    def request_draw(self, index, delay=0):
+        """Draws plan `index` if its tab is visible; otherwise marks it dirty until the tab is selected."""
+        if not self.is_plan_visible(index):
+            self._dirty[index] = True
+            return
+        self.schedule_redraw(self._plan_canvas(index), index, delay=delay)
+
+    def on_tab_changed(self):
+        """Draws the newly selected plan if it changed while its tab was hidden."""
+        name = self.tab_view.get()
+        if name in self.plan_tab_names:
+            index = self.plan_tab_names.index(name)
+            canvas = self._plan_canvas(index)
+            if self._dirty[index]:
+                # Give the tab a moment to be mapped so the canvas has its real size
+                self.schedule_redraw(canvas, index, delay=10)
+
+    def on_close(self):
+        """Cancels any in-flight generation and waits for the worker before closing the store."""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        # The running generation stops at its next layout boundary; it may still write to the store until then
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.plan_store.close()
+        self.destroy()
 
 
     def schedule_redraw(self, canvas, index, delay=150):
-        """Schedules a redraw for a specific canvas after a delay."""
+        """Schedules a redraw for a specific canvas after a delay (hidden tabs are only marked dirty)."""
+        if index < self.num_plans and not self.is_plan_visible(index):
+            self._dirty[index] = True
+            return
         if index < len(self._redraw_jobs) and self._redraw_jobs[index]:
             self.after_cancel(self._redraw_jobs[index])
             self._redraw_jobs[index] = None
@@ -496,24 +734,39 @@ class HousePlanApp(ctk.CTk):
         if index < len(self._redraw_jobs): self._redraw_jobs[index] = None
         # Check against num_plans
         if index < self.num_plans and index < len(self.current_plans) and self.current_dimensions[0] > 0:
+            if not self.is_plan_visible(index):
+                self._dirty[index] = True # Tab was switched away before the redraw fired
+                return
             plan_data = self.current_plans[index]
             width, length = self.current_dimensions
             if canvas.winfo_exists() and canvas.winfo_width() > 1 and canvas.winfo_height() > 1:
+                self._dirty[index] = False
                 try:
-                    # Pass current settings to draw_plan
-                    draw_plan(canvas, plan_data, width, length, self.app_settings)
+                    # Rebuilds only if the plan changed; a resize just moves the existing items
+                    self.plan_renderers[index].render(plan_data, width, length, self.app_settings)
                 except Exception as e:
                      print(f"Error during redraw of plan {index+1}: {e}")
                      traceback.print_exc()
                      try:
+                         self.plan_renderers[index].invalidate()
                          canvas.delete("all")
                          canvas.create_text(canvas.winfo_width()/2, canvas.winfo_height()/2, text=f"خطا در رسم نقشه {index+1}", fill="red", font=(self.persian_font, 12))
                      except: pass
         
 
 if __name__ == "__main__":
-    try: import PIL; print("Pillow library found.")
-    except ImportError: print("Warning: Pillow library not found (pip install Pillow)")
+    import importlib.util
+    # find_spec only locates Pillow; importing it here would slow down startup
+    if importlib.util.find_spec("PIL"): print("Pillow library found.")
+    else: print("Warning: Pillow library not found (pip install Pillow)")
 
     app = HousePlanApp()
+    if "--startup-time" in sys.argv[1:]:
+        # Reports how long the app takes to become usable, then exits
+        def report_startup():
+            app.build_main_window()
+            app.update_idletasks()
+            print(", ".join(f"{stage} {seconds * 1e3:.0f} ms" for stage, seconds in app.startup_times.items()))
+            app.on_close()
+        app.after_idle(report_startup)
     app.mainloop()
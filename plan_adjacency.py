@@ -0,0 +1,135 @@
+"""
+Room adjacency graph of a plan.
+
+Two rooms are adjacent when they share a wall of positive length. Instead of
+comparing every pair of rooms, every room edge is bucketed by the grid line it
+lies on (x for vertical edges, y for horizontal ones); each line is then swept
+in order of edge start, matching the edges of rooms on one side of the line
+against the currently open edges of rooms on the other side. Open edges are
+kept in a heap per side keyed on their end, and edges that have ended are
+popped when the sweep passes them, so every open edge visited is a shared
+wall. That is O(n log n) for n rooms (plus the number of shared walls), so it
+scales to large multi-unit plans.
+
+Rooms drawn on top of another room (e.g. the kitchen inside the L-shaped living
+room) do not share wall edges with it and are therefore not connected to it.
+"""
+from heapq import heappop, heappush
+
+MIN_SHARED_LENGTH = 1e-6 # m, shorter contacts (corners) are not adjacency
+
+
+class AdjacencyGraph:
+    """
+    Undirected graph over room indices (plan order).
+    `edges` maps (i, j) with i < j to the length of the wall the two rooms share.
+    """
+    __slots__ = ('room_count', 'edges', '_neighbors')
+
+    def __init__(self, room_count, edges):
+        self.room_count = room_count
+        self.edges = edges
+        self._neighbors = [{} for _ in range(room_count)]
+        for (i, j), length in edges.items():
+            self._neighbors[i][j] = length
+            self._neighbors[j][i] = length
+
+    def neighbors(self, i):
+        """Dict of neighbor index -> shared wall length for room i."""
+        return self._neighbors[i]
+
+    def shared_length(self, i, j):
+        """Length of the wall shared by rooms i and j (0.0 if not adjacent)."""
+        return self._neighbors[i].get(j, 0.0)
+
+    def degree(self, i):
+        return len(self._neighbors[i])
+
+    def connected_components(self):
+        """Lists of room indices that are connected through shared walls."""
+        seen = [False] * self.room_count
+        components = []
+        for start in range(self.room_count):
+            if seen[start]:
+                continue
+            seen[start] = True
+            stack, component = [start], []
+            while stack:
+                i = stack.pop()
+                component.append(i)
+                for j in self._neighbors[i]:
+                    if not seen[j]:
+                        seen[j] = True
+                        stack.append(j)
+            components.append(sorted(component))
+        return components
+
+    def as_dict(self):
+        return {'rooms': self.room_count,
+                'edges': [{'rooms': [i, j], 'length': round(length, 6)} for (i, j), length in sorted(self.edges.items())]}
+
+    def __iter__(self):
+        for (i, j), length in sorted(self.edges.items()):
+            yield i, j, length
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __repr__(self):
+        return f"AdjacencyGraph({self.room_count} rooms, {len(self.edges)} shared walls)"
+
+
+def _sweep_line(line_edges, edges):
+    """
+    Matches the edges on one grid line. `line_edges` holds (start, end, side, room)
+    with side 0 for rooms before the line (their right/bottom edge) and 1 for rooms after it.
+    """
+    line_edges.sort()
+    active = ([], []) # Open edges per side: heaps of (end, room)
+    for start, end, side, room in line_edges:
+        others = active[1 - side]
+        while others and others[0][0] <= start + MIN_SHARED_LENGTH:
+            heappop(others)
+        for other_end, other in others:
+            length = min(end, other_end) - start # Every open edge started at or before `start`
+            if length > MIN_SHARED_LENGTH and other != room:
+                key = (room, other) if room < other else (other, room)
+                edges[key] = edges.get(key, 0.0) + length
+        heappush(active[side], (end, room))
+
+
+def build_adjacency(plan):
+    """Builds the AdjacencyGraph of a plan (room-dict list, Plan or RoomTable)."""
+    vertical, horizontal = {}, {}
+    room_count = 0
+    for i, room in enumerate(plan):
+        room_count += 1
+        rect = room.get('rect')
+        if not rect or rect.w <= 0 or rect.h <= 0:
+            continue
+        x0, y0, x1, y1 = rect.x, rect.y, rect.x + rect.w, rect.y + rect.h
+        vertical.setdefault(round(x1, 6), []).append((y0, y1, 0, i))
+        vertical.setdefault(round(x0, 6), []).append((y0, y1, 1, i))
+        horizontal.setdefault(round(y1, 6), []).append((x0, x1, 0, i))
+        horizontal.setdefault(round(y0, 6), []).append((x0, x1, 1, i))
+
+    edges = {}
+    for lines in (vertical, horizontal):
+        for line_edges in lines.values():
+            if len(line_edges) > 1:
+                _sweep_line(line_edges, edges)
+    return AdjacencyGraph(room_count, edges)
+
+
+def plan_adjacency(plan):
+    """
+    Returns the adjacency graph of `plan`, cached on plans that carry a `derived`
+    dict (Plan, RoomTable); plain room lists are recomputed on every call.
+    """
+    derived = getattr(plan, 'derived', None)
+    if derived is None:
+        return build_adjacency(plan)
+    graph = derived.get('adjacency')
+    if graph is None:
+        graph = derived['adjacency'] = build_adjacency(plan)
+    return graph
@@ -0,0 +1,287 @@
+"""
+Compact binary plan archive with memory-mapped random access.
+
+Layout (little-endian):
+    header   64 bytes: magic, version, record size, plan/room counts and the
+             offsets of the index and the string table
+    rooms    one 24-byte record per room (ROOM_DTYPE): x, y, w, h as float32,
+             then uint16 room-type id, name id, color id and flags
+    index    one 40-byte record per plan (INDEX_DTYPE): first room, room count,
+             lot number, lot width/length (float64), layout name id
+    strings  JSON list of the names, colors and layout names the ids refer to
+
+PlanArchive maps the file and exposes the room and index sections as
+zero-copy NumPy views, so plan N is found with one index lookup and nothing
+else is parsed. Plans read back as the Plan/room-dict/Rect structure that
+generate_plans returns; coordinates round-trip at float32 precision (a few
+micrometres on a 30 m lot). Integrity reports and `derived` data are not stored.
+
+Usage:
+    python -m plan_archive pack lots.csv --out catalog.hpa
+    python -m plan_archive info catalog.hpa
+    python -m plan_archive show catalog.hpa 12345
+
+Reading requires NumPy; writing does not.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+from plan_generator import Plan, Rect, generate_plans_iter, compile_settings
+
+MAGIC = b"HPLANARC"
+VERSION = 1
+HEADER_SIZE = 64
+NO_ID = 0xFFFF # Layout id of plans without a layout name
+HAS_TYPE = 1 # Room flag: the room dict carries a resolved 'type'
+
+_HEADER = struct.Struct("<8sII5Q")
+_ROOM = struct.Struct("<4f4H")
+_INDEX = struct.Struct("<QIIddHHI")
+
+# NumPy dtypes of the records (built on first use, so writing works without NumPy)
+_dtypes = None
+
+
+def _record_dtypes():
+    global _dtypes
+    if _dtypes is None:
+        import numpy as np
+        room = np.dtype([('x', '<f4'), ('y', '<f4'), ('w', '<f4'), ('h', '<f4'),
+                         ('type', '<u2'), ('name', '<u2'), ('color', '<u2'), ('flags', '<u2')])
+        index = np.dtype([('start', '<u8'), ('count', '<u4'), ('lot', '<u4'), ('width', '<f8'), ('length', '<f8'),
+                          ('layout', '<u2'), ('flags', '<u2'), ('reserved', '<u4')])
+        assert room.itemsize == _ROOM.size and index.itemsize == _INDEX.size
+        _dtypes = room, index
+    return _dtypes
+
+
+class ArchiveWriter:
+    """
+    Streams plans into an archive: room records are written as plans are added,
+    the index and string table when the writer is closed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(bytes(HEADER_SIZE)) # Filled in by close()
+        self._index = bytearray()
+        self._strings = []
+        self._string_ids = {}
+        self.plan_count = 0
+        self.room_count = 0
+
+    def _string_id(self, text):
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            if string_id >= NO_ID:
+                raise ValueError(f"Too many distinct names for one archive ({NO_ID})")
+            self._strings.append(text)
+            self._string_ids[text] = string_id
+        return string_id
+
+    def add(self, plan, lot=0, size=None):
+        """Appends a plan (room dicts or RoomTable); `size` defaults to plan.size. Returns the plan's number."""
+        width, length = size or getattr(plan, 'size', None) or (0.0, 0.0)
+        pack = _ROOM.pack
+        records = []
+        for room in plan:
+            rect, type_id = room['rect'], room.get('type')
+            records.append(pack(rect.x, rect.y, rect.w, rect.h, type_id if type_id is not None else 0,
+                                self._string_id(room['name']), self._string_id(room.get('color') or ""),
+                                HAS_TYPE if type_id is not None else 0))
+        self._f.write(b"".join(records))
+        layout = getattr(plan, 'layout', None)
+        self._index += _INDEX.pack(self.room_count, len(records), lot, width, length,
+                                   self._string_id(layout) if layout is not None else NO_ID, 0, 0)
+        self.room_count += len(records)
+        self.plan_count += 1
+        return self.plan_count - 1
+
+    def close(self):
+        if self._f.closed:
+            return
+        index_offset = self._f.tell()
+        self._f.write(self._index)
+        strings_offset = self._f.tell()
+        strings = json.dumps(self._strings, ensure_ascii=False).encode("utf-8")
+        self._f.write(strings)
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(MAGIC, VERSION, _ROOM.size, self.plan_count, self.room_count,
+                                   index_offset, strings_offset, len(strings)))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else: # Do not leave a truncated archive behind
+            self._f.close()
+            os.remove(self.path)
+        return False
+
+
+class PlanArchive:
+    """
+    Read-only, memory-mapped view of an archive. `rooms` and `index` are
+    structured NumPy arrays backed by the file; `coords` is a (rooms, 4)
+    float32 view of x, y, w, h. Indexing returns Plans: archive[n].
+    """
+    def __init__(self, path):
+        import numpy as np
+        room_dtype, index_dtype = _record_dtypes()
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, room_size, plan_count, room_count, index_offset, strings_offset, strings_length = \
+                _HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self._mm.close()
+            raise ValueError(f"{path} is not a plan archive") from None
+        if magic != MAGIC or version != VERSION or room_size != room_dtype.itemsize:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} plan archive")
+        self.rooms = np.frombuffer(self._mm, room_dtype, count=room_count, offset=HEADER_SIZE)
+        self.index = np.frombuffer(self._mm, index_dtype, count=plan_count, offset=index_offset)
+        self.coords = np.ndarray((room_count, 4), dtype='<f4', buffer=self._mm, offset=HEADER_SIZE,
+                                 strides=(room_dtype.itemsize, 4))
+        self.strings = json.loads(self._mm[strings_offset:strings_offset + strings_length].decode("utf-8"))
+
+    def __len__(self):
+        return len(self.index)
+
+    def _entry(self, n):
+        if n < 0:
+            n += len(self.index)
+        if not 0 <= n < len(self.index):
+            raise IndexError(f"plan {n} out of range")
+        return self.index[n]
+
+    def plan_rooms(self, n):
+        """Room records of plan n (a zero-copy slice of `rooms`)."""
+        entry = self._entry(n)
+        start = int(entry['start'])
+        return self.rooms[start:start + int(entry['count'])]
+
+    def layout(self, n):
+        layout_id = int(self._entry(n)['layout'])
+        return self.strings[layout_id] if layout_id != NO_ID else None
+
+    def lot_plans(self, lot):
+        """Numbers of the plans generated for lot `lot`."""
+        import numpy as np
+        return np.flatnonzero(self.index['lot'] == lot)
+
+    def plan(self, n):
+        """Plan n as a Plan of room dicts with Rects (layout and size set)."""
+        entry = self._entry(n)
+        strings = self.strings
+        rooms = []
+        for x, y, w, h, type_id, name_id, color_id, flags in self.plan_rooms(n).tolist():
+            room = {'name': strings[name_id], 'rect': Rect(x, y, w, h), 'color': strings[color_id]}
+            if flags & HAS_TYPE:
+                room['type'] = type_id
+            rooms.append(room)
+        layout_id = int(entry['layout'])
+        width, length = float(entry['width']), float(entry['length'])
+        return Plan(rooms, layout=strings[layout_id] if layout_id != NO_ID else None,
+                    size=(width, length) if width or length else None)
+
+    def __getitem__(self, n):
+        return self.plan(n)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self.plan(n)
+
+    def close(self):
+        # Views into the map must go first; callers still holding one keep the map alive
+        self.rooms = self.index = self.coords = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __repr__(self):
+        if self.rooms is None:
+            return f"PlanArchive({self.path!r}, closed)"
+        return f"PlanArchive({self.path!r}, {len(self)} plans, {len(self.rooms)} rooms)"
+
+
+def write_archive(path, plans):
+    """Writes an iterable of plans (or (lot, plan) pairs) to `path`. Returns the number of plans."""
+    with ArchiveWriter(path) as writer:
+        for item in plans:
+            if isinstance(item, tuple):
+                writer.add(item[1], lot=item[0])
+            else:
+                writer.add(item)
+    return writer.plan_count
+
+
+def pack_lots(dimensions, path, settings, **generate_kwargs):
+    """Generates the plans of every (width, length) lot straight into an archive. Returns the number of plans."""
+    settings = compile_settings(settings)
+    with ArchiveWriter(path) as writer:
+        for lot, (width, length) in enumerate(dimensions):
+            for _, _, plan, _ in generate_plans_iter(width, length, settings, **generate_kwargs):
+                writer.add(plan, lot=lot, size=(width, length))
+    return writer.plan_count
+
+
+def main(argv=None):
+    import argparse
+    from plan_batch import iter_dimensions, load_settings
+    parser = argparse.ArgumentParser(prog="python -m plan_archive",
+                                     description="Write and read compact binary plan archives.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="Generate plans for many lots into an archive")
+    pack.add_argument("inputs", nargs="+",
+                      help="CSV files of width,length rows ('-' for stdin) and/or WIDTHxLENGTH values")
+    pack.add_argument("--out", required=True, help="Output archive file")
+    pack.add_argument("--settings", help="JSON file with generation settings (defaults are used for missing keys)")
+    info = commands.add_parser("info", help="Show the size and contents of an archive")
+    info.add_argument("archive")
+    show = commands.add_parser("show", help="Print plans as JSON room records")
+    show.add_argument("archive")
+    show.add_argument("plans", nargs="+", type=int, help="Plan numbers")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "pack":
+            count = pack_lots(iter_dimensions(args.inputs), args.out, load_settings(args.settings))
+            print(f"Wrote {count} plan(s) to {args.out} ({os.path.getsize(args.out) / 1024:.1f} KiB)",
+                  file=sys.stderr)
+        elif args.command == "info":
+            with PlanArchive(args.archive) as archive:
+                lots = len(set(archive.index['lot'].tolist()))
+                print(f"{args.archive}: {len(archive)} plan(s) of {lots} lot(s), {len(archive.rooms)} room(s), "
+                      f"{len(archive.strings)} string(s), {os.path.getsize(args.archive) / 1024:.1f} KiB")
+        else:
+            from plan_batch import plan_to_records
+            with PlanArchive(args.archive) as archive:
+                for n in args.plans:
+                    plan = archive[n]
+                    print(json.dumps({'plan': n, 'lot': int(archive.index[n]['lot']), 'layout': plan.layout,
+                                      'size': plan.size, 'rooms': plan_to_records(plan)}, ensure_ascii=False))
+    except (OSError, ValueError, IndexError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Headless batch generation of house plans.
+
+Runs `generate_plans_iter` over many lot sizes without a Tk display, fanning the
+work out across a process pool and streaming one JSON line per lot (or per plan
+with --per-plan) to disk.
+
+Usage:
+    python -m plan_batch lots.csv --settings settings.json --out plans.jsonl
+    python -m plan_batch 10x15 8.5x12 --workers 4 --out -
+    python -m plan_batch lots.csv --out plans.jsonl --trace trace.json
+"""
+import contextlib
+import csv
+import json
+import os
+import sys
+
+import plan_trace
+from plan_cache import PlanCache
+from plan_generator import (generate_plans_iter, compile_settings,
+                            DEFAULT_MIN_ROOM_DIM, DEFAULT_MIN_BATH_DIM,
+                            DEFAULT_MIN_STOR_BALC_DIM, DEFAULT_ASPECT_RATIO_LIMIT,
+                            DEFAULT_WALL_THICKNESS_SCALE, DEFAULT_LABEL_FONT_SIZE_SCALE)
+
+DEFAULT_SETTINGS = {
+    'min_room_dim': DEFAULT_MIN_ROOM_DIM,
+    'min_bath_dim': DEFAULT_MIN_BATH_DIM,
+    'min_stor_balc_dim': DEFAULT_MIN_STOR_BALC_DIM,
+    'aspect_ratio_limit': DEFAULT_ASPECT_RATIO_LIMIT,
+    'wall_thickness_scale': DEFAULT_WALL_THICKNESS_SCALE,
+    'label_font_size_scale': DEFAULT_LABEL_FONT_SIZE_SCALE,
+}
+
+
+def load_settings(path=None):
+    """Returns DEFAULT_SETTINGS overlaid with the JSON settings file at `path` (if any)."""
+    settings = DEFAULT_SETTINGS.copy()
+    if path:
+        with open(path, encoding="utf-8") as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def parse_dimension(text):
+    """Parses a 'WIDTHxLENGTH' string (e.g. '10x15.5') into a (width, length) tuple."""
+    parts = text.lower().replace("×", "x").split("x")
+    if len(parts) != 2:
+        raise ValueError(f"Invalid dimension '{text}', expected WIDTHxLENGTH")
+    return float(parts[0]), float(parts[1])
+
+
+def read_dimensions(path):
+    """
+    Yields (width, length) pairs from a CSV file ('-' for stdin).
+    A header row is optional; the first two columns are width and length.
+    """
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            try:
+                yield float(row[0]), float(row[1])
+            except ValueError:
+                continue  # Header or malformed row
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def iter_dimensions(inputs):
+    """Yields (width, length) pairs from CLI inputs: CSV files ('-' for stdin) and/or WIDTHxLENGTH values."""
+    for item in inputs:
+        if item == "-" or os.path.isfile(item):
+            yield from read_dimensions(item)
+        else:
+            yield parse_dimension(item)
+
+
+def plan_to_records(plan):
+    """Converts a plan (list of room dicts) into JSON-serialisable room records."""
+    return [{'name': room['name'], 'color': room['color'],
+             'x': room['rect'].x, 'y': room['rect'].y,
+             'w': room['rect'].w, 'h': room['rect'].h} for room in plan]
+
+
+def _integrity_record(plan):
+    report = getattr(plan, 'integrity', None)
+    return report.as_dict() if report is not None else None
+
+
+def _score_records(plans, width, length):
+    """Scores one lot's plans in a single plan_scoring batch; returns one dict per plan."""
+    from plan_scoring import attach_scores
+    attach_scores(plans, width, length)
+    return [{k: round(v, 6) for k, v in plan.derived['scores'].items()} for plan in plans]
+
+
+# Per-process plan cache, set up by _init_worker when caching is enabled
+_cache = None
+
+
+def _iter_lot_plans(width, length, settings, options):
+    """
+    Streams (index, layout_name, plan, timings) for one lot, through the worker cache if enabled.
+    `options` are extra generate_plans_iter keyword arguments (integrity, mode, top_k, time_budget, seed).
+    """
+    if _cache is not None:
+        return _cache.iter_plans(width, length, settings, **options)
+    return generate_plans_iter(width, length, settings, **options)
+
+
+def _generate_one(job):
+    """
+    Worker entry point: generates the plans for one lot and serialises each plan as
+    it is produced. Returns one JSON line per lot, or one per plan when per_plan is set.
+    With an integrity mode, each plan's integrity report is included as well.
+    """
+    index, width, length, settings, per_plan, options = job
+    options = dict(options)
+    scores = options.pop('scores', False)
+    integrity = options.get('integrity')
+    try:
+        plans = _iter_lot_plans(width, length, settings, options)
+        if per_plan:
+            records = []
+            for plan_index, layout_name, plan, timings in plans:
+                record = {'index': index, 'width': width, 'length': length, 'plan': plan_index,
+                          'layout': layout_name, 'rooms': plan_to_records(plan), 'timings': timings}
+                if integrity:
+                    record['integrity'] = _integrity_record(plan)
+                if scores:
+                    record['scores'] = _score_records([plan], width, length)[0]
+                records.append(json.dumps(record, ensure_ascii=False))
+            return "\n".join(records)
+        plans = [plan for _, _, plan, _ in plans]
+        result = {'index': index, 'width': width, 'length': length,
+                  'plans': [plan_to_records(plan) for plan in plans]}
+        if integrity:
+            result['integrity'] = [_integrity_record(plan) for plan in plans]
+        if scores:
+            result['scores'] = _score_records(plans, width, length)
+    except Exception as e:
+        result = {'index': index, 'width': width, 'length': length, 'error': str(e)}
+    return json.dumps(result, ensure_ascii=False)
+
+
+def _generate_traced(job):
+    """Worker entry point with --trace: the lot's JSON text plus the trace data collected for it."""
+    line = _generate_one(job)
+    return line, plan_trace.drain()
+
+
+def _make_cache(cache_size, store):
+    if cache_size > 0 or store is not None:
+        return PlanCache(cache_size, store=store)
+    return None
+
+
+def _init_worker(cache_size, store, trace=False):
+    """Pool initializer: silences per-lot progress chatter, sets up the plan cache and enables tracing."""
+    global _cache
+    sys.stdout = open(os.devnull, "w")
+    _cache = _make_cache(cache_size, store)
+    if trace:
+        plan_trace.enable(events=True)
+    if store is not None:
+        # Pool workers skip atexit; this writes back the store's pending read times when the worker exits
+        from multiprocessing.util import Finalize
+        Finalize(_cache.store, _cache.store.flush, exitpriority=10)
+
+
+def iter_batch(dimensions, settings=None, workers=None, chunksize=64, cache_size=0, per_plan=False, integrity=None,
+               mode="fixed", top_k=None, time_budget=None, scores=False, seed=None, store=None, trace=False):
+    """
+    Generates plans for every (width, length) pair in `dimensions`.
+    Yields the JSON text for each lot, in input order, as results become available:
+    one line per lot, or one line per plan (several lines) when per_plan is set.
+    workers=1 runs in-process (no pool). cache_size > 0 enables a per-worker
+    PlanCache so repeated lot sizes are generated once per worker. With a
+    plan_store.PlanStore as `store`, lots generated by earlier runs are read from
+    disk and new ones are written to it (every worker opens its own connection).
+    integrity ("report" or "reject") runs the integrity stage of generate_plans, and
+    mode="search" (with top_k / time_budget) uses the layout search instead of the fixed layouts,
+    mode="variants" (with top_k / seed) seeded variants of them, where every lot has its own
+    random stream so the output does not depend on the number of workers, and mode="anneal"
+    (with time_budget / seed) the recipes with annealed split positions.
+    scores=True adds the plan_scoring scores of each plan (needs NumPy).
+    trace=True enables plan_trace (with trace events) here and in every worker; the workers'
+    stages, counters and events are merged into this process, so plan_trace.report() and
+    plan_trace.export_chrome_trace() cover the whole batch.
+    """
+    global _cache
+    if trace:
+        plan_trace.enable(events=True)
+    settings = compile_settings(settings if settings is not None else DEFAULT_SETTINGS)
+    options = {k: v for k, v in (('integrity', integrity), ('mode', mode), ('top_k', top_k),
+                                 ('time_budget', time_budget), ('scores', scores or None), ('seed', seed))
+               if v is not None}
+    jobs = ((i, float(w), float(l), settings, per_plan, options) for i, (w, l) in enumerate(dimensions))
+
+    if workers == 1:
+        _cache = _make_cache(cache_size, store)
+        try:
+            with open(os.devnull, "w") as devnull:
+                for job in jobs:
+                    with contextlib.redirect_stdout(devnull):
+                        line = _generate_one(job)
+                    yield line
+        finally:
+            _cache = None
+            if store is not None:
+                store.flush()
+        return
+
+    from concurrent.futures import ProcessPoolExecutor # Deferred: in-process runs never need it
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_size, store, trace)) as pool:
+        if not trace:
+            yield from pool.map(_generate_one, jobs, chunksize=chunksize)
+            return
+        for line, data in pool.map(_generate_traced, jobs, chunksize=chunksize):
+            plan_trace.merge(data)
+            yield line
+
+
+def run_batch(dimensions, out, settings=None, workers=None, chunksize=64, cache_size=0, per_plan=False,
+              integrity=None, mode="fixed", top_k=None, time_budget=None, scores=False, seed=None, store=None,
+              trace=False):
+    """
+    Streams the plans for all `dimensions` to `out` (a path, '-' for stdout,
+    or a writable text file) as JSON lines. Returns the number of lots written.
+    """
+    count = 0
+    if isinstance(out, str):
+        f = sys.stdout if out == "-" else open(out, "w", encoding="utf-8")
+    else:
+        f = out
+    try:
+        for line in iter_batch(dimensions, settings, workers, chunksize, cache_size, per_plan, integrity,
+                               mode, top_k, time_budget, scores, seed, store, trace):
+            f.write(line)
+            f.write("\n")
+            count += 1
+    finally:
+        if f is not out and f is not sys.stdout:
+            f.close()
+    return count
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m plan_batch",
+                                     description="Generate house plans for many lot sizes without the GUI.")
+    parser.add_argument("inputs", nargs="+",
+                        help="CSV files of width,length rows ('-' for stdin) and/or WIDTHxLENGTH values")
+    parser.add_argument("--settings", help="JSON file with generation settings (defaults are used for missing keys)")
+    parser.add_argument("--out", default="-", help="Output JSON-lines file ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 1 = in-process)")
+    parser.add_argument("--chunksize", type=int, default=64, help="Lots sent to a worker per task")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="Per-worker LRU cache entries for repeated lot sizes (0 = disabled)")
+    parser.add_argument("--per-plan", action="store_true",
+                        help="Write one JSON line per plan (with layout name and timings) instead of one per lot")
+    parser.add_argument("--integrity", choices=("report", "reject"),
+                        help="Check plans for overlapping rooms and uncovered area; 'reject' replaces failing plans "
+                             "with an error plan")
+    parser.add_argument("--mode", choices=("fixed", "search", "variants", "anneal"), default="fixed",
+                        help="'fixed' = the three layout recipes, 'search' = top-K plans from the layout search, "
+                             "'variants' = seeded random variants of the recipes, 'anneal' = recipes with "
+                             "optimized split positions")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="Plans per lot in search mode (default 3); variants per lot on top of the recipe plans "
+                             "in variants mode (default 6)")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Search/annealing time per lot in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for variants and anneal mode (default 0)")
+    parser.add_argument("--scores", action="store_true", help="Include plan scores (requires NumPy)")
+    parser.add_argument("--store", help="SQLite plan store shared across runs (reused and extended)")
+    parser.add_argument("--store-size", type=float, default=None,
+                        help="Size cap of the plan store in MB (least recently used lots are evicted)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Time the generation stages in every worker, print the summary and write it with "
+                             "the trace events of all workers to FILE (Chrome trace JSON, '-' for no file)")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = load_settings(args.settings)
+        store = None
+        if args.store:
+            from plan_store import DEFAULT_MAX_BYTES, PlanStore
+            max_bytes = args.store_size * 1024 * 1024 if args.store_size is not None else DEFAULT_MAX_BYTES
+            store = PlanStore(args.store, max_bytes)
+        count = run_batch(iter_dimensions(args.inputs), args.out, settings, args.workers, args.chunksize, args.cache_size,
+                          args.per_plan, args.integrity, args.mode, args.top_k, args.time_budget, args.scores,
+                          args.seed, store, bool(args.trace))
+        if args.trace and args.trace != "-":
+            events = plan_trace.export_chrome_trace(args.trace)
+            print(f"Wrote {events} trace event(s) to {args.trace}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.trace:
+        print(plan_trace.report(), file=sys.stderr)
+    print(f"Generated plans for {count} lot(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
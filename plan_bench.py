@@ -0,0 +1,330 @@
+"""
+Benchmarks for the generation, validation and drawing hot paths.
+
+Times generate_plans, every layout function, check_room_validity,
+_get_room_color and draw_plan over a fixed matrix of lot sizes and settings.
+draw_plan draws onto RecordingCanvas, which only records the canvas calls, so
+no display is needed. For each benchmark it reports throughput, per-call
+latency percentiles over every (case, sample) pair and memory use
+(tracemalloc, in a separate untimed pass: the largest peak of a single call
+and the memory retained per call). Calls too fast to time one by one are
+timed as `inner` back-to-back calls of the same case and divided by `inner`.
+With --startup it also times cold imports of the entry modules, each in a
+fresh interpreter ("import.<module>"), and checks that the generation modules
+load no GUI toolkit. Results can be saved as a JSON baseline and later runs
+compared against it; benchmarks whose median latency grew by more than the
+threshold are flagged as regressions (exit status 1).
+
+Usage:
+    python -m plan_bench --save-baseline bench_baseline.json
+    python -m plan_bench --baseline bench_baseline.json > bench_output.txt
+    python -m plan_bench --filter layout --repeat 50
+    python -m plan_bench --startup --filter import
+"""
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from plan_batch import DEFAULT_SETTINGS
+from plan_drawer import draw_plan
+from plan_generator import (LAYOUT_FUNCTIONS, LAYOUT_NAMES, PERSIAN_NAMES, _get_room_color, check_room_validity,
+                            compile_settings, generate_plans)
+
+# Lot sizes (width, length) in metres: small, typical, elongated and large lots
+LOT_MATRIX = ((6.0, 7.0), (8.0, 10.0), (10.0, 12.0), (12.0, 15.0), (15.0, 20.0), (20.0, 10.0), (7.0, 25.0),
+              (25.0, 30.0))
+SETTINGS_MATRIX = {
+    "default": DEFAULT_SETTINGS,
+    "strict": dict(DEFAULT_SETTINGS, min_room_dim=3.2, min_bath_dim=2.2, min_stor_balc_dim=1.5,
+                   aspect_ratio_limit=2.0),
+}
+CANVAS_SIZE = (800, 600)
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.15 # Relative growth of the median latency that counts as a regression
+PERCENTILES = (50, 90, 99)
+# Entry modules timed by --startup; generation-only workers must not pull in a GUI toolkit
+STARTUP_MODULES = ("plan_generator", "plan_cache", "plan_batch", "plan_drawer", "main")
+GUI_FREE_MODULES = ("plan_generator", "plan_cache", "plan_batch", "plan_drawer")
+GUI_TOOLKITS = ("tkinter", "customtkinter")
+_IMPORT_PROBE = ("import sys, time\n"
+                 "start = time.perf_counter()\n"
+                 "import {module}\n"
+                 "elapsed = time.perf_counter() - start\n"
+                 "print(elapsed, ' '.join(m for m in {toolkits!r} if m in sys.modules))")
+
+
+class RecordingCanvas:
+    """Stand-in for tk.Canvas that records the calls PlanRenderer makes."""
+    def __init__(self, width=CANVAS_SIZE[0], height=CANVAS_SIZE[1]):
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.calls = {}
+        self._next_id = 1
+
+    def _record(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def update_idletasks(self):
+        pass
+
+    def delete(self, tag):
+        self._record("delete")
+        self.items.clear()
+
+    def _create(self, kind, coords, options):
+        self._record("create_" + kind)
+        item = self._next_id
+        self._next_id += 1
+        self.items[item] = (kind, coords, options)
+        return item
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def coords(self, item, *coords):
+        self._record("coords")
+        kind, _, options = self.items[item]
+        self.items[item] = (kind, coords, options)
+
+    def itemconfigure(self, tag_or_id, **options):
+        self._record("itemconfigure")
+
+
+def _percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class Benchmark:
+    """
+    One benchmark: every sample times `func(case)` once per case. `inner` repeats
+    each timed call back to back, for calls too fast to time one by one (their
+    latency is then the mean of those `inner` calls of one case).
+    """
+    def __init__(self, name, func, cases, inner=1):
+        self.name = name
+        self.func = func
+        self.cases = cases
+        self.inner = inner
+
+    def _pass(self):
+        func = self.func
+        for _ in range(self.inner):
+            for case in self.cases:
+                func(case)
+
+    def run(self, repeat):
+        func, inner, perf_counter = self.func, self.inner, time.perf_counter
+        self._pass() # Warm-up (caches, lazy imports)
+        latencies = [] # Seconds per call, one entry per (sample, case)
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                for case in self.cases:
+                    start = perf_counter()
+                    for _ in range(inner):
+                        func(case)
+                    latencies.append((perf_counter() - start) / inner)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        # Allocations: the largest per-call peak and the memory still held after a full pass
+        peak_alloc = 0
+        tracemalloc.start()
+        try:
+            start_memory, _ = tracemalloc.get_traced_memory()
+            for case in self.cases:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                self.func(case)
+                peak_alloc = max(peak_alloc, tracemalloc.get_traced_memory()[1] - before)
+            retained = tracemalloc.get_traced_memory()[0] - start_memory
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        calls = len(latencies) * inner
+        total = sum(latencies) * inner
+        result = {'calls': calls, 'ops_per_sec': calls / total if total > 0 else 0.0,
+                  'mean_us': total / calls * 1e6 if calls else 0.0,
+                  'peak_alloc_bytes': peak_alloc,
+                  'retained_bytes': max(0, retained) / len(self.cases)}
+        for p in PERCENTILES:
+            result[f'p{p}_us'] = _percentile(latencies, p) * 1e6
+        return result
+
+
+def build_benchmarks():
+    """The benchmark list over LOT_MATRIX x SETTINGS_MATRIX."""
+    compiled = [compile_settings(settings) for settings in SETTINGS_MATRIX.values()]
+    lots = [(w, l, settings) for settings in compiled for w, l in LOT_MATRIX]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        plans = [(plan, w, l, settings) for w, l, settings in lots for plan in generate_plans(w, l, settings)]
+    rooms = [(room, settings) for plan, _, _, settings in plans for room in plan]
+    raw_rooms = [(room, dict(settings)) for room, settings in rooms]
+    names = [room['name'] for room, _ in rooms] + list(PERSIAN_NAMES) + ["Bedroom 2", "Service Area"]
+
+    benchmarks = [Benchmark("generate_plans", lambda c: generate_plans(*c), lots)]
+    for name, func in zip(LAYOUT_NAMES, LAYOUT_FUNCTIONS):
+        benchmarks.append(Benchmark(f"layout.{name}", lambda c, func=func: func(*c), lots, inner=5))
+    benchmarks += [
+        Benchmark("check_room_validity", lambda c: check_room_validity(*c), rooms, inner=50),
+        Benchmark("check_room_validity[dict]", lambda c: check_room_validity(*c), raw_rooms, inner=50),
+        Benchmark("_get_room_color", _get_room_color, names, inner=50),
+        Benchmark("draw_plan", lambda c: draw_plan(RecordingCanvas(), *c), plans),
+    ]
+    return benchmarks
+
+
+def measure_import(module, repeat=DEFAULT_REPEAT):
+    """
+    Cold import time of `module`, each sample in a fresh interpreter. Returns a result
+    dict like Benchmark.run plus 'gui' (GUI toolkits it loaded), or None if it cannot be imported.
+    """
+    code = _IMPORT_PROBE.format(module=module, toolkits=GUI_TOOLKITS)
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    latencies, gui = [], []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return None
+        elapsed, *gui = proc.stdout.split()
+        latencies.append(float(elapsed))
+    latencies.sort()
+    total = sum(latencies)
+    result = {'calls': repeat, 'ops_per_sec': repeat / total if total > 0 else 0.0, 'mean_us': total / repeat * 1e6,
+              'peak_alloc_bytes': 0, 'retained_bytes': 0, 'gui': gui}
+    for p in PERCENTILES:
+        result[f'p{p}_us'] = _percentile(latencies, p) * 1e6
+    return result
+
+
+def run_startup_benchmarks(repeat=DEFAULT_REPEAT, name_filter=None):
+    """{"import.<module>": result} for the STARTUP_MODULES that can be imported here."""
+    results = {}
+    for module in STARTUP_MODULES:
+        name = f"import.{module}"
+        if name_filter and name_filter not in name:
+            continue
+        result = measure_import(module, repeat)
+        if result is not None:
+            results[name] = result
+    return results
+
+
+def run_benchmarks(repeat=DEFAULT_REPEAT, name_filter=None):
+    """Runs the (filtered) benchmarks; returns {name: result dict}. Generation output is silenced."""
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        for bench in build_benchmarks():
+            if name_filter and name_filter not in bench.name:
+                continue
+            with contextlib.redirect_stdout(devnull):
+                results[bench.name] = bench.run(repeat)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """{name: (ratio, status)} of the median latency against the baseline; status is 'regression', 'faster' or 'ok'."""
+    verdicts = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get('p50_us'):
+            continue
+        ratio = result['p50_us'] / base['p50_us']
+        status = "regression" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "ok"
+        verdicts[name] = (ratio, status)
+    return verdicts
+
+
+def format_report(results, verdicts=None):
+    lines = [f"{'benchmark':<28}{'ops/s':>12}{'p50 µs':>11}{'p90 µs':>11}{'p99 µs':>11}{'peak B':>10}"
+             f"{'vs base':>10}"]
+    for name, r in results.items():
+        line = (f"{name:<28}{r['ops_per_sec']:>12.0f}{r['p50_us']:>11.2f}{r['p90_us']:>11.2f}{r['p99_us']:>11.2f}"
+                f"{r['peak_alloc_bytes']:>10.0f}")
+        if verdicts and name in verdicts:
+            ratio, status = verdicts[name]
+            line += f"{ratio:>9.2f}x" + ("  REGRESSION" if status == "regression" else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _metadata():
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'platform': platform.platform(), 'time': time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m plan_bench",
+                                     description="Benchmark plan generation, validation and drawing.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed samples per benchmark")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save-baseline", help="Write the results as a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Median latency growth that counts as a regression (0.15 = 15%%)")
+    parser.add_argument("--json", help="Write the full results as JSON")
+    parser.add_argument("--startup", action="store_true",
+                        help="Also time cold imports of the entry modules (one interpreter per sample)")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)['benchmarks']
+        results = run_benchmarks(args.repeat, args.filter)
+        if args.startup:
+            results.update(run_startup_benchmarks(args.repeat, args.filter))
+        verdicts = compare(results, baseline, args.threshold) if baseline else None
+        print(format_report(results, verdicts))
+        document = {'meta': _metadata(), 'repeat': args.repeat, 'benchmarks': results}
+        for path in (args.save_baseline, args.json):
+            if path:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(document, f, indent=2)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    regressions = [name for name, (_, status) in (verdicts or {}).items() if status == "regression"]
+    gui_loaded = [f"{name} ({', '.join(r['gui'])})" for name, r in results.items()
+                  if r.get('gui') and name.split(".", 1)[-1] in GUI_FREE_MODULES]
+    if gui_loaded:
+        print(f"\nGUI toolkit imported by generation modules: {', '.join(gui_loaded)}", file=sys.stderr)
+        return 1
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Bounded LRU cache in front of `generate_plans` / `generate_plans_iter`.
+
+Keys are the house dimensions quantized to a tolerance (1 cm by default) plus a
+stable hash of the generation-relevant settings, so repeated and near-identical
+requests return the previously generated plans without recomputation. Passing
+a CompiledSettings reuses its precomputed digest instead of rehashing.
+With a PlanStore (plan_store) behind it, memory misses are looked up on disk
+and newly generated plans are written through, so they survive restarts.
+"""
+from collections import OrderedDict
+
+from plan_generator import generate_plans_iter, compile_settings, NUM_PLANS, plan_count, settings_hash, DISPLAY_ONLY_SETTINGS # noqa: F401 (re-exported)
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_TOLERANCE = 0.01  # metres
+
+# generate_plans_iter options read by each mode besides table and integrity; the others cannot change its plans
+MODE_OPTIONS = {
+    "fixed": (),
+    "search": ("top_k", "time_budget"),
+    "variants": ("top_k", "seed"),
+    "anneal": ("time_budget", "seed"),
+}
+_MODE_ONLY_OPTIONS = {"top_k", "time_budget", "seed"}
+
+# Keyword defaults of generate_plans_iter (read on first use, so keys follow its signature)
+_generate_defaults = None
+
+
+def _generation_defaults():
+    global _generate_defaults
+    if _generate_defaults is None:
+        import inspect
+        _generate_defaults = {name: p.default for name, p in inspect.signature(generate_plans_iter).parameters.items()
+                              if p.default is not p.empty}
+    return _generate_defaults
+
+
+def normalize_options(options):
+    """
+    Sorted (name, value) pairs of the generate_plans_iter options that change the plans:
+    should_cancel, options the mode ignores and values equal to their default are left out,
+    and top_k=None becomes the mode's default count, so equal requests give equal keys.
+    """
+    defaults = _generation_defaults()
+    options = dict(options)
+    options.pop('should_cancel', None)
+    mode = options.get('mode', defaults['mode'])
+    used = MODE_OPTIONS.get(mode)
+    if used is not None:
+        for name in _MODE_ONLY_OPTIONS.difference(used):
+            options.pop(name, None)
+    if options.get('top_k') is None:
+        if mode == "search":
+            from plan_search import DEFAULT_TOP_K
+            options['top_k'] = DEFAULT_TOP_K
+        elif mode == "variants":
+            from plan_variants import DEFAULT_VARIANTS
+            options['top_k'] = DEFAULT_VARIANTS
+    normalized = []
+    for name, value in sorted(options.items()):
+        default = defaults.get(name)
+        if value is None or value is False:
+            continue
+        if default is not None and default is not False and value == default:
+            continue
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def quantize(value, tolerance=DEFAULT_TOLERANCE):
+    """Snaps a dimension to the nearest multiple of `tolerance`."""
+    if tolerance <= 0:
+        return float(value)
+    return round(round(float(value) / tolerance) * tolerance, 9)
+
+
+class PlanCache:
+    """
+    LRU cache of generated plans.
+    Cached plans are shared between callers and must be treated as read-only.
+    """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, tolerance=DEFAULT_TOLERANCE, store=None):
+        self.maxsize = max(0, int(maxsize))
+        self.tolerance = tolerance
+        self.store = store
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, width, length, settings, **options):
+        """
+        Cache key for the given dimensions, settings and generation options (table, integrity, mode, ...);
+        the options are normalized with normalize_options.
+        """
+        return (quantize(width, self.tolerance), quantize(length, self.tolerance), settings_hash(settings),
+                normalize_options(options))
+
+    def get_plans(self, width, length, settings, progress=None, **generate_kwargs):
+        """
+        Returns the plans for (width, length, settings), generating them on a miss.
+        Plans are generated for the quantized dimensions so that every request
+        mapping to the same key receives identical geometry. `progress(done, total)`
+        and extra keyword arguments (e.g. should_cancel) work as in generate_plans.
+        """
+        plans = []
+        total = plan_count(generate_kwargs.get('mode', "fixed"), generate_kwargs.get('top_k'))
+        for i, _, plan, _ in self.iter_plans(width, length, settings, **generate_kwargs):
+            plans.append(plan)
+            if progress is not None:
+                progress(i + 1, total)
+        return plans
+
+    def iter_plans(self, width, length, settings, **generate_kwargs):
+        """
+        Streaming counterpart of get_plans, yielding (index, layout_name, plan, timings)
+        like generate_plans_iter. Hits (in memory or in the store) replay the cached plans with
+        zero timings; a miss is only stored once every plan was generated (cancelled runs are not cached).
+        """
+        settings = compile_settings(settings)
+        key = self.key(width, length, settings, **generate_kwargs)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is not None:
+            self.hits += 1
+            for i, (layout_name, plan) in enumerate(entry):
+                yield i, layout_name, plan, {'layout': 0.0, 'elapsed': 0.0}
+            return
+
+        self.misses += 1
+        entry = []
+        for i, layout_name, plan, timings in generate_plans_iter(key[0], key[1], settings, **generate_kwargs):
+            entry.append((layout_name, plan))
+            yield i, layout_name, plan, timings
+        if self.store is not None:
+            self.store.put(key, entry)
+        self._remember(key, entry)
+
+    def _remember(self, key, entry):
+        if self.maxsize > 0:
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops all entries (counters are kept)."""
+        self._entries.clear()
+
+    def info(self):
+        """Returns the cache counters as a dict."""
+        info = {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize, 'tolerance': self.tolerance}
+        if self.store is not None:
+            info['store_hits'] = self.store.hits
+            info['store_writes'] = self.store.writes
+        return info
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
@@ -1,6 +1,5 @@
-import tkinter as tk
-import customtkinter as ctk
 import sys
+from plan_generator import RoomTable, wall_segments, wall_thickness_m
 
 PADDING = 25
 DEFAULT_FONT = "Arial" if sys.platform != "linux" else "DejaVu Sans"
@@ -19,63 +18,21 @@ ROOM_COLOR_GUIDE = list({
     ]
 }.items())
 
-def draw_plan(canvas: tk.Canvas, plan_data: list, house_width_m: float, house_length_m: float, settings: dict):
-    canvas.update_idletasks()
-    canvas.delete("all")
-    canvas_width = canvas.winfo_width()
-    canvas_height = canvas.winfo_height()
-    wall_thickness_scale = settings.get('wall_thickness_scale', 0.01)
-
-    if canvas_width <= 1 or canvas_height <= 1 or house_width_m <= 0 or house_length_m <= 0:
-        return
-
-    draw_area_w = canvas_width - 2 * PADDING
-    draw_area_h = canvas_height - 2 * PADDING
-    if draw_area_w <= 0 or draw_area_h <= 0:
+def _iter_room_geometry(plan_data):
+    """Yields (x, y, w, h, color) for each drawable room of a plan (room-dict list or RoomTable)."""
+    if isinstance(plan_data, RoomTable):
+        xs, ys, ws, hs = plan_data.x, plan_data.y, plan_data.w, plan_data.h
+        for i in range(len(plan_data)):
+            if ws[i] >= 0.1 and hs[i] >= 0.1: # Same threshold as Rect.is_valid()
+                yield xs[i], ys[i], ws[i], hs[i], plan_data.color(i)
         return
-
-    scale = min(draw_area_w / house_width_m, draw_area_h / house_length_m)
-    scaled_house_w = house_width_m * scale
-    scaled_house_l = house_length_m * scale
-    offset_x = PADDING + (draw_area_w - scaled_house_w) / 2
-    offset_y = PADDING + (draw_area_h - scaled_house_l) / 2
-
-    # رسم مستطیل زمینه (پذیرایی) که پشت همه قرار می‌گیرد
-    canvas.create_rectangle(offset_x, offset_y, offset_x + scaled_house_w, offset_y + scaled_house_l,
-                            fill="#AED6F1", outline="", width=0)
-    
-    # قاب کلی خانه (خط مشکی)
-    canvas.create_rectangle(offset_x, offset_y, offset_x + scaled_house_w, offset_y + scaled_house_l,
-                            outline="black", width=1)
-
-    def draw_room(x, y, w, h, color):
-        x0 = offset_x + x * scale
-        y0 = offset_y + y * scale
-        x1 = offset_x + (x + w) * scale
-        y1 = offset_y + (y + h) * scale
-        canvas.create_rectangle(x0, y0, x1, y1, fill=color, outline="black", width=1)
-        return color
-
-    used_colors = set()
-
     for room in plan_data:
         rect = room.get("rect")
         if rect and rect.is_valid():
-            color = room.get("color", "#F0F0F0")
-            draw_room(rect.x, rect.y, rect.w, rect.h, color)
-            used_colors.add(color)
+            yield rect.x, rect.y, rect.w, rect.h, room.get("color", "#F0F0F0")
 
-    # راهنمای رنگ
-    legend_x = offset_x + scaled_house_w + 20
-    legend_y = offset_y
-    legend_spacing = 20
-    for color, label in ROOM_COLOR_GUIDE:
-        if color in used_colors:
-            canvas.create_rectangle(legend_x, legend_y, legend_x + 20, legend_y + 15, fill=color, outline="black")
-            canvas.create_text(legend_x + 30, legend_y + 7, anchor=tk.W, text=label, font=(PERSIAN_FONT, 9))
-            legend_y += legend_spacing
-
-    # نوار مقیاس
+def _scale_bar_length_m(house_width_m):
+    """Largest 'nice' scale-bar length that fits comfortably in the house width."""
     possible_scales_m = [1, 2, 5, 10, 15, 20, 25, 50]
     scale_bar_length_m = 1
     for s in possible_scales_m:
@@ -83,15 +40,185 @@ def draw_plan(canvas: tk.Canvas, plan_data: list, house_width_m: float, house_le
             scale_bar_length_m = s
         else:
             break
+    return scale_bar_length_m
+
+
+def _stroke_px(thickness_m, scale):
+    """Line width in pixels for a wall of `thickness_m` metres (at least 1px)."""
+    return max(1.0, thickness_m * scale)
+
+
+_TEXT_ROLES = ("legend_text", "bar_text")
+_WALL_ROLES = ("house", "wall")
+_SCALE_BAR_ROLES = ("bar", "bar_tick_start", "bar_tick_end", "bar_text")
+
+
+class PlanRenderer:
+    """
+    Retained-mode drawer for one canvas.
+    `render` rebuilds the canvas items only when the plan (or its dimensions or
+    drawing settings) changed; otherwise, e.g. after a resize, it moves the
+    existing items in place with `coords`. Room items are tagged "room<i>".
+    Rooms are drawn as plain fills; walls come from `wall_segments`, so every
+    wall is stroked once. The house item carries both the background fill and
+    the exterior wall, whose stroke lies just outside the house footprint.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._plan = None
+        self._plan_key = None
+        self._hidden = False
+        # (item_id, role, data) for every item, used to recompute coords on resize
+        self._items = []
+
+    def invalidate(self):
+        """Forces a full rebuild on the next render (e.g. after the canvas was cleared externally)."""
+        self._plan = None
+        self._plan_key = None
+        self._items = []
+
+    def render(self, plan_data, house_width_m, house_length_m, settings):
+        key = (house_width_m, house_length_m,
+               settings.get('wall_thickness_scale', 0.01), settings.get('label_font_size_scale', 0.025))
+        if plan_data is self._plan and key == self._plan_key and self._items:
+            self.relayout()
+        else:
+            self.rebuild(plan_data, house_width_m, house_length_m, settings)
+            self._plan, self._plan_key = plan_data, key
+
+    def _layout(self):
+        """Screen-space transform for the current canvas size, or None if nothing can be drawn."""
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        house_width_m, house_length_m = self._house
+        if canvas_width <= 1 or canvas_height <= 1 or house_width_m <= 0 or house_length_m <= 0:
+            return None
+
+        draw_area_w = canvas_width - 2 * PADDING
+        draw_area_h = canvas_height - 2 * PADDING
+        if draw_area_w <= 0 or draw_area_h <= 0:
+            return None
+
+        scale = min(draw_area_w / house_width_m, draw_area_h / house_length_m)
+        scaled_house_w = house_width_m * scale
+        scaled_house_l = house_length_m * scale
+        offset_x = PADDING + (draw_area_w - scaled_house_w) / 2
+        offset_y = PADDING + (draw_area_h - scaled_house_l) / 2
+        return canvas_width, canvas_height, scale, offset_x, offset_y, scaled_house_w
+
+    def _coords(self, role, data, layout):
+        """Canvas coordinates of an item for the given layout; None hides the item."""
+        canvas_width, canvas_height, scale, offset_x, offset_y, scaled_house_w = layout
+        if role == "world":
+            x, y, w, h = data
+            return (offset_x + x * scale, offset_y + y * scale,
+                    offset_x + (x + w) * scale, offset_y + (y + h) * scale)
+        if role == "house":
+            w, l, thickness = data
+            grow = _stroke_px(thickness, scale) / 2
+            return (offset_x - grow, offset_y - grow,
+                    offset_x + w * scale + grow, offset_y + l * scale + grow)
+        if role == "wall":
+            x0, y0, x1, y1, _ = data
+            return offset_x + x0 * scale, offset_y + y0 * scale, offset_x + x1 * scale, offset_y + y1 * scale
+        if role in ("legend_swatch", "legend_text"):
+            legend_x = offset_x + scaled_house_w + 20
+            legend_y = offset_y + data * 20 # legend_spacing
+            if role == "legend_swatch":
+                return legend_x, legend_y, legend_x + 20, legend_y + 15
+            return legend_x + 30, legend_y + 7
+
+        # Scale bar parts
+        scale_bar_length_px = data * scale
+        bar_x = PADDING
+        bar_y = canvas_height - PADDING / 1.5
+        if not (bar_x + scale_bar_length_px < canvas_width - PADDING and scale_bar_length_px > 25):
+            return None
+        if role == "bar":
+            return bar_x, bar_y, bar_x + scale_bar_length_px, bar_y
+        if role == "bar_tick_start":
+            return bar_x, bar_y - 3, bar_x, bar_y + 3
+        if role == "bar_tick_end":
+            return bar_x + scale_bar_length_px, bar_y - 3, bar_x + scale_bar_length_px, bar_y + 3
+        return min(bar_x + scale_bar_length_px / 2, canvas_width - PADDING), max(bar_y - 5, PADDING)
+
+    def rebuild(self, plan_data, house_width_m, house_length_m, settings):
+        """Deletes everything and recreates all items for `plan_data`."""
+        canvas = self.canvas
+        canvas.update_idletasks()
+        canvas.delete("all")
+        self._items = []
+        self._hidden = False
+        self._house = (house_width_m, house_length_m)
+        layout = self._layout()
+        if layout is None:
+            return
+
+        def add(role, data, create, **options):
+            coords = self._coords(role, data, layout)
+            if coords is None:
+                # Kept hidden so a later resize can reveal it without a rebuild
+                coords = (0, 0) if role in _TEXT_ROLES else (0, 0, 0, 0)
+                options["state"] = "hidden"
+            self._items.append((create(*coords, **options), role, data))
+
+        scale = layout[2]
+        exterior = wall_thickness_m(house_width_m, house_length_m, settings)
+        interior = wall_thickness_m(house_width_m, house_length_m, settings, exterior=False)
+        # زمینه (پذیرایی) و دیوار بیرونی در یک مستطیل، پشت همه
+        add("house", (house_width_m, house_length_m, exterior), canvas.create_rectangle, fill=HOUSE_BASE_COLOR,
+            outline="black", width=_stroke_px(exterior, scale), tags=("plan", "house"))
+
+        used_colors = set()
+        for i, (x, y, w, h, color) in enumerate(_iter_room_geometry(plan_data)):
+            add("world", (x, y, w, h), canvas.create_rectangle, fill=color, outline="", width=0,
+                tags=("plan", "room", f"room{i}"))
+            used_colors.add(color)
+
+        # دیوارهای داخلی، هر دیوار مشترک فقط یک بار
+        for x0, y0, x1, y1, is_exterior in wall_segments(plan_data, house_width_m, house_length_m):
+            if not is_exterior:
+                add("wall", (x0, y0, x1, y1, interior), canvas.create_line, fill="black",
+                    width=_stroke_px(interior, scale), capstyle="projecting", tags=("plan", "wall"))
+
+        # راهنمای رنگ
+        slot = 0
+        for color, label in ROOM_COLOR_GUIDE:
+            if color in used_colors:
+                add("legend_swatch", slot, canvas.create_rectangle, fill=color, outline="black", tags=("plan", "legend"))
+                add("legend_text", slot, canvas.create_text, anchor="w", text=label, font=(PERSIAN_FONT, 9),
+                    tags=("plan", "legend"))
+                slot += 1
+
+        # نوار مقیاس
+        bar_m = _scale_bar_length_m(house_width_m)
+        add("bar", bar_m, canvas.create_line, fill="black", width=2, tags=("plan", "scale_bar"))
+        add("bar_tick_start", bar_m, canvas.create_line, fill="black", width=1, tags=("plan", "scale_bar"))
+        add("bar_tick_end", bar_m, canvas.create_line, fill="black", width=1, tags=("plan", "scale_bar"))
+        add("bar_text", bar_m, canvas.create_text, text=f"{bar_m} متر", fill="black", font=(PERSIAN_FONT, 9),
+            anchor="s", tags=("plan", "scale_bar"))
+
+    def relayout(self):
+        """Moves the existing items to fit the current canvas size without recreating them."""
+        canvas = self.canvas
+        layout = self._layout()
+        if layout is None:
+            canvas.itemconfigure("plan", state="hidden")
+            self._hidden = True
+            return
+        if self._hidden:
+            canvas.itemconfigure("plan", state="normal")
+            self._hidden = False
+        for item, role, data in self._items:
+            coords = self._coords(role, data, layout)
+            if coords is not None:
+                canvas.coords(item, *coords)
+            if role in _WALL_ROLES: # Wall thickness is in metres, so it follows the scale
+                canvas.itemconfigure(item, width=_stroke_px(data[-1], layout[2]))
+            if role in _SCALE_BAR_ROLES: # The only items that appear/disappear with the canvas size
+                canvas.itemconfigure(item, state="hidden" if coords is None else "normal")
+
 
-    scale_bar_length_px = scale_bar_length_m * scale
-    bar_x = PADDING
-    bar_y = canvas_height - PADDING / 1.5
-
-    if bar_x + scale_bar_length_px < canvas_width - PADDING and scale_bar_length_px > 25:
-        canvas.create_line(bar_x, bar_y, bar_x + scale_bar_length_px, bar_y, fill="black", width=2)
-        canvas.create_line(bar_x, bar_y - 3, bar_x, bar_y + 3, fill="black", width=1)
-        canvas.create_line(bar_x + scale_bar_length_px, bar_y - 3, bar_x + scale_bar_length_px, bar_y + 3, fill="black", width=1)
-        text_x = min(bar_x + scale_bar_length_px / 2, canvas_width - PADDING)
-        text_y = max(bar_y - 5, PADDING)
-        canvas.create_text(text_x, text_y, text=f"{scale_bar_length_m} متر", fill="black", font=(PERSIAN_FONT, 9), anchor=tk.S)
+def draw_plan(canvas, plan_data: list, house_width_m: float, house_length_m: float, settings: dict):
+    """Immediate-mode drawing of a plan: clears `canvas` and draws everything from scratch."""
+    PlanRenderer(canvas).rebuild(plan_data, house_width_m, house_length_m, settings)
@@ -0,0 +1,224 @@
+"""
+Streaming SVG and DXF writers for generated plans.
+
+Each plan is written as soon as it is produced, so exporting a whole catalog
+holds only one lot's plans in memory at a time. Walls come from
+`wall_segments`, so a wall shared by two rooms (or a room and the house
+frame) is written once.
+
+Usage:
+    python -m plan_export lots.csv --format dxf --out catalog.dxf
+    python -m plan_export lots.csv --format svg --out svg_plans/
+"""
+import argparse
+import contextlib
+import os
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+from plan_generator import generate_plans_iter, compile_settings, room_type_of, wall_segments, wall_thickness_m
+from plan_drawer import HOUSE_BASE_COLOR
+from plan_batch import DEFAULT_SETTINGS, iter_dimensions, load_settings
+
+SVG_PIXELS_PER_METRE = 40
+CATALOG_GAP_M = 2.0 # Space between plans in a DXF catalog
+
+
+def _drawable_rooms(plan):
+    for room in plan:
+        rect = room.get('rect')
+        if rect and rect.is_valid():
+            yield room, rect
+
+
+# --- SVG ---
+def write_svg(out, plan, house_w, house_l, settings=None, pixels_per_metre=SVG_PIXELS_PER_METRE, title=None):
+    """
+    Writes one plan as a standalone SVG document to the text stream `out`.
+    Coordinates are in metres (viewBox) with fixed 0.1 mm decimals, like the DXF
+    writer; the document is sized at `pixels_per_metre`.
+    """
+    settings = settings or DEFAULT_SETTINGS
+    font_size = settings.get('label_font_size_scale', DEFAULT_SETTINGS['label_font_size_scale']) * max(house_w, house_l)
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{house_w * pixels_per_metre:.0f}" '
+              f'height="{house_l * pixels_per_metre:.0f}" viewBox="0 0 {house_w:.4f} {house_l:.4f}">\n')
+    if title:
+        out.write(f'<title>{escape(title)}</title>\n')
+    out.write(f'<rect class="house" x="0" y="0" width="{house_w:.4f}" height="{house_l:.4f}" fill="{HOUSE_BASE_COLOR}"/>\n')
+    out.write('<g class="rooms">\n')
+    for room, rect in _drawable_rooms(plan):
+        out.write(f'<rect x="{rect.x:.4f}" y="{rect.y:.4f}" width="{rect.w:.4f}" height="{rect.h:.4f}" '
+                  f'fill={quoteattr(room.get("color", "#F0F0F0"))} data-type={quoteattr(room_type_of(room).key)}>'
+                  f'<title>{escape(room["name"])}</title></rect>\n')
+    out.write('</g>\n')
+    walls = wall_segments(plan, house_w, house_l)
+    for exterior, css_class in ((True, "exterior-walls"), (False, "interior-walls")):
+        out.write(f'<path class="{css_class}" fill="none" stroke="black" stroke-linecap="square" '
+                  f'stroke-width="{wall_thickness_m(house_w, house_l, settings, exterior):.4f}" d="')
+        out.write("".join(f"M{x0:.4f} {y0:.4f}L{x1:.4f} {y1:.4f}"
+                          for x0, y0, x1, y1, is_exterior in walls if is_exterior == exterior))
+        out.write('"/>\n')
+    out.write(f'<g class="labels" font-family="Tahoma, DejaVu Sans, sans-serif" font-size="{font_size:.4f}" '
+              'text-anchor="middle" dominant-baseline="middle" direction="rtl">\n')
+    for room, rect in _drawable_rooms(plan):
+        out.write(f'<text x="{rect.x + rect.w / 2:.4f}" y="{rect.y + rect.h / 2:.4f}">{escape(room["name"])}</text>\n')
+    out.write('</g>\n</svg>\n')
+
+
+# --- DXF (R12, ASCII) ---
+def _dxf_text(text):
+    """Encodes non-ASCII characters as DXF \\U+XXXX escapes."""
+    return "".join(c if ord(c) < 128 else f"\\U+{ord(c):04X}" for c in text)
+
+
+def _dxf_layer(name):
+    return "".join(c if c.isalnum() else "_" for c in name).upper()
+
+
+class DXFWriter:
+    """
+    Streams plans into a single R12 DXF file. Plans are placed side by side
+    (one row per `new_row` call); DXF Y points up, so plans are flipped accordingly.
+    """
+    def __init__(self, out, gap=CATALOG_GAP_M):
+        self.out = out
+        self.gap = gap
+        self._x = 0.0
+        self._y = 0.0
+        self._row_height = 0.0
+        self._closed = False
+        out.write("0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n")
+        out.write("0\nSECTION\n2\nENTITIES\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _line(self, layer, x0, y0, x1, y1):
+        self.out.write(f"0\nLINE\n8\n{layer}\n10\n{x0:.4f}\n20\n{y0:.4f}\n30\n0.0\n11\n{x1:.4f}\n21\n{y1:.4f}\n31\n0.0\n")
+
+    def _text(self, layer, x, y, height, text):
+        self.out.write(f"0\nTEXT\n8\n{layer}\n10\n{x:.4f}\n20\n{y:.4f}\n30\n0.0\n40\n{height:.4f}\n1\n{_dxf_text(text)}\n"
+                       f"72\n1\n73\n2\n11\n{x:.4f}\n21\n{y:.4f}\n31\n0.0\n")
+
+    def _polygon(self, layer, points):
+        out = self.out
+        out.write(f"0\nPOLYLINE\n8\n{layer}\n66\n1\n70\n1\n10\n0.0\n20\n0.0\n30\n0.0\n")
+        for x, y in points:
+            out.write(f"0\nVERTEX\n8\n{layer}\n10\n{x:.4f}\n20\n{y:.4f}\n30\n0.0\n")
+        out.write(f"0\nSEQEND\n8\n{layer}\n")
+
+    def new_row(self):
+        """Starts a new row of plans below the previous one."""
+        if self._row_height:
+            self._y -= self._row_height + self.gap
+        self._x = 0.0
+        self._row_height = 0.0
+
+    def write_plan(self, plan, house_w, house_l, settings=None, title=None):
+        """Writes one plan at the next free position of the current row."""
+        settings = settings or DEFAULT_SETTINGS
+        ox, top = self._x, self._y
+        text_h = settings.get('label_font_size_scale', DEFAULT_SETTINGS['label_font_size_scale']) * max(house_w, house_l)
+
+        def to_dxf(x, y):
+            return ox + x, top - y
+
+        for room, rect in _drawable_rooms(plan):
+            layer = "ROOM_" + _dxf_layer(room_type_of(room).key)
+            self._polygon(layer, [to_dxf(rect.x, rect.y), to_dxf(rect.x + rect.w, rect.y),
+                                  to_dxf(rect.x + rect.w, rect.y + rect.h), to_dxf(rect.x, rect.y + rect.h)])
+            self._text("LABELS", *to_dxf(rect.x + rect.w / 2, rect.y + rect.h / 2), text_h, room['name'])
+        for x0, y0, x1, y1, exterior in wall_segments(plan, house_w, house_l):
+            self._line("WALLS_EXTERIOR" if exterior else "WALLS_INTERIOR", *to_dxf(x0, y0), *to_dxf(x1, y1))
+        if title:
+            self._text("TITLES", *to_dxf(house_w / 2, -text_h * 2), text_h * 1.5, title)
+
+        self._x += house_w + self.gap
+        self._row_height = max(self._row_height, house_l + text_h * 4)
+
+    def close(self):
+        if not self._closed:
+            self.out.write("0\nENDSEC\n0\nEOF\n")
+            self._closed = True
+
+
+def write_dxf(out, plan, house_w, house_l, settings=None, title=None):
+    """Writes one plan as a standalone DXF document to the text stream `out`."""
+    with DXFWriter(out) as writer:
+        writer.write_plan(plan, house_w, house_l, settings, title)
+
+
+# --- Catalogs ---
+def _iter_catalog_plans(dimensions, settings):
+    """Yields (lot_index, plan_index, layout_name, plan, width, length), generating one lot at a time."""
+    for index, (width, length) in enumerate(dimensions):
+        width, length = float(width), float(length)
+        for plan_index, layout_name, plan, _ in generate_plans_iter(width, length, settings):
+            yield index, plan_index, layout_name, plan, width, length
+
+
+def export_dxf_catalog(dimensions, out, settings=None):
+    """
+    Streams the plans for every (width, length) pair into one DXF file at path `out`,
+    one row per lot. Returns the number of plans written.
+    """
+    settings = compile_settings(settings if settings is not None else DEFAULT_SETTINGS)
+    count = 0
+    last_lot = None
+    with open(out, "w", encoding="ascii", newline="\r\n") as f, DXFWriter(f) as writer:
+        for index, plan_index, layout_name, plan, width, length in _iter_catalog_plans(dimensions, settings):
+            if index != last_lot:
+                writer.new_row()
+                last_lot = index
+            writer.write_plan(plan, width, length, settings, f"{width:g} x {length:g} - {plan_index + 1} ({layout_name})")
+            count += 1
+    return count
+
+
+def export_svg_catalog(dimensions, out_dir, settings=None, pixels_per_metre=SVG_PIXELS_PER_METRE):
+    """
+    Writes one SVG file per plan (lot<index>_plan<n>.svg) into `out_dir` in a single
+    streaming pass. Returns the number of plans written.
+    """
+    settings = compile_settings(settings if settings is not None else DEFAULT_SETTINGS)
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for index, plan_index, layout_name, plan, width, length in _iter_catalog_plans(dimensions, settings):
+        path = os.path.join(out_dir, f"lot{index:05d}_plan{plan_index + 1}.svg")
+        with open(path, "w", encoding="utf-8") as f:
+            write_svg(f, plan, width, length, settings, pixels_per_metre,
+                      f"{width:g} x {length:g} - {plan_index + 1} ({layout_name})")
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m plan_export",
+                                     description="Export generated house plans as SVG or DXF.")
+    parser.add_argument("inputs", nargs="+",
+                        help="CSV files of width,length rows ('-' for stdin) and/or WIDTHxLENGTH values")
+    parser.add_argument("--format", choices=("svg", "dxf"), default="dxf", help="Output format")
+    parser.add_argument("--out", required=True, help="DXF catalog file, or output directory for SVG files")
+    parser.add_argument("--settings", help="JSON file with generation settings (defaults are used for missing keys)")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = load_settings(args.settings)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if args.format == "dxf":
+                count = export_dxf_catalog(iter_dimensions(args.inputs), args.out, settings)
+            else:
+                count = export_svg_catalog(iter_dimensions(args.inputs), args.out, settings)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {count} plan(s) to {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
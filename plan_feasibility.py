@@ -0,0 +1,239 @@
+"""
+Precomputed feasibility maps: which layout recipes work for which lot sizes.
+
+For every lot and layout the map stores how many of the rooms the recipe
+attempts fail check_room_validity and are dropped from the plan (TOO_SMALL
+for lots that generate_plans rejects outright). A layout is feasible for a
+lot when no more than `max_dropped` rooms are dropped; the default of 0
+means every room is valid. The map is a dense sweep of plan_vectorized over
+a regular (width, length) grid with one byte per lot and layout, stored
+compressed (a map for 2-30 m at 5 cm steps is a few tens of KB). Bulk
+lookups (query_many, heatmaps) snap to the nearest grid point and evaluate
+lots outside the grid directly; single-lot queries (query, feasible_layouts)
+always evaluate the lot itself, so answers near feasibility boundaries are exact.
+
+Maps are tied to the generation settings (settings_hash) they were built with.
+
+Usage:
+    python -m plan_feasibility build --out feasibility.npz --step 0.05
+    python -m plan_feasibility query 7x11 12.5x9 --map feasibility.npz
+    python -m plan_feasibility heatmap --map feasibility.npz --out heatmap.png --max-dropped 1
+
+Requires NumPy (and Pillow for heatmap images).
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from plan_batch import load_settings, parse_dimension
+from plan_generator import compile_settings
+from plan_vectorized import LAYOUTS, evaluate_layouts, too_small_mask
+
+DEFAULT_RANGE = (2.0, 30.0) # m, for both width and length
+DEFAULT_STEP = 0.05 # m
+TOO_SMALL = 255 # Dropped-room count stored for lots rejected as too small
+CHUNK_LOTS = 50000 # Lots evaluated per vectorized pass (bounds memory)
+# Heatmap colors by share of feasible layouts (none .. all)
+HEATMAP_COLORS = ("#F0F0F0", "#FAD7A0", "#ABEBC6", "#58D68D")
+
+
+def _axis(lo, hi, step):
+    return lo + step * np.arange(int(round((hi - lo) / step)) + 1)
+
+
+class FeasibilityMap:
+    """
+    Dropped-room counts of each layout over a grid of widths x lengths.
+    `dropped` maps layout name -> (len(widths), len(lengths)) uint8 array.
+    """
+    def __init__(self, widths, lengths, dropped, settings_digest):
+        self.widths = np.asarray(widths, dtype=np.float64)
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+        self.dropped = dropped
+        self.settings_digest = settings_digest
+
+    @property
+    def layouts(self):
+        return tuple(self.dropped)
+
+    @property
+    def shape(self):
+        return len(self.widths), len(self.lengths)
+
+    def _index(self, values, axis):
+        step = axis[1] - axis[0] if len(axis) > 1 else 1.0
+        index = np.rint((values - axis[0]) / step).astype(np.intp)
+        inside = (index >= 0) & (index < len(axis))
+        return np.clip(index, 0, len(axis) - 1), inside
+
+    def query_many(self, widths, lengths, settings=None):
+        """
+        Dropped-room counts of many lots: {layout: uint8 array}. Lots inside the grid
+        get the counts of the nearest grid point (off by up to half a step near
+        feasibility boundaries); lots outside it are evaluated directly, which needs
+        the `settings` the map was built with.
+        """
+        W, L = np.broadcast_arrays(np.asarray(widths, dtype=np.float64), np.asarray(lengths, dtype=np.float64))
+        shape = W.shape
+        W, L = W.ravel(), L.ravel()
+        i, inside_w = self._index(W, self.widths)
+        j, inside_l = self._index(L, self.lengths)
+        outside = ~(inside_w & inside_l)
+        result = {name: counts[i, j] for name, counts in self.dropped.items()}
+        if outside.any():
+            if settings is None:
+                raise ValueError("Lots outside the feasibility map need the generation settings")
+            exact = dropped_rooms(W[outside], L[outside], self._check_settings(settings), self.layouts)
+            for name in result:
+                result[name][outside] = exact[name]
+        return {name: counts.reshape(shape) for name, counts in result.items()}
+
+    def query(self, width, length, settings):
+        """
+        {layout: dropped-room count} for one lot (TOO_SMALL if the lot is rejected),
+        evaluated exactly with the `settings` the map was built with.
+        """
+        exact = dropped_rooms(float(width), float(length), self._check_settings(settings), self.layouts)
+        return {name: int(counts[0]) for name, counts in exact.items()}
+
+    def feasible_layouts(self, width, length, settings, max_dropped=0):
+        """Names of the layouts that drop at most `max_dropped` rooms on the lot, in recipe order."""
+        return [name for name, n in self.query(width, length, settings).items() if n <= max_dropped]
+
+    def heatmap(self, layout=None, max_dropped=0):
+        """(len(widths), len(lengths)) uint8 array: number of feasible layouts, or one layout's 0/1 mask."""
+        if layout is not None:
+            return (self.dropped[layout] <= max_dropped).astype(np.uint8)
+        return np.sum([counts <= max_dropped for counts in self.dropped.values()], axis=0, dtype=np.uint8)
+
+    def _check_settings(self, settings):
+        settings = compile_settings(settings)
+        if settings.digest != self.settings_digest:
+            raise ValueError("Settings differ from the ones the feasibility map was built with")
+        return settings
+
+    def save(self, path):
+        """Writes the map as a compressed .npz."""
+        counts = {f"dropped_{name}": counts for name, counts in self.dropped.items()}
+        np.savez_compressed(path, widths=self.widths, lengths=self.lengths, layouts=np.array(self.layouts),
+                            settings_digest=np.array(self.settings_digest), **counts)
+
+    @classmethod
+    def load(cls, path, settings=None):
+        """Reads a map written by save(); with `settings`, checks that they match the map."""
+        with np.load(path) as data:
+            dropped = {str(name): data[f"dropped_{name}"] for name in data['layouts']}
+            fmap = cls(data['widths'], data['lengths'], dropped, str(data['settings_digest']))
+        if settings is not None:
+            fmap._check_settings(settings)
+        return fmap
+
+    def __repr__(self):
+        return (f"FeasibilityMap({self.shape[0]}x{self.shape[1]} lots, "
+                f"widths {self.widths[0]:g}-{self.widths[-1]:g}, lengths {self.lengths[0]:g}-{self.lengths[-1]:g})")
+
+
+def dropped_rooms(widths, lengths, settings, layouts=None):
+    """{layout: uint8 array} of dropped-room counts for (width, length) pairs, evaluated with plan_vectorized."""
+    settings = compile_settings(settings)
+    rejected = too_small_mask(widths, lengths, settings)
+    result = {}
+    for name, layout in evaluate_layouts(widths, lengths, settings, layouts).items():
+        counts = np.minimum((layout.attempted & ~layout.valid).sum(axis=1), TOO_SMALL - 1).astype(np.uint8)
+        counts[rejected] = TOO_SMALL
+        result[name] = counts
+    return result
+
+
+def build_feasibility_map(settings, width_range=DEFAULT_RANGE, length_range=DEFAULT_RANGE, step=DEFAULT_STEP,
+                          layouts=None):
+    """Sweeps the grid of widths x lengths (inclusive ranges, `step` apart) and returns a FeasibilityMap."""
+    settings = compile_settings(settings)
+    widths = _axis(*width_range, step)
+    lengths = _axis(*length_range, step)
+    names = tuple(layouts or LAYOUTS)
+    dropped = {name: np.zeros((len(widths), len(lengths)), dtype=np.uint8) for name in names}
+    rows = max(1, CHUNK_LOTS // len(lengths))
+    for start in range(0, len(widths), rows):
+        W, L = np.meshgrid(widths[start:start + rows], lengths, indexing="ij")
+        for name, counts in dropped_rooms(W, L, settings, names).items():
+            dropped[name][start:start + rows] = counts.reshape(W.shape)
+    return FeasibilityMap(widths, lengths, dropped, settings.digest)
+
+
+def heatmap_levels(fmap, layout=None, max_dropped=0):
+    """
+    (len(lengths), len(widths)) indices into HEATMAP_COLORS: widths left to
+    right, lengths top to bottom (shared by heatmap_image and the app's map view).
+    """
+    counts = fmap.heatmap(layout, max_dropped)
+    top = 1 if layout is not None else len(fmap.layouts)
+    return np.rint(counts.T * ((len(HEATMAP_COLORS) - 1) / max(top, 1))).astype(np.intp)
+
+
+def heatmap_image(fmap, layout=None, max_dropped=0, cell=1):
+    """
+    Renders the heatmap as a Pillow image: widths left to right, lengths top to
+    bottom, `cell` pixels per grid point, colored by HEATMAP_COLORS.
+    """
+    from PIL import Image # Optional dependency, only needed for images
+    levels = heatmap_levels(fmap, layout, max_dropped)
+    palette = np.array([[int(c[k:k + 2], 16) for k in (1, 3, 5)] for c in HEATMAP_COLORS], dtype=np.uint8)
+    image = Image.fromarray(palette[levels], "RGB")
+    if cell > 1:
+        image = image.resize((image.width * cell, image.height * cell), Image.NEAREST)
+    return image
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m plan_feasibility",
+                                     description="Precompute and query which layouts work for which lot sizes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Sweep the lot grid and save the feasibility map")
+    build.add_argument("--out", required=True, help="Output .npz file")
+    build.add_argument("--settings", help="JSON file with generation settings (defaults are used for missing keys)")
+    build.add_argument("--min", type=float, default=DEFAULT_RANGE[0], help="Smallest width/length in metres")
+    build.add_argument("--max", type=float, default=DEFAULT_RANGE[1], help="Largest width/length in metres")
+    build.add_argument("--step", type=float, default=DEFAULT_STEP, help="Grid step in metres")
+    query = commands.add_parser("query", help="Show the dropped rooms per layout for WIDTHxLENGTH lots")
+    query.add_argument("lots", nargs="+", help="WIDTHxLENGTH values")
+    query.add_argument("--map", help="Feasibility map (.npz); evaluated directly if omitted")
+    query.add_argument("--settings", help="JSON file with generation settings (defaults are used for missing keys)")
+    heatmap = commands.add_parser("heatmap", help="Render a feasibility map as an image")
+    heatmap.add_argument("--map", required=True, help="Feasibility map (.npz)")
+    heatmap.add_argument("--out", required=True, help="Output image file")
+    heatmap.add_argument("--layout", help="Only this layout (default: number of feasible layouts)")
+    heatmap.add_argument("--max-dropped", type=int, default=0, help="Dropped rooms a feasible layout may have")
+    heatmap.add_argument("--cell", type=int, default=1, help="Pixels per grid point")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            fmap = build_feasibility_map(load_settings(args.settings), (args.min, args.max), (args.min, args.max),
+                                         args.step)
+            fmap.save(args.out)
+            print(f"Wrote {fmap!r} to {args.out}", file=sys.stderr)
+        elif args.command == "query":
+            settings = load_settings(args.settings)
+            fmap = FeasibilityMap.load(args.map, settings) if args.map else None
+            for lot in args.lots:
+                width, length = parse_dimension(lot)
+                if fmap is not None:
+                    counts = fmap.query(width, length, settings)
+                else:
+                    counts = {name: int(n[0]) for name, n in dropped_rooms(width, length, settings).items()}
+                print(f"{width:g}x{length:g}: " + ", ".join(
+                    f"{name} {'too small' if n == TOO_SMALL else 'ok' if n == 0 else f'drops {n}'}"
+                    for name, n in counts.items()))
+        else:
+            fmap = FeasibilityMap.load(args.map)
+            heatmap_image(fmap, args.layout, args.max_dropped, args.cell).save(args.out)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
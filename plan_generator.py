@@ -1,5 +1,12 @@
-import random
-import math
+import sys
+import time
+import hashlib
+from array import array
+from collections.abc import Mapping
+
+import plan_trace
+from plan_integrity import check_plan_integrity, DEFAULT_MAX_UNCOVERED_FRACTION
+from plan_adjacency import plan_adjacency
 
 # --- Constants ---
 DEFAULT_MIN_ROOM_DIM = 2.5
@@ -59,36 +66,183 @@ PERSIAN_NAMES = {
 }
 
 
-def _get_room_color(name):
-    """Gets the color for a room name using consistent keys."""
+# --- Room-Type Registry ---
+class RoomType:
+    """
+    Registry entry for a room type. Rooms carry the integer `id` (room['type'])
+    resolved once in add_room, so validation and coloring are table lookups.
+    Minimum dimensions are `settings[min_dim_setting]` times the w/h factors;
+    the aspect-ratio limit is `settings['aspect_ratio_limit']` times aspect_factor.
+    """
+    __slots__ = ('id', 'key', 'persian_name', 'color', 'min_dim_setting',
+                 'min_w_factor', 'min_h_factor', 'aspect_factor')
+
+    def __init__(self, id, key, persian_name, color, min_dim_setting='min_room_dim',
+                 min_w_factor=1.0, min_h_factor=1.0, aspect_factor=1.0):
+        self.id = id
+        self.key = key
+        self.persian_name = persian_name
+        self.color = color
+        self.min_dim_setting = min_dim_setting
+        self.min_w_factor = min_w_factor
+        self.min_h_factor = min_h_factor
+        self.aspect_factor = aspect_factor
+
+    def __repr__(self):
+        return f"RoomType({self.id}, {self.key!r})"
+
+
+# Validation rules per type (anything not listed uses min_room_dim in both directions)
+_ROOM_TYPE_RULES = {
+    "Bathroom": dict(min_dim_setting='min_bath_dim'),
+    "Storage": dict(min_dim_setting='min_stor_balc_dim'),
+    "Utility": dict(min_dim_setting='min_stor_balc_dim'),
+    "Balcony": dict(min_dim_setting='min_stor_balc_dim'),
+    "Hallway/Corridor": dict(min_w_factor=0.5), # Allow narrower hallway
+    "Unallocated": dict(min_dim_setting='min_stor_balc_dim', min_w_factor=0.8, min_h_factor=0.8,
+                        aspect_factor=1.5), # Allow smaller, more extreme leftover space
+}
+
+ROOM_TYPES = [RoomType(i, key, PERSIAN_NAMES[key], color, **_ROOM_TYPE_RULES.get(key, {}))
+              for i, (key, color) in enumerate(ROOM_COLORS.items())]
+# Corridor serving the bathrooms: hallway color, validated with the bathroom minimums
+ROOM_TYPES.append(RoomType(len(ROOM_TYPES), "Service Hallway", "راهرو سرویس‌ها",
+                           ROOM_COLORS["Hallway/Corridor"], min_dim_setting='min_bath_dim'))
+ROOM_TYPES_BY_KEY = {t.key: t for t in ROOM_TYPES}
+BEDROOM_TYPE_IDS = frozenset({ROOM_TYPES_BY_KEY["Master Bedroom"].id, ROOM_TYPES_BY_KEY["Bedroom"].id})
+
+
+# --- Compiled Settings ---
+# Settings that only affect drawing/appearance, not the generated geometry
+DISPLAY_ONLY_SETTINGS = frozenset({
+    'wall_thickness_scale', 'label_font_size_scale', 'appearance_mode', 'color_theme',
+})
+
+
+def settings_hash(settings):
+    """Returns a stable hex digest of the settings that influence plan generation."""
+    if isinstance(settings, CompiledSettings):
+        return settings.digest
+    import json # Deferred: only needed once per settings, keeps `import plan_generator` light
+    relevant = {k: v for k, v in settings.items() if k not in DISPLAY_ONLY_SETTINGS}
+    payload = json.dumps(relevant, sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class CompiledSettings(Mapping):
+    """
+    Frozen, hashable settings built once from a settings dict.
+    Reads like the original dict (settings['min_room_dim']) and carries
+    per-room-type validation thresholds, indexed by RoomType.id, with the 0.9
+    tolerance and the per-type factors already applied. Equality and hashing
+    only consider generation-relevant settings, so it doubles as a cache key.
+    """
+    __slots__ = ('_items', 'digest', 'min_w', 'min_h', 'aspect_limit')
+
+    def __init__(self, settings):
+        items = dict(settings)
+        init = object.__setattr__ # Attributes are read-only once built
+        init(self, '_items', items)
+        init(self, 'digest', settings_hash(items))
+        init(self, 'min_w', tuple(items[t.min_dim_setting] * t.min_w_factor * 0.9 for t in ROOM_TYPES))
+        init(self, 'min_h', tuple(items[t.min_dim_setting] * t.min_h_factor * 0.9 for t in ROOM_TYPES))
+        init(self, 'aspect_limit', tuple(items['aspect_ratio_limit'] * t.aspect_factor for t in ROOM_TYPES))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CompiledSettings is frozen (cannot set '{name}')")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"CompiledSettings is frozen (cannot delete '{name}')")
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __eq__(self, other):
+        if isinstance(other, CompiledSettings):
+            return self.digest == other.digest
+        return NotImplemented
+
+    def __reduce__(self):
+        return (CompiledSettings, (self._items,))
+
+    def __repr__(self):
+        return f"CompiledSettings({self._items!r})"
+
+
+def compile_settings(settings):
+    """Returns `settings` as a CompiledSettings (no-op if it already is one)."""
+    if isinstance(settings, CompiledSettings):
+        return settings
+    return CompiledSettings(settings)
+
+
+def _room_type_key(name):
+    """Classifies a room name (English or Persian) into a ROOM_COLORS key."""
     name_lower = name.lower()
     # Prioritize specific types by checking for keywords
-    if "balcony" in name_lower or "بالکن" in name: return ROOM_COLORS["Balcony"]
-    if "storage" in name_lower or "utility" in name_lower or "انباری" in name or "کاربردی" in name: return ROOM_COLORS["Storage"]
-    if "bathroom" in name_lower or "service" in name_lower or "حمام" in name or "سرویس" in name: return ROOM_COLORS["Bathroom"]
-    if "master bedroom" in name_lower or "اصلی" in name: return ROOM_COLORS["Master Bedroom"]
-    if "bedroom" in name_lower or "اتاق خواب" in name: return ROOM_COLORS["Bedroom"] # General bedroom
-    if "kitchen" in name_lower or "آشپزخانه" in name: return ROOM_COLORS["Kitchen"]
-    if "living" in name_lower or "پذیرایی" in name: return ROOM_COLORS["Living Room"]
-    if "dining" in name_lower or "ناهارخوری" in name: return ROOM_COLORS["Dining Area"]
-    if "hallway" in name_lower or "corridor" in name_lower or "راهرو" in name: return ROOM_COLORS["Living Room"]  # Same as living room
-    if "error" in name_lower or "خطا" in name: return ROOM_COLORS["Error"]
-    if "unallocated" in name_lower or "باقیمانده" in name: return ROOM_COLORS["Unallocated"]
-
-    for key, color in ROOM_COLORS.items():
+    if "balcony" in name_lower or "بالکن" in name: return "Balcony"
+    if "storage" in name_lower or "utility" in name_lower or "انباری" in name or "کاربردی" in name: return "Storage"
+    if "bathroom" in name_lower or "service" in name_lower or "حمام" in name or "سرویس" in name: return "Bathroom"
+    if "master bedroom" in name_lower or "اصلی" in name: return "Master Bedroom"
+    if "bedroom" in name_lower or "اتاق خواب" in name: return "Bedroom" # General bedroom
+    if "kitchen" in name_lower or "آشپزخانه" in name: return "Kitchen"
+    if "living" in name_lower or "پذیرایی" in name: return "Living Room"
+    if "dining" in name_lower or "ناهارخوری" in name: return "Dining Area"
+    if "hallway" in name_lower or "corridor" in name_lower or "راهرو" in name: return "Hallway/Corridor"  # Same color as living room
+    if "error" in name_lower or "خطا" in name: return "Error"
+    if "unallocated" in name_lower or "باقیمانده" in name: return "Unallocated"
+
+    for key in ROOM_COLORS:
         if key.lower() in name_lower:
-            return color
-    return ROOM_COLORS["Unallocated"]
+            return key
+    return "Unallocated"
+
+
+def _get_room_color(name):
+    """Gets the color for a room name using consistent keys."""
+    return ROOM_COLORS[_room_type_key(name)]
+
+
+def _validation_type_key(name):
+    """Classifies a room name the way validation always has (used for rooms without a 'type')."""
+    name_lower = name.lower()
+    if "bathroom" in name_lower or "service" in name_lower or "حمام" in name or "سرویس" in name: return "Bathroom"
+    if "storage" in name_lower or "balcony" in name_lower or "utility" in name_lower or "انباری" in name or "بالکن" in name or "کاربردی" in name: return "Storage"
+    if "hallway" in name_lower or "corridor" in name_lower or "راهرو" in name: return "Hallway/Corridor"
+    if "unallocated" in name_lower or "باقیمانده" in name: return "Unallocated"
+    return "Living Room" # Any other room uses the main room minimums
+
+
+def room_type_of(room_dict):
+    """Returns the RoomType of a room dict, classifying by name only if no 'type' was resolved."""
+    type_id = room_dict.get('type')
+    if type_id is not None:
+        return ROOM_TYPES[type_id]
+    return ROOM_TYPES_BY_KEY[_validation_type_key(room_dict.get('name', 'Unknown'))]
 
 
 class Rect:
     """Helper class for representing rectangular areas."""
+    __slots__ = ('x', 'y', 'w', 'h')
+
     def __init__(self, x, y, w, h):
         self.x = float(x)
         self.y = float(y)
         self.w = max(0, float(w))
         self.h = max(0, float(h))
-        self.area = self.w * self.h
+
+    @property
+    def area(self):
+        return self.w * self.h
 
     def intersects(self, other):
         if self.w <= 0 or self.h <= 0 or other.w <= 0 or other.h <= 0: return False
@@ -137,69 +291,396 @@ class Rect:
     def __repr__(self):
         return f"Rect(x={self.x:.2f}, y={self.y:.2f}, w={self.w:.2f}, h={self.h:.2f})"
 
+
+# --- Compact Plan Representation ---
+ROOM_TYPE_KEYS = tuple(t.key for t in ROOM_TYPES) # Room-type id -> registry key
+# Suffixes the layouts append to registry names ("اتاق خواب ۲", "پذیرایی (باز)")
+ROOM_NAME_SUFFIXES = ("", " ۱", " ۲", " ۳", " (باز)", " اتاق‌ها")
+# Strings all RoomTables share, by RoomType id: the name of type i with suffix k has string id
+# k * len(ROOM_TYPES) + i, its color len(ROOM_NAME_SUFFIXES) * len(ROOM_TYPES) + i.
+# Ids from REGISTRY_STRING_COUNT on index a table's own `_strings`.
+REGISTRY_STRINGS = (tuple(t.persian_name + suffix for suffix in ROOM_NAME_SUFFIXES for t in ROOM_TYPES)
+                    + tuple(t.color for t in ROOM_TYPES))
+REGISTRY_STRING_COUNT = len(REGISTRY_STRINGS)
+_REGISTRY_STRING_IDS = {}
+for _i, _text in enumerate(REGISTRY_STRINGS):
+    _REGISTRY_STRING_IDS.setdefault(_text, _i)
+del _i, _text
+
+
+def _plan_scores(plan):
+    """Scores dict of a Plan/RoomTable from plan_scoring (needs NumPy), cached in `derived`."""
+    scores = plan.derived.get('scores')
+    if scores is None:
+        if plan.size is None:
+            raise ValueError("Plan has no house size to score against")
+        from plan_scoring import attach_scores
+        attach_scores([plan], *plan.size)
+        scores = plan.derived['scores']
+    return scores
+
+
+class Plan(list):
+    """
+    A generated plan: a list of room dicts plus metadata.
+    `layout` is the layout recipe name, `size` the (width, length) of the house and
+    `integrity` the IntegrityReport (when generated with an integrity check). Data
+    derived from the rooms is cached in `derived`, so plans must not be modified
+    once they were handed out.
+    """
+    def __init__(self, rooms=(), layout=None, size=None):
+        super().__init__(rooms)
+        self.layout = layout
+        self.size = size
+        self.integrity = None
+        self.derived = {}
+
+    @property
+    def adjacency(self):
+        """AdjacencyGraph of the rooms (computed once, then cached in `derived`)."""
+        return plan_adjacency(self)
+
+    @property
+    def scores(self):
+        """Scores against PROPORTIONS_GENERAL (see plan_scoring; computed once, then cached)."""
+        return _plan_scores(self)
+
+
+class RoomView:
+    """
+    Read/write view of one row of a RoomTable that behaves like a room dict
+    ('name', 'rect', 'color', 'type'), so existing room-dict consumers work unchanged.
+    """
+    __slots__ = ('table', 'index')
+    _KEYS = ('name', 'rect', 'color', 'type')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key):
+        t, i = self.table, self.index
+        if key == 'name': return t.name(i)
+        if key == 'color': return t.color(i)
+        if key == 'rect': return t.rect(i)
+        if key == 'type': return t.kind[i]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        t, i, n = self.table, self.index, len(self.table)
+        if key == 'name': # The room keeps its type, as a room dict with a 'type' does
+            t._ids[2 * n + i] = t._string_id(value)
+        elif key == 'color':
+            t._ids[n + i] = t._string_id(value)
+        elif key == 'rect':
+            t._geom[i], t._geom[n + i], t._geom[2 * n + i], t._geom[3 * n + i] = value.x, value.y, value.w, value.h
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self._KEYS
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def __repr__(self):
+        return f"RoomView({self.table.name(self.index)!r}, {self.table.rect(self.index)!r})"
+
+
+class RoomTable:
+    """
+    Structure-of-arrays plan. All geometry lives in one float64 `array`
+    laid out as [x..., y..., w..., h...]; room-type, color and name ids live in
+    one uint32 `array` laid out as [type..., color..., name...]. Registry
+    names (also with the layouts' ROOM_NAME_SUFFIXES) and colors are stored by
+    RoomType id (REGISTRY_STRINGS); only other strings, such as renamed rooms,
+    go into the table's own `_strings` list (None while there are none).
+    Columns are exposed as zero-copy memoryviews. Iterating yields RoomView
+    rows that look like room dicts, so existing consumers of plans keep working.
+    """
+    __slots__ = ('_geom', '_ids', '_strings', 'layout', 'size', 'integrity', 'derived')
+
+    def __init__(self, rooms=(), layout=None, size=None):
+        xs, ys, ws, hs, kinds, colors, names = [], [], [], [], [], [], []
+        strings, string_ids = [], dict(_REGISTRY_STRING_IDS)
+        for room in rooms:
+            rect, name = room['rect'], room['name']
+            xs.append(rect.x); ys.append(rect.y); ws.append(rect.w); hs.append(rect.h)
+            kinds.append(room_type_of(room).id)
+            for text, column in ((room.get('color') or _get_room_color(name), colors), (name, names)):
+                sid = string_ids.get(text)
+                if sid is None:
+                    sid = string_ids[text] = REGISTRY_STRING_COUNT + len(strings)
+                    strings.append(text)
+                column.append(sid)
+        self._geom = array('d', xs + ys + ws + hs)
+        self._ids = array('I', kinds + colors + names)
+        self._strings = strings or None
+        # Same metadata as Plan
+        self.layout = layout if layout is not None else getattr(rooms, 'layout', None)
+        self.size = size if size is not None else getattr(rooms, 'size', None)
+        self.integrity = getattr(rooms, 'integrity', None)
+        self.derived = dict(getattr(rooms, 'derived', ()))
+
+    @classmethod
+    def from_rooms(cls, rooms):
+        """Builds a table from an iterable of room dicts (or RoomViews)."""
+        return cls(rooms)
+
+    def _column(self, buf, k):
+        n = len(self)
+        return memoryview(buf)[k * n:(k + 1) * n]
+
+    @property
+    def x(self): return self._column(self._geom, 0)
+    @property
+    def y(self): return self._column(self._geom, 1)
+    @property
+    def w(self): return self._column(self._geom, 2)
+    @property
+    def h(self): return self._column(self._geom, 3)
+    @property
+    def kind(self): return self._column(self._ids, 0)
+
+    def _string_id(self, text):
+        sid = _REGISTRY_STRING_IDS.get(text)
+        if sid is not None:
+            return sid
+        if self._strings is None:
+            self._strings = []
+        try:
+            return REGISTRY_STRING_COUNT + self._strings.index(text)
+        except ValueError:
+            self._strings.append(text)
+            return REGISTRY_STRING_COUNT + len(self._strings) - 1
+
+    def _string(self, sid):
+        if sid < REGISTRY_STRING_COUNT:
+            return REGISTRY_STRINGS[sid]
+        return self._strings[sid - REGISTRY_STRING_COUNT]
+
+    def name(self, i):
+        return self._string(self._ids[2 * len(self) + i])
+
+    def color(self, i):
+        return self._string(self._ids[len(self) + i])
+
+    def rect(self, i):
+        """Returns a Rect for row i (a new, detached object)."""
+        n, g = len(self), self._geom
+        return Rect(g[i], g[n + i], g[2 * n + i], g[3 * n + i])
+
+    @property
+    def adjacency(self):
+        """AdjacencyGraph of the rooms (computed once, then cached in `derived`)."""
+        return plan_adjacency(self)
+
+    @property
+    def scores(self):
+        """Scores against PROPORTIONS_GENERAL (see plan_scoring; computed once, then cached)."""
+        return _plan_scores(self)
+
+    def type_key(self, i):
+        """Registry key of the room type in row i."""
+        return ROOM_TYPE_KEYS[self._ids[i]]
+
+    def to_rooms(self):
+        """Expands the table back into a list of room dicts."""
+        return [{'name': self.name(i), 'rect': self.rect(i), 'color': self.color(i), 'type': self._ids[i]}
+                for i in range(len(self))]
+
+    def nbytes(self):
+        """Memory held by the table: its arrays and its own strings (the shared REGISTRY_STRINGS are not counted)."""
+        size = sys.getsizeof(self) + sys.getsizeof(self._geom) + sys.getsizeof(self._ids)
+        if self._strings is not None:
+            size += sys.getsizeof(self._strings) + sum(sys.getsizeof(text) for text in self._strings)
+        return size
+
+    # Pickled as plain rooms (derived data is recomputed)
+    def __getstate__(self):
+        return ([(self.name(i), self.color(i), self.rect(i), self._ids[i]) for i in range(len(self))],
+                self.layout, self.size, self.integrity)
+
+    def __setstate__(self, state):
+        rooms, layout, size, integrity = state
+        self.__init__(({'name': name, 'color': color, 'rect': rect, 'type': type_id}
+                       for name, color, rect, type_id in rooms), layout, size)
+        self.integrity = integrity
+
+    def __len__(self):
+        return len(self._ids) // 3
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("room index out of range")
+        return RoomView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield RoomView(self, i)
+
+    def __repr__(self):
+        return f"RoomTable({len(self)} rooms)"
+
+
+# --- Wall Geometry ---
+def _merge_intervals(intervals, eps=1e-6):
+    """Unions overlapping/touching (start, end) intervals, in ascending order."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + eps:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def wall_segments(plan, house_w, house_l):
+    """
+    Returns the unique walls of a plan as (x0, y0, x1, y1, exterior) tuples.
+    The edges of the house frame and of every valid room are collected per grid
+    line and collinear overlapping/touching edges are joined, so a wall shared by
+    two rooms appears once. Horizontal walls come first (sorted by y, then x),
+    then vertical ones; `exterior` is True for walls on the house frame.
+    """
+    horizontal, vertical = {}, {}
+
+    def add_rect(x, y, w, h):
+        for line_y in (y, y + h):
+            horizontal.setdefault(round(line_y, 6), []).append((x, x + w))
+        for line_x in (x, x + w):
+            vertical.setdefault(round(line_x, 6), []).append((y, y + h))
+
+    add_rect(0.0, 0.0, house_w, house_l)
+    for room in plan:
+        rect = room.get('rect')
+        if rect and rect.is_valid():
+            add_rect(rect.x, rect.y, rect.w, rect.h)
+
+    frame_y = (0.0, round(house_l, 6))
+    frame_x = (0.0, round(house_w, 6))
+    walls = []
+    for y in sorted(horizontal):
+        walls.extend((x0, y, x1, y, y in frame_y) for x0, x1 in _merge_intervals(horizontal[y]))
+    for x in sorted(vertical):
+        walls.extend((x, y0, x, y1, x in frame_x) for y0, y1 in _merge_intervals(vertical[x]))
+    return walls
+
+
+def wall_thickness_m(house_w, house_l, settings, exterior=True):
+    """Wall thickness in metres: wall_thickness_scale times the longer house side (interior walls are half as thick)."""
+    thickness = settings.get('wall_thickness_scale', DEFAULT_WALL_THICKNESS_SCALE) * max(house_w, house_l)
+    return thickness if exterior else thickness / 2
+
+
+def plan_fingerprint(plan, ndigits=3):
+    """
+    Canonical hash of a plan's geometry: room types and rects rounded to `ndigits`,
+    independent of room order and names. Plans with the same fingerprint draw the same.
+    """
+    rooms = []
+    for room in plan:
+        rect = room.get('rect')
+        if rect is None:
+            continue
+        rooms.append((room_type_of(room).id, round(rect.x, ndigits), round(rect.y, ndigits),
+                      round(rect.w, ndigits), round(rect.h, ndigits)))
+    rooms.sort()
+    return hashlib.sha1(repr(rooms).encode("utf-8")).hexdigest()
+
 # --- Helper Functions ---
 def check_room_validity(room_dict, settings):
-    """Checks if a room dict has a valid rect based on settings."""
+    """Checks if a room dict has a valid rect based on settings and its room type."""
     rect = room_dict.get('rect')
-    name = room_dict.get('name', 'Unknown')
     if not rect or not isinstance(rect, Rect): return False
 
-    min_w, min_h = settings['min_room_dim'], settings['min_room_dim']
-    name_lower = name.lower()
-    # Use keywords for checking type
-    if "bathroom" in name_lower or "service" in name_lower or "حمام" in name or "سرویس" in name:
-        min_w, min_h = settings['min_bath_dim'], settings['min_bath_dim']
-    elif "storage" in name_lower or "balcony" in name_lower or "utility" in name_lower or "انباری" in name or "بالکن" in name or "کاربردی" in name:
-        min_w, min_h = settings['min_stor_balc_dim'], settings['min_stor_balc_dim']
-    elif "hallway" in name_lower or "corridor" in name_lower or "راهرو" in name:
-        min_w = settings['min_room_dim'] * 0.5 # Allow narrower hallway
-    elif "unallocated" in name_lower or "باقیمانده" in name:
-         min_w, min_h = settings['min_stor_balc_dim'] * 0.8, settings['min_stor_balc_dim'] * 0.8 # Allow smaller unallocated
+    room_type = room_type_of(room_dict)
+    if isinstance(settings, CompiledSettings):
+        t = room_type.id
+        return (rect.w >= settings.min_w[t] and rect.h >= settings.min_h[t]
+                and rect.aspect_ratio() <= settings.aspect_limit[t])
+    min_dim = settings[room_type.min_dim_setting]
 
     # Check dimensions with tolerance
-    if not (rect.w >= min_w * 0.9 and rect.h >= min_h * 0.9):
+    if not (rect.w >= min_dim * room_type.min_w_factor * 0.9 and rect.h >= min_dim * room_type.min_h_factor * 0.9):
         return False
 
-    # Check aspect ratio (be more lenient for unallocated space)
-    aspect = rect.aspect_ratio()
-    aspect_limit = settings['aspect_ratio_limit']
-    if "unallocated" in name_lower or "باقیمانده" in name:
-        aspect_limit *= 1.5 # Allow more extreme aspect ratio for leftover space
-    if aspect > aspect_limit:
+    # Check aspect ratio (more lenient for unallocated space)
+    if rect.aspect_ratio() > settings['aspect_ratio_limit'] * room_type.aspect_factor:
         return False
 
     return True
 
+
+def _rejection_rule(room_dict, settings):
+    """Name of the check_room_validity rule a room fails (for instrumentation)."""
+    rect = room_dict.get('rect')
+    if not rect or not isinstance(rect, Rect): return "no_rect"
+    room_type = room_type_of(room_dict)
+    settings = compile_settings(settings)
+    t = room_type.id
+    if rect.w < settings.min_w[t]: return "min_width"
+    if rect.h < settings.min_h[t]: return "min_height"
+    return "aspect_ratio"
+
 def add_room(room_list, name_key, rect, settings, suffix=""):
     """Adds a room to the list if its rect is valid, using Persian names."""
-    persian_name = PERSIAN_NAMES.get(name_key, name_key) + suffix
-    # اتاق خواب‌ها رنگ یکسان داشته باشن مثل نقشه ۱
-    if "اتاق خواب" in persian_name:
-        color = ROOM_COLORS["Bedroom"]
+    room_type = ROOM_TYPES_BY_KEY.get(name_key)
+    if room_type is None: # Not a registry key: keep the name and classify on validation
+        persian_name = PERSIAN_NAMES.get(name_key, name_key) + suffix
+        room = {'name': persian_name, 'rect': rect, 'color': _get_room_color(name_key)}
     else:
-        color = _get_room_color(name_key)
-    room = {'name': persian_name, 'rect': rect, 'color': color}
+        # اتاق خواب‌ها رنگ یکسان داشته باشن مثل نقشه ۱
+        color = ROOM_COLORS["Bedroom"] if room_type.id in BEDROOM_TYPE_IDS else room_type.color
+        room = {'name': room_type.persian_name + suffix, 'rect': rect, 'color': color, 'type': room_type.id}
     if rect and check_room_validity(room, settings):
         room_list.append(room)
         return True
+    if plan_trace.enabled:
+        plan_trace.count("rooms_rejected", rule=_rejection_rule(room, settings), type=room_type_of(room).key,
+                         layout=plan_trace.context("layout"))
     return False
 
 
 # --- Layout Generation Functions ---
+# Split ratios of each layout recipe; layout functions accept overrides (used by plan_variants)
+LAYOUT_RATIOS = {
+    "simple_split": {'living_w': 0.4, 'living_h': 0.7, 'bedrooms_h': 0.55, 'hallway_h': 0.15,
+                     'bedroom_split': 0.5, 'bath_split': 0.5},
+    "open_concept": {'open': 0.6, 'kitchen': 0.35, 'bedrooms': 0.6, 'bedroom_split': 0.5, 'bath_split': 0.5},
+    "l_shape_living": {'public_h': 0.4, 'kitchen_w': 0.4, 'kitchen_h': 0.4, 'hallway_h': 0.85, 'bed_h': 0.7},
+}
+
+
+def _layout_ratios(layout_name, ratios):
+    if not ratios:
+        return LAYOUT_RATIOS[layout_name]
+    return {**LAYOUT_RATIOS[layout_name], **ratios}
 
-def _generate_layout_simple_split(house_w, house_l, settings):
+
+def _generate_layout_simple_split(house_w, house_l, settings, ratios=None):
     rooms = []
     initial_rect = Rect(0, 0, house_w, house_l)
     if not initial_rect.is_valid(): return rooms
+    r = _layout_ratios("simple_split", ratios)
 
     try:
         # First split: Living area from private area (40% for living)
-        split_w_1 = house_w * 0.4
+        split_w_1 = house_w * r['living_w']
         living_area, private_area = initial_rect.split_vertical(split_w_1)
 
         if living_area and private_area:
             # Split living area into living and kitchen
-            split_h_1 = living_area.h * 0.7
+            split_h_1 = living_area.h * r['living_h']
             living_rect, kitchen_rect = living_area.split_horizontal(split_h_1)
             add_room(rooms, "Living Room", living_rect, settings)
             add_room(rooms, "Kitchen", kitchen_rect, settings)
@@ -209,12 +690,12 @@ def _generate_layout_simple_split(house_w, house_l, settings):
             max_bedrooms = 2  # Default number of bedrooms
             
             # Reduce number of bedrooms if space is limited
-            if private_area.h * 0.55 < min_bedroom_size * 1.5:
+            if private_area.h * r['bedrooms_h'] < min_bedroom_size * 1.5:
                 max_bedrooms = 1
             
             # Split private area into bedrooms and bathrooms with hallway in between
-            split_h_2 = private_area.h * 0.55  # Bedrooms area
-            split_h_3 = private_area.h * 0.15  # Hallway height
+            split_h_2 = private_area.h * r['bedrooms_h']  # Bedrooms area
+            split_h_3 = private_area.h * r['hallway_h']  # Hallway height
             
             bedrooms_area = Rect(private_area.x, private_area.y, private_area.w, split_h_2)
             hallway_area = Rect(private_area.x, private_area.y + split_h_2, private_area.w, split_h_3)
@@ -224,7 +705,7 @@ def _generate_layout_simple_split(house_w, house_l, settings):
             # Split bedrooms area based on available space
             if bedrooms_area.is_valid():
                 if max_bedrooms == 2:
-                    split_w_2 = bedrooms_area.w * 0.5
+                    split_w_2 = bedrooms_area.w * r['bedroom_split']
                     bed1_rect, bed2_rect = bedrooms_area.split_vertical(split_w_2)
                     add_room(rooms, "Bedroom", bed1_rect, settings, suffix=" ۱")
                     add_room(rooms, "Bedroom", bed2_rect, settings, suffix=" ۲")
@@ -238,8 +719,8 @@ def _generate_layout_simple_split(house_w, house_l, settings):
 
             # Split bathrooms area into two rooms (bathroom and balcony) if space allows
             if bathrooms_area.is_valid():
-                if bathrooms_area.w * 0.5 >= settings['min_bath_dim']:
-                    split_w_3 = bathrooms_area.w * 0.5
+                if bathrooms_area.w * r['bath_split'] >= settings['min_bath_dim']:
+                    split_w_3 = bathrooms_area.w * r['bath_split']
                     bath1_rect, bath2_rect = bathrooms_area.split_vertical(split_w_3)
                     add_room(rooms, "Bathroom", bath1_rect, settings)
                     add_room(rooms, "Balcony", bath2_rect, settings)
@@ -248,22 +729,23 @@ def _generate_layout_simple_split(house_w, house_l, settings):
                     add_room(rooms, "Bathroom", bathrooms_area, settings)
 
     except Exception as e:
-        print(f"Error in simple split: {e}")
+        plan_trace.error(f"Error in simple split: {e}")
         add_room(rooms, "Error", initial_rect, settings)
 
     if not rooms and initial_rect.is_valid():
         add_room(rooms, "Unallocated", initial_rect, settings)
     return rooms
 
-def _generate_layout_open_concept(house_w, house_l, settings):
+def _generate_layout_open_concept(house_w, house_l, settings, ratios=None):
     """ Modified open concept layout with equal bedrooms and bathrooms, plus hallway. """
     rooms = []
     initial_rect = Rect(0, 0, house_w, house_l)
     if not initial_rect.is_valid(): return rooms
     min_room_dim = settings['min_room_dim']
+    r = _layout_ratios("open_concept", ratios)
 
     # Decide orientation based on house dimensions
-    open_ratio = 0.6
+    open_ratio = r['open']
     if house_w > house_l * 1.2:  # Wide house
         open_w = house_w * open_ratio
         private_w = house_w - open_w
@@ -279,7 +761,7 @@ def _generate_layout_open_concept(house_w, house_l, settings):
 
     # Split Open Area
     if open_rect.is_valid(min_room_dim * 0.8):
-        k_ratio = 0.35
+        k_ratio = r['kitchen']
         if is_wide:
             k_h = open_rect.h * k_ratio
             k_rect, l_rect = open_rect.split_horizontal(k_h)
@@ -295,10 +777,10 @@ def _generate_layout_open_concept(house_w, house_l, settings):
     if private_rect.is_valid(min_room_dim):
         # Split bedrooms and bathrooms first
         if is_wide:
-            split_h = private_rect.h * 0.6
+            split_h = private_rect.h * r['bedrooms']
             bedrooms_area, bathrooms_area = private_rect.split_horizontal(split_h)
         else:
-            split_w = private_rect.w * 0.6
+            split_w = private_rect.w * r['bedrooms']
             bedrooms_area, bathrooms_area = private_rect.split_vertical(split_w)
 
         if bedrooms_area and bathrooms_area:
@@ -309,7 +791,7 @@ def _generate_layout_open_concept(house_w, house_l, settings):
 
             # Split remaining bedroom area equally
             if bed_area:
-                split_bed = bed_area.w * 0.5
+                split_bed = bed_area.w * r['bedroom_split']
                 bed1_rect, bed2_rect = bed_area.split_vertical(split_bed)
                 add_room(rooms, "Master Bedroom", bed1_rect, settings)
                 add_room(rooms, "Bedroom", bed2_rect, settings, suffix=" ۲")
@@ -317,11 +799,11 @@ def _generate_layout_open_concept(house_w, house_l, settings):
             # Add hallway between bathrooms
             bath_hallway_size = min(bathrooms_area.w * 0.15, settings['min_room_dim'] * 1.2)
             bath_area, bath_hallway_rect = bathrooms_area.split_vertical(bathrooms_area.w - bath_hallway_size)
-            add_room(rooms, "Hallway/Corridor", bath_hallway_rect, settings, suffix=" سرویس‌ها")
+            add_room(rooms, "Service Hallway", bath_hallway_rect, settings)
 
             # Split remaining bathroom area (bathroom and balcony)
             if bath_area:
-                split_bath = bath_area.w * 0.5
+                split_bath = bath_area.w * r['bath_split']
                 bath1_rect, bath2_rect = bath_area.split_vertical(split_bath)
                 add_room(rooms, "Bathroom", bath1_rect, settings)
                 add_room(rooms, "Balcony", bath2_rect, settings)
@@ -330,37 +812,38 @@ def _generate_layout_open_concept(house_w, house_l, settings):
 
     return rooms
 
-def _generate_layout_l_shape_living(house_w, house_l, settings):
+def _generate_layout_l_shape_living(house_w, house_l, settings, ratios=None):
     """Plan 3: Final version with large kitchen, full-length bathroom and mirrored balcony."""
     rooms = []
     rect = Rect(0, 0, house_w, house_l)
     if not rect.is_valid(): return rooms
+    r = _layout_ratios("l_shape_living", ratios)
 
     try:
         min_room = settings['min_room_dim']
         hallway_w = min(1.0, house_w * 0.15)
 
         # 1. فضای عمومی و خصوصی
-        public_h = house_l * 0.4
+        public_h = house_l * r['public_h']
         private_h = house_l - public_h
         public_area = Rect(0, 0, house_w, public_h)
 
         # 2. پذیرایی و آشپزخانه
         add_room(rooms, "Living Room", public_area, settings)
 
-        kitchen_w = max(min_room, house_w * 0.4)
-        kitchen_h = max(min_room, public_h * 0.4)
+        kitchen_w = max(min_room, house_w * r['kitchen_w'])
+        kitchen_h = max(min_room, public_h * r['kitchen_h'])
         kitchen_rect = Rect(0, 0, kitchen_w, kitchen_h)
         add_room(rooms, "Kitchen", kitchen_rect, settings)
 
         # 3. راهرو و تقسیم خصوصی
-        hallway_h = private_h * 0.85
+        hallway_h = private_h * r['hallway_h']
         hallway_x = (house_w - hallway_w) / 2
         hallway_rect = Rect(hallway_x, public_h, hallway_w, hallway_h)
         add_room(rooms, "Hallway/Corridor", hallway_rect, settings)
 
         side_w = (house_w - hallway_w) / 2
-        bed_h = hallway_h * 0.7
+        bed_h = hallway_h * r['bed_h']
 
         # اتاق خواب اصلی (چپ)
         bed1_rect = Rect(0, public_h, side_w, bed_h)
@@ -384,7 +867,7 @@ def _generate_layout_l_shape_living(house_w, house_l, settings):
         add_room(rooms, "Balcony", balc_rect, settings)
 
     except Exception as e:
-        print(f"Error in Plan 3: {e}")
+        plan_trace.error(f"Error in Plan 3: {e}")
         add_room(rooms, "Error", rect, settings)
 
     if not rooms:
@@ -396,53 +879,224 @@ def _generate_layout_l_shape_living(house_w, house_l, settings):
 
 
 
-def generate_plans(width, length, settings):
+def _error_room(name, width, length):
+    """Whole-house placeholder room used when a plan cannot be generated."""
+    error_type = ROOM_TYPES_BY_KEY["Error"]
+    return {'name': name, 'rect': Rect(0, 0, width, length), 'color': error_type.color, 'type': error_type.id}
+
+
+class GenerationCancelled(Exception):
+    """Raised by generate_plans when its `should_cancel` callback returns True."""
+
+
+NUM_PLANS = 3
+# Layout recipes, in plan order
+LAYOUT_FUNCTIONS = [
+    _generate_layout_simple_split,
+    _generate_layout_open_concept,
+    _generate_layout_l_shape_living,
+]
+LAYOUT_NAMES = [func.__name__.replace("_generate_layout_", "") for func in LAYOUT_FUNCTIONS]
+
+
+def _finish_plan(rooms, layout_name, width, length, settings, table, integrity):
+    """Wraps generated rooms into a Plan (or RoomTable) and runs the optional integrity stage."""
+    plan = rooms if isinstance(rooms, Plan) else Plan(rooms, layout_name)
+    plan.size = (width, length)
+    if integrity:
+        with plan_trace.span("integrity", layout=layout_name):
+            report = check_plan_integrity(plan, width, length)
+            if integrity == "reject" and not report.is_ok(
+                    max_uncovered_fraction=settings.get('max_uncovered_fraction', DEFAULT_MAX_UNCOVERED_FRACTION)):
+                plan_trace.count("integrity_rejected", layout=layout_name)
+                plan_trace.note(f"Plan ({layout_name}) rejected by integrity check: {report}")
+                plan = Plan([_error_room(f'{PERSIAN_NAMES["Error"]} - نقشه ناقص', width, length)], layout_name, (width, length))
+                report = check_plan_integrity(plan, width, length)
+        plan.integrity = report
+    return RoomTable(plan) if table else plan
+
+
+def _search_plans_iter(width, length, settings, table, should_cancel, integrity, top_k, time_budget, start):
+    """generate_plans_iter for mode="search": the top-K plans of plan_search, best first."""
+    from plan_search import DEFAULT_TOP_K, search_layouts
+    if top_k is None:
+        top_k = DEFAULT_TOP_K
+    with plan_trace.span("search", layout="search", top_k=top_k, budget=time_budget) as span:
+        plans, stats = search_layouts(width, length, settings, top_k, time_budget, should_cancel)
+        span.set(**stats)
+    if should_cancel is not None and should_cancel():
+        raise GenerationCancelled("Cancelled during layout search")
+    if not plans:
+        plan_trace.count("empty_plan", layout="search")
+        plan_trace.note("Layout search found no valid plan.")
+        plans = [[_error_room(f'{PERSIAN_NAMES["Error"]} - بدون اتاق معتبر', width, length)]]
+    search_time = time.perf_counter() - start
+    for i, rooms in enumerate(plans):
+        plan = _finish_plan(rooms, "search", width, length, settings, table, integrity)
+        yield i, "search", plan, {'layout': search_time if i == 0 else 0.0, 'elapsed': time.perf_counter() - start}
+
+
+def _variant_plans_iter(width, length, settings, table, should_cancel, integrity, count, seed, start):
+    """generate_plans_iter for mode="variants": the recipes plus up to `count` distinct seeded variants of them."""
+    from plan_variants import DEFAULT_VARIANTS, generate_variants
+    if count is None:
+        count = DEFAULT_VARIANTS
+    with plan_trace.span("variants", count=count, seed=seed) as span:
+        plans, stats = generate_variants(width, length, settings, count, seed, should_cancel=should_cancel)
+        span.set(variants=len(plans), **stats)
+    plan_trace.count("duplicate_variants", stats['duplicates'])
+    if should_cancel is not None and should_cancel():
+        raise GenerationCancelled("Cancelled during variant generation")
+    if not plans:
+        plan_trace.count("empty_plan", layout="variants")
+        plan_trace.note("No layout variant produced valid rooms.")
+        plans = [[_error_room(f'{PERSIAN_NAMES["Error"]} - بدون اتاق معتبر', width, length)]]
+    variant_time = time.perf_counter() - start
+    for i, rooms in enumerate(plans):
+        layout_name = getattr(rooms, 'layout', None) or "variant"
+        plan = _finish_plan(rooms, layout_name, width, length, settings, table, integrity)
+        yield i, layout_name, plan, {'layout': variant_time if i == 0 else 0.0, 'elapsed': time.perf_counter() - start}
+
+
+def _anneal_plans_iter(width, length, settings, table, should_cancel, integrity, time_budget, seed, start):
+    """generate_plans_iter for mode="anneal": each annealable recipe with optimized split positions."""
+    from plan_optimizer import ANNEAL_LAYOUTS, anneal_layout
+    for i, layout_name in enumerate(ANNEAL_LAYOUTS):
+        layout_start = time.perf_counter()
+        budget = max(0.0, (start + time_budget - layout_start) / (len(ANNEAL_LAYOUTS) - i))
+        with plan_trace.span("anneal", layout=layout_name, plan=i + 1) as span:
+            plan, report = anneal_layout(width, length, settings, layout_name, time_budget=budget, seed=seed,
+                                         should_cancel=should_cancel)
+            span.set(**{k: v for k, v in report.items() if k != 'history'})
+        if report['stopped'] == "cancelled":
+            raise GenerationCancelled(f"Cancelled while annealing plan {i+1}")
+        if not plan:
+            plan_trace.count("empty_plan", layout=layout_name)
+            plan = Plan([_error_room(f'نقشه {i+1} {PERSIAN_NAMES["Error"]} - بدون اتاق معتبر', width, length)],
+                        layout=layout_name)
+            plan.derived['anneal'] = report
+        plan = _finish_plan(plan, layout_name, width, length, settings, table, integrity)
+        now = time.perf_counter()
+        yield i, layout_name, plan, {'layout': now - layout_start, 'elapsed': now - start}
+
+
+def plan_count(mode="fixed", top_k=None):
+    """Number of plans generate_plans yields in `mode` (an upper bound for "search" and "variants")."""
+    if mode == "fixed":
+        return NUM_PLANS
+    if mode == "anneal":
+        from plan_optimizer import ANNEAL_LAYOUTS
+        return len(ANNEAL_LAYOUTS)
+    if mode == "variants":
+        from plan_variants import DEFAULT_VARIANTS
+        return len(LAYOUT_NAMES) + (top_k if top_k is not None else DEFAULT_VARIANTS)
+    from plan_search import DEFAULT_TOP_K
+    return top_k if top_k is not None else DEFAULT_TOP_K
+
+
+def generate_plans_iter(width, length, settings, table=False, should_cancel=None, integrity=None,
+                        mode="fixed", top_k=None, time_budget=1.0, seed=0):
     """
-    Generates 3 different plan layouts based on house dimensions and settings.
+    Generates the plan layouts one at a time, yielding (index, layout_name, plan, timings)
+    as soon as each plan is ready. In the default "fixed" mode, always yields exactly
+    NUM_PLANS plans; failed layouts yield an error plan. `timings` holds 'layout'
+    (seconds spent on this plan) and 'elapsed' (seconds since the call started).
+    See generate_plans for the other arguments.
     """
-    num_plans_to_generate = 3
+    start = time.perf_counter()
+    settings = compile_settings(settings)
     min_dim_req = settings['min_room_dim'] * 1.5
     if width < min_dim_req or length < min_dim_req:
-        print(f"Warning: House dimensions ({width}x{length}) are very small.")
-        error_rect = Rect(0,0,width,length)
-        error_room = {'name': PERSIAN_NAMES["Error"] + " - مساحت خیلی کوچک", 'rect': error_rect, 'color':_get_room_color('Error')}
-        return [[error_room]] * num_plans_to_generate
-
+        plan_trace.count("too_small")
+        plan_trace.note(f"House dimensions ({width}x{length}) are very small.")
+        error_room = _error_room(PERSIAN_NAMES["Error"] + " - مساحت خیلی کوچک", width, length)
+        if mode == "fixed":
+            layout_names = LAYOUT_NAMES[:NUM_PLANS]
+        elif mode == "anneal":
+            from plan_optimizer import ANNEAL_LAYOUTS
+            layout_names = ANNEAL_LAYOUTS
+        else:
+            layout_names = [mode]
+        for i, layout_name in enumerate(layout_names):
+            plan = _finish_plan([error_room], layout_name, width, length, settings, table, integrity)
+            yield i, layout_name, plan, {'layout': 0.0, 'elapsed': time.perf_counter() - start}
+        return
+    if mode == "search":
+        yield from _search_plans_iter(width, length, settings, table, should_cancel, integrity,
+                                      top_k, time_budget, start)
+        return
+    if mode == "variants":
+        yield from _variant_plans_iter(width, length, settings, table, should_cancel, integrity,
+                                       top_k, seed, start)
+        return
+    if mode == "anneal":
+        yield from _anneal_plans_iter(width, length, settings, table, should_cancel, integrity,
+                                      time_budget, seed, start)
+        return
+    if mode != "fixed":
+        raise ValueError(f"Unknown generation mode '{mode}'")
+
+    for i in range(NUM_PLANS):
+        if should_cancel is not None and should_cancel():
+            raise GenerationCancelled(f"Cancelled before plan {i+1}")
+        layout_start = time.perf_counter()
+        if i >= len(LAYOUT_FUNCTIONS):
+            plan_name = "missing"
+            validated_plan = [_error_room(f'نقشه {i+1} {PERSIAN_NAMES["Error"]} تولید نشده', width, length)]
+        else:
+            func = LAYOUT_FUNCTIONS[i]
+            plan_name = LAYOUT_NAMES[i]
+            try:
+                with plan_trace.span("layout", layout=plan_name, plan=i + 1) as span:
+                    # add_room only keeps rooms that passed check_room_validity, so no second pass is needed
+                    validated_plan = func(width, length, settings)
+                    span.set(rooms=len(validated_plan))
+                plan_trace.count("rooms_kept", len(validated_plan), layout=plan_name)
+
+                if not validated_plan:
+                     plan_trace.count("empty_plan", layout=plan_name)
+                     validated_plan = [_error_room(f'نقشه {i+1} {PERSIAN_NAMES["Error"]} - بدون اتاق معتبر', width, length)]
+
+            except Exception as e:
+                plan_trace.error(f"ERROR generating Plan {i+1} ({plan_name}): {e}", exc_info=True)
+                validated_plan = [_error_room(f'نقشه {i+1} {PERSIAN_NAMES["Error"]} اجرایی', width, length)]
+
+        plan = _finish_plan(validated_plan, plan_name, width, length, settings, table, integrity)
+        now = time.perf_counter()
+        yield i, plan_name, plan, {'layout': now - layout_start, 'elapsed': now - start}
+
+
+def generate_plans(width, length, settings, table=False, should_cancel=None, progress=None, integrity=None,
+                   mode="fixed", top_k=None, time_budget=1.0, scores=False, seed=0):
+    """
+    Generates 3 different plan layouts based on house dimensions and settings.
+    `settings` may be a plain dict or a CompiledSettings; dicts are compiled once here.
+    Each plan is a Plan (a list of room dicts), or a compact RoomTable with table=True.
+    `should_cancel()` is polled before each layout (GenerationCancelled is raised when it
+    returns True) and `progress(done, total)` is called after each layout.
+    integrity="report" attaches an IntegrityReport (overlapping rooms, uncovered area) to
+    each plan's `integrity`; integrity="reject" also replaces plans that fail the check
+    (settings['max_uncovered_fraction'] sets the allowed uncovered share) with an error plan.
+    mode="search" replaces the three fixed layouts with plan_search: up to `top_k` plans
+    (default plan_search.DEFAULT_TOP_K), best first, found within `time_budget` seconds
+    (search scores in plan.derived).
+    mode="variants" yields the fixed layouts followed by up to `top_k` (default
+    plan_variants.DEFAULT_VARIANTS) distinct plan_variants variants of them (jittered
+    split ratios and orientation), reproducible for a given `seed`.
+    mode="anneal" optimizes the split positions of the simple_split and open_concept
+    layouts with plan_optimizer, sharing `time_budget` seconds (report in plan.derived).
+    Every plan exposes `plan.scores` (plan_scoring, needs NumPy) lazily; scores=True
+    computes them for all plans in one batch up front.
+    """
     plans = []
-    # Updated list of layout functions
-    layout_functions = [
-        _generate_layout_simple_split,
-        _generate_layout_open_concept,
-        _generate_layout_l_shape_living,
-    ]
-
-    for i, func in enumerate(layout_functions):
-        plan_name = func.__name__.replace("_generate_layout_", "")
-        print(f"\n--- Generating Plan {i+1} ({plan_name}) ---")
-        try:
-            plan = func(width, length, settings)
-            # Final validation pass
-            validated_plan = [room for room in plan if check_room_validity(room, settings)]
-
-            if not validated_plan:
-                 print(f"  Warning: Plan {i+1} resulted in no valid rooms after validation.")
-                 validated_plan = [{'name': f'نقشه {i+1} {PERSIAN_NAMES["Error"]} - بدون اتاق معتبر', 'rect': Rect(0,0,width,length), 'color':_get_room_color('Error')}]
-            plans.append(validated_plan)
-            print(f"  Plan {i+1} generated with {len(validated_plan)} valid room(s).")
-
-        except Exception as e:
-            print(f"  ERROR generating Plan {i+1} ({plan_name}): {e}")
-            import traceback
-            traceback.print_exc()
-            plans.append([{'name': f'نقشه {i+1} {PERSIAN_NAMES["Error"]} اجرایی', 'rect': Rect(0,0,width,length), 'color':_get_room_color('Error')}])
-
-    # Final check
-    for i, plan in enumerate(plans):
-        if not plan:
-             plans[i] = [{'name': f'نقشه {i+1} {PERSIAN_NAMES["Error"]} تولید ناموفق', 'rect': Rect(0,0,width,length), 'color':_get_room_color('Error')}]
-
-    # Ensure exactly num_plans_to_generate plans are returned
-    while len(plans) < num_plans_to_generate:
-        plans.append([{'name': f'نقشه {len(plans)+1} {PERSIAN_NAMES["Error"]} تولید نشده', 'rect': Rect(0,0,width,length), 'color':_get_room_color('Error')}])
-
-    return plans[:num_plans_to_generate] # Return only the required number
\ No newline at end of file
+    total = plan_count(mode, top_k)
+    for i, _, plan, _ in generate_plans_iter(width, length, settings, table, should_cancel, integrity,
+                                             mode, top_k, time_budget, seed):
+        plans.append(plan)
+        if progress is not None:
+            progress(i + 1, total)
+    if scores:
+        from plan_scoring import attach_scores
+        with plan_trace.span("scores", plans=len(plans)):
+            attach_scores(plans, width, length)
+    return plans
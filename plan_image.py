@@ -0,0 +1,312 @@
+"""
+Off-screen rendering of house plans into Pillow images (no Tk display needed).
+
+`ImageCanvas` implements the handful of canvas calls `PlanRenderer` uses, so the
+images reproduce `draw_plan` exactly: same layout, room fills, legend from
+ROOM_COLOR_GUIDE, scale bar and Persian labels. `export_batch` renders plan
+thumbnails for many lot sizes across a process pool.
+
+Usage:
+    python -m plan_image lots.csv --out-dir thumbs --size 320x240
+    python -m plan_image 10x15 8.5x12 --out-dir brochure --size 1600x1200 --workers 4
+
+Requires Pillow and a TrueType font with Persian glyphs (DejaVu Sans, or --font).
+Unless Pillow is built with libraqm, the labels are shaped with arabic_reshaper
+and python-bidi (pip install Pillow arabic-reshaper python-bidi); rendering
+refuses to start when the labels cannot be drawn joined and right-to-left.
+"""
+import argparse
+import contextlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, features
+except ImportError: # Pillow is optional for the GUI; only this module needs it
+    Image = None
+
+from plan_drawer import PlanRenderer, DEFAULT_FONT, PERSIAN_FONT
+from plan_generator import generate_plans_iter, compile_settings
+from plan_batch import DEFAULT_SETTINGS, iter_dimensions, load_settings, parse_dimension
+
+DEFAULT_IMAGE_SIZE = (800, 600)
+DEFAULT_THUMBNAIL_SIZE = (320, 240)
+BACKGROUND_COLOR = "white" # Same as the canvas in main.py
+
+# Font files tried for each Tk font family (found on the Pillow/FreeType search path)
+FONT_FILES = {
+    "DejaVu Sans": ["DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"],
+    "Tahoma": ["tahoma.ttf", "DejaVuSans.ttf"],
+    "Arial": ["arial.ttf", "DejaVuSans.ttf"],
+}
+
+# Letters drawn to check that a font covers Persian (joining and Persian-only forms)
+PERSIAN_GLYPHS = "اتقخپگی"
+
+# Tk anchor -> Pillow text anchor
+_TEXT_ANCHORS = {"center": "mm", "n": "mt", "s": "ms", "e": "rm", "w": "lm",
+                 "ne": "rt", "nw": "lt", "se": "rs", "sw": "ls"}
+
+
+def _require_pillow():
+    if Image is None:
+        raise RuntimeError("Pillow is required for image export (pip install Pillow)")
+
+
+@lru_cache(maxsize=None)
+def _load_font(family, size_pt, font_path=None):
+    """FreeType font for a Tk (family, points) spec; falls back to Pillow's built-in font."""
+    size_px = max(1, round(size_pt * 96 / 72)) # Tk point sizes at 96 dpi
+    candidates = [font_path] if font_path else []
+    candidates += FONT_FILES.get(family, []) + FONT_FILES[DEFAULT_FONT]
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size_px)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size_px)
+    except TypeError: # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=None)
+def _has_raqm():
+    return features.check("raqm")
+
+
+def _shape_text(text):
+    """
+    Prepares RTL text for drawing. With libraqm Pillow shapes it itself; otherwise
+    arabic_reshaper + python-bidi are used when installed, else the text is drawn as is.
+    """
+    if _has_raqm() or text.isascii():
+        return text
+    try:
+        import arabic_reshaper
+        from bidi.algorithm import get_display
+    except ImportError:
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def _glyph_pixels(font, char):
+    size = max(8, int(getattr(font, 'size', 10)) * 2)
+    image = Image.new("L", (size, size))
+    ImageDraw.Draw(image).text((0, 0), char, fill=255, font=font)
+    return image.tobytes()
+
+
+@lru_cache(maxsize=None)
+def check_persian_labels(font_path=None):
+    """
+    Raises RuntimeError unless Persian labels can be drawn correctly: the text has to
+    be shaped (libraqm, or arabic_reshaper + python-bidi) and the label font has to
+    have Persian glyphs. A passing check is cached per font.
+    """
+    _require_pillow()
+    if not _has_raqm():
+        try:
+            import arabic_reshaper # noqa: F401
+            import bidi.algorithm # noqa: F401
+        except ImportError:
+            raise RuntimeError("Persian labels need libraqm or arabic_reshaper + python-bidi "
+                               "(pip install arabic-reshaper python-bidi)") from None
+    font = _load_font(PERSIAN_FONT, 9, font_path)
+    if isinstance(font, ImageFont.FreeTypeFont):
+        missing = _glyph_pixels(font, "\U0010fffd") # Unassigned: drawn as the font's missing-glyph box
+        if all(_glyph_pixels(font, char) != missing for char in PERSIAN_GLYPHS):
+            return
+    raise RuntimeError(f"No font with Persian glyphs for the labels "
+                       f"({font_path or PERSIAN_FONT} not usable); pass one with --font")
+
+
+class ImageCanvas:
+    """
+    Minimal stand-in for tk.Canvas that records the items PlanRenderer creates
+    and paints them onto a Pillow image.
+    """
+    def __init__(self, width, height, background=BACKGROUND_COLOR, font_path=None):
+        self.width = int(width)
+        self.height = int(height)
+        self.background = background
+        self.font_path = font_path
+        self._items = {}
+        self._next_id = 1
+
+    # --- tk.Canvas subset used by PlanRenderer ---
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def update_idletasks(self):
+        pass
+
+    def delete(self, tag):
+        if tag == "all":
+            self._items.clear()
+        else:
+            self._items = {i: item for i, item in self._items.items() if tag not in item[2].get("tags", ())}
+
+    def _create(self, kind, coords, options):
+        item_id = self._next_id
+        self._next_id += 1
+        self._items[item_id] = (kind, list(coords), options)
+        return item_id
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def _select(self, tag_or_id):
+        if tag_or_id in self._items:
+            return [tag_or_id]
+        return [i for i, item in self._items.items() if tag_or_id in item[2].get("tags", ())]
+
+    def coords(self, tag_or_id, *coords):
+        for i in self._select(tag_or_id):
+            self._items[i][1][:] = coords
+
+    def itemconfigure(self, tag_or_id, **options):
+        for i in self._select(tag_or_id):
+            self._items[i][2].update(options)
+
+    # --- Painting ---
+    def to_image(self):
+        """Paints the visible items, in creation order, onto a new RGB image."""
+        _require_pillow()
+        image = Image.new("RGB", (self.width, self.height), self.background)
+        draw = ImageDraw.Draw(image)
+        for kind, coords, options in self._items.values():
+            if options.get("state") == "hidden":
+                continue
+            if kind == "rectangle":
+                x0, y0, x1, y1 = coords
+                width = round(options.get("width", 1))
+                outline = options.get("outline", "black") or None
+                grow = (width - 1) / 2 if outline and width > 1 else 0 # Tk centres the outline on the edge
+                draw.rectangle((min(x0, x1) - grow, min(y0, y1) - grow, max(x0, x1) + grow, max(y0, y1) + grow),
+                               fill=options.get("fill") or None, outline=outline if width else None,
+                               width=width or 1)
+            elif kind == "line":
+                draw.line(coords, fill=options.get("fill", "black"), width=max(1, round(options.get("width", 1))))
+            else:
+                family, size = options.get("font", (DEFAULT_FONT, 9))[:2]
+                draw.text(tuple(coords), _shape_text(options.get("text", "")), fill=options.get("fill", "black"),
+                          font=_load_font(family, size, self.font_path),
+                          anchor=_TEXT_ANCHORS.get(options.get("anchor", "center"), "mm"))
+        return image
+
+
+def render_plan_image(plan_data, house_width_m, house_length_m, settings, size=DEFAULT_IMAGE_SIZE,
+                      background=BACKGROUND_COLOR, font_path=None):
+    """
+    Renders a plan like `draw_plan` on a canvas of `size` (width, height) pixels; returns a PIL Image.
+    Raises RuntimeError if Persian labels cannot be drawn (see check_persian_labels).
+    """
+    check_persian_labels(font_path)
+    canvas = ImageCanvas(size[0], size[1], background, font_path)
+    PlanRenderer(canvas).rebuild(plan_data, house_width_m, house_length_m, settings)
+    return canvas.to_image()
+
+
+def _export_one(job):
+    """
+    Worker entry point: generates the plans for one lot and saves each as an image.
+    Returns (index, [written paths], error message or None).
+    """
+    index, width, length, settings, out_dir, size, image_format, font_path = job
+    paths = []
+    try:
+        for plan_index, _, plan, _ in generate_plans_iter(width, length, settings):
+            path = os.path.join(out_dir, f"lot{index:05d}_plan{plan_index + 1}.{image_format}")
+            render_plan_image(plan, width, length, settings, size, font_path=font_path).save(path)
+            paths.append(path)
+    except Exception as e:
+        return index, paths, str(e)
+    return index, paths, None
+
+
+def _init_worker():
+    """Pool initializer: silences per-lot progress chatter."""
+    sys.stdout = open(os.devnull, "w")
+
+
+def iter_export(dimensions, out_dir, settings=None, size=DEFAULT_THUMBNAIL_SIZE, workers=None, chunksize=16,
+                image_format="png", font_path=None):
+    """
+    Renders every plan for each (width, length) pair in `dimensions` into `out_dir`
+    as lot<index>_plan<n>.<format>. Yields (index, paths, error) per lot, in input order.
+    workers=1 runs in-process (no pool). Raises RuntimeError before any work starts
+    if Persian labels cannot be drawn (see check_persian_labels).
+    """
+    check_persian_labels(font_path)
+    os.makedirs(out_dir, exist_ok=True)
+    settings = compile_settings(settings if settings is not None else DEFAULT_SETTINGS)
+    jobs = ((i, float(w), float(l), settings, out_dir, tuple(size), image_format, font_path)
+            for i, (w, l) in enumerate(dimensions))
+
+    if workers == 1:
+        with open(os.devnull, "w") as devnull:
+            for job in jobs:
+                with contextlib.redirect_stdout(devnull):
+                    result = _export_one(job)
+                yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(_export_one, jobs, chunksize=chunksize)
+
+
+def export_batch(dimensions, out_dir, settings=None, size=DEFAULT_THUMBNAIL_SIZE, workers=None, chunksize=16,
+                 image_format="png", font_path=None):
+    """Runs iter_export to completion. Returns (images written, lots that failed)."""
+    written = failed = 0
+    for index, paths, error in iter_export(dimensions, out_dir, settings, size, workers, chunksize,
+                                           image_format, font_path):
+        written += len(paths)
+        if error is not None:
+            failed += 1
+            print(f"Lot {index}: {error}", file=sys.stderr)
+    return written, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m plan_image",
+                                     description="Render house plan images for many lot sizes without the GUI.")
+    parser.add_argument("inputs", nargs="+",
+                        help="CSV files of width,length rows ('-' for stdin) and/or WIDTHxLENGTH values")
+    parser.add_argument("--out-dir", required=True, help="Directory for the rendered images")
+    parser.add_argument("--settings", help="JSON file with generation settings (defaults are used for missing keys)")
+    parser.add_argument("--size", default="x".join(map(str, DEFAULT_THUMBNAIL_SIZE)),
+                        help="Image size in pixels as WIDTHxHEIGHT")
+    parser.add_argument("--format", default="png", help="Image file format/extension (png, jpg, webp, ...)")
+    parser.add_argument("--font", help="TrueType font file with Persian glyphs for the labels")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 1 = in-process)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Lots sent to a worker per task")
+    args = parser.parse_args(argv)
+
+    try:
+        size = tuple(int(v) for v in parse_dimension(args.size))
+        settings = load_settings(args.settings)
+        written, failed = export_batch(iter_dimensions(args.inputs), args.out_dir, settings, size, args.workers, args.chunksize,
+                                       args.format.lower().lstrip("."), args.font)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {written} image(s) to {args.out_dir}" + (f", {failed} lot(s) failed." if failed else "."),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
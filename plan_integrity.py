@@ -0,0 +1,255 @@
+"""
+Plan integrity checks: overlapping rooms and uncovered house area.
+
+Both checks are plane sweeps over the room rectangles in x, so a plan with n
+rooms is checked in O(n log n) (plus the number of overlapping pairs) instead
+of comparing every pair of rooms:
+  * overlaps: rooms entering the sweep look up the active rooms whose y range
+    meets theirs in an interval tree over the distinct y coordinates (plans of
+    up to PAIRWISE_MAX_ROOMS rooms are compared pairwise, which is faster at
+    that size);
+  * coverage: the union area of the rooms is measured with a segment tree over
+    the same coordinates.
+
+Works on any plan whose rooms expose a 'rect' (room-dict lists, Plan, RoomTable).
+"""
+AREA_TOLERANCE = 1e-6 # m², overlaps smaller than this are numerical noise
+DEFAULT_MAX_UNCOVERED_FRACTION = 0.25
+PAIRWISE_MAX_ROOMS = 16 # Below this the interval tree costs more than it saves
+_EPS = 1e-9
+
+
+class IntegrityReport:
+    """
+    Result of check_plan_integrity.
+    `overlaps` holds (i, j, area, nested) tuples with i < j room indices; `nested`
+    is True when one room lies completely inside the other (e.g. a kitchen drawn
+    on top of the living room).
+    """
+    __slots__ = ('overlaps', 'house_area', 'covered_area', 'outside_area')
+
+    def __init__(self, overlaps, house_area, covered_area, outside_area):
+        self.overlaps = overlaps
+        self.house_area = house_area
+        self.covered_area = covered_area
+        self.outside_area = outside_area
+
+    @property
+    def uncovered_area(self):
+        return max(0.0, self.house_area - self.covered_area)
+
+    @property
+    def uncovered_fraction(self):
+        return self.uncovered_area / self.house_area if self.house_area > 0 else 0.0
+
+    @property
+    def partial_overlaps(self):
+        return [o for o in self.overlaps if not o[3]]
+
+    def is_ok(self, allow_nested=True, max_uncovered_fraction=DEFAULT_MAX_UNCOVERED_FRACTION):
+        """True if the plan has no (partial) overlaps, no rooms outside the house and little uncovered area."""
+        overlaps = self.partial_overlaps if allow_nested else self.overlaps
+        return (not overlaps and self.outside_area <= AREA_TOLERANCE
+                and self.uncovered_fraction <= max_uncovered_fraction)
+
+    def as_dict(self):
+        return {'overlaps': [{'rooms': [i, j], 'area': round(area, 6), 'nested': nested}
+                             for i, j, area, nested in self.overlaps],
+                'uncovered_area': round(self.uncovered_area, 6),
+                'outside_area': round(self.outside_area, 6),
+                'ok': self.is_ok()}
+
+    def __repr__(self):
+        return (f"IntegrityReport(overlaps={len(self.overlaps)}, uncovered={self.uncovered_area:.3f}m², "
+                f"outside={self.outside_area:.3f}m²)")
+
+
+def _room_rects(plan):
+    """(index, x0, y0, x1, y1) of every room with a positive-area rect; indices follow the plan order."""
+    rects = []
+    for i, room in enumerate(plan):
+        rect = room.get('rect')
+        if rect and rect.w > 0 and rect.h > 0:
+            rects.append((i, rect.x, rect.y, rect.x + rect.w, rect.y + rect.h))
+    return rects
+
+
+class _ActiveRooms:
+    """
+    Interval tree of the rooms crossed by the sweep line, over the distinct y
+    coordinates. A room is stored at the O(log n) nodes that make up its y range
+    (for stabbing queries) and counted along the path to the leaf of its top
+    edge (for finding rooms that start inside a range).
+    """
+    __slots__ = ('n', 'covering', 'starts', 'start_count')
+
+    def __init__(self, n):
+        self.n = n
+        self.covering = {} # node -> rooms whose y range covers the node's range
+        self.starts = {} # leaf -> rooms whose top edge is that leaf
+        self.start_count = [0] * (4 * n)
+
+    def _cover(self, node, lo, hi, a, b, k, add):
+        if b <= lo or hi <= a:
+            return
+        if a <= lo and hi <= b:
+            if add:
+                self.covering.setdefault(node, set()).add(k)
+            else:
+                self.covering[node].discard(k)
+            return
+        mid = (lo + hi) // 2
+        self._cover(2 * node, lo, mid, a, b, k, add)
+        self._cover(2 * node + 1, mid, hi, a, b, k, add)
+
+    def update(self, a, b, k, add):
+        """Adds (or removes) room k spanning the elementary y intervals [a, b)."""
+        self._cover(1, 0, self.n, a, b, k, add)
+        node, lo, hi = 1, 0, self.n
+        while True:
+            self.start_count[node] += 1 if add else -1
+            if hi - lo == 1:
+                break
+            mid = (lo + hi) // 2
+            node, lo, hi = (2 * node, lo, mid) if a < mid else (2 * node + 1, mid, hi)
+        if add:
+            self.starts.setdefault(a, set()).add(k)
+        else:
+            self.starts[a].discard(k)
+
+    def stab(self, a):
+        """Rooms whose y range contains elementary interval a."""
+        found = []
+        node, lo, hi = 1, 0, self.n
+        while True:
+            found.extend(self.covering.get(node, ()))
+            if hi - lo == 1:
+                return found
+            mid = (lo + hi) // 2
+            node, lo, hi = (2 * node, lo, mid) if a < mid else (2 * node + 1, mid, hi)
+
+    def starting_in(self, a, b, node=1, lo=0, hi=None, found=None):
+        """Rooms whose top edge is one of the elementary intervals [a, b)."""
+        if hi is None:
+            hi, found = self.n, []
+        if b <= lo or hi <= a or not self.start_count[node]:
+            return found
+        if hi - lo == 1:
+            found.extend(self.starts[lo])
+            return found
+        mid = (lo + hi) // 2
+        self.starting_in(a, b, 2 * node, lo, mid, found)
+        return self.starting_in(a, b, 2 * node + 1, mid, hi, found)
+
+
+def _overlap(a, b):
+    """(i, j, area, nested) if rects a and b intersect by more than AREA_TOLERANCE, else None."""
+    i, ax0, ay0, ax1, ay1 = a
+    j, bx0, by0, bx1, by1 = b
+    dx, dy = min(ax1, bx1) - max(ax0, bx0), min(ay1, by1) - max(ay0, by0)
+    if dx <= 0 or dy <= 0 or dx * dy <= AREA_TOLERANCE:
+        return None
+    nested = ((ax0 <= bx0 + _EPS and ay0 <= by0 + _EPS and ax1 >= bx1 - _EPS and ay1 >= by1 - _EPS) or
+              (bx0 <= ax0 + _EPS and by0 <= ay0 + _EPS and bx1 >= ax1 - _EPS and by1 >= ay1 - _EPS))
+    return min(i, j), max(i, j), dx * dy, nested
+
+
+def find_overlaps(rects):
+    """
+    Sweep-line overlap search over (index, x0, y0, x1, y1) rects.
+    Returns (i, j, area, nested) for each pair whose intersection exceeds AREA_TOLERANCE.
+    """
+    if len(rects) <= PAIRWISE_MAX_ROOMS:
+        overlaps = []
+        for k, rect in enumerate(rects):
+            for other in rects[k + 1:]:
+                overlap = _overlap(rect, other)
+                if overlap:
+                    overlaps.append(overlap)
+        overlaps.sort()
+        return overlaps
+    ys = sorted({y for _, _, y0, _, y1 in rects for y in (y0, y1)})
+    if len(ys) < 2:
+        return []
+    y_index = {y: i for i, y in enumerate(ys)}
+    # Ends sort before starts at the same x, so rooms that only touch never meet
+    events = sorted([(x0, 1, k) for k, (_, x0, _, _, _) in enumerate(rects)] +
+                    [(x1, 0, k) for k, (_, _, _, x1, _) in enumerate(rects)])
+    active = _ActiveRooms(len(ys) - 1)
+    overlaps = []
+    for _, is_start, k in events:
+        rect = rects[k]
+        a, b = y_index[rect[2]], y_index[rect[4]]
+        if not is_start:
+            active.update(a, b, k, False)
+            continue
+        # A room meets this one if its y range contains y0 or starts strictly inside (y0, y1)
+        for m in active.stab(a) + active.starting_in(a + 1, b):
+            overlap = _overlap(rect, rects[m])
+            if overlap:
+                overlaps.append(overlap)
+        active.update(a, b, k, True)
+    overlaps.sort()
+    return overlaps
+
+
+def room_overlaps(plan):
+    """Overlapping room pairs of a plan as (i, j, area, nested) tuples (see find_overlaps)."""
+    return find_overlaps(_room_rects(plan))
+
+
+def union_area(rects):
+    """Area covered by the union of (index, x0, y0, x1, y1) rects (segment-tree sweep)."""
+    if not rects:
+        return 0.0
+    ys = sorted({y for _, _, y0, _, y1 in rects for y in (y0, y1)})
+    n = len(ys) - 1
+    if n <= 0:
+        return 0.0
+    y_index = {y: i for i, y in enumerate(ys)}
+    count = [0] * (4 * n)
+    covered = [0.0] * (4 * n)
+
+    def update(node, lo, hi, a, b, delta):
+        if b <= lo or hi <= a:
+            return
+        if a <= lo and hi <= b:
+            count[node] += delta
+        else:
+            mid = (lo + hi) // 2
+            update(2 * node, lo, mid, a, b, delta)
+            update(2 * node + 1, mid, hi, a, b, delta)
+        if count[node] > 0:
+            covered[node] = ys[hi] - ys[lo]
+        elif hi - lo == 1:
+            covered[node] = 0.0
+        else:
+            covered[node] = covered[2 * node] + covered[2 * node + 1]
+
+    events = sorted([(x0, 1, y0, y1) for _, x0, y0, _, y1 in rects] +
+                    [(x1, -1, y0, y1) for _, _, y0, x1, y1 in rects])
+    area = 0.0
+    prev_x = events[0][0]
+    for x, delta, y0, y1 in events:
+        area += covered[1] * (x - prev_x)
+        prev_x = x
+        update(1, 0, n, y_index[y0], y_index[y1], delta)
+    return area
+
+
+def check_plan_integrity(plan, house_w, house_l):
+    """Returns an IntegrityReport with the overlapping room pairs and the covered/uncovered house area."""
+    rects = _room_rects(plan)
+    clipped = []
+    inside_area = 0.0
+    total_area = 0.0
+    for i, x0, y0, x1, y1 in rects:
+        total_area += (x1 - x0) * (y1 - y0)
+        cx0, cy0, cx1, cy1 = max(x0, 0.0), max(y0, 0.0), min(x1, house_w), min(y1, house_l)
+        if cx1 > cx0 and cy1 > cy0:
+            clipped.append((i, cx0, cy0, cx1, cy1))
+            inside_area += (cx1 - cx0) * (cy1 - cy0)
+    return IntegrityReport(overlaps=find_overlaps(rects),
+                           house_area=house_w * house_l,
+                           covered_area=union_area(clipped),
+                           outside_area=max(0.0, total_area - inside_area))
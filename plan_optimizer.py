@@ -0,0 +1,303 @@
+"""
+Simulated-annealing optimizer for the split positions of the layout recipes.
+
+The simple_split and open_concept recipes are rebuilt as explicit split trees
+(the same cuts, rooms and ratios as the recipe functions, so the starting
+plan is the recipe's plan, except on lots too small for the recipe's open
+and private areas, where the recipe falls back to unallocated space). Every inner node cuts its rect at `ratio`, every
+leaf is a room. A move perturbs the ratio of one split; only the rooms of
+that split's subtree change size, so only they are re-validated
+(check_room_validity) and re-scored, once per move: an accepted move reuses
+the sizes and costs computed for the proposal, and the cached costs of the
+ancestors are re-summed from their children, so they never drift. The plan cost is the sum of the
+room costs used by plan_search (area deviation from the PROPORTIONS_GENERAL
+target share, aspect ratio above ASPECT_FREE) plus INVALID_ROOM_COST for
+every room that fails validation; invalid rooms are left out of the final
+plan, as add_room does in the recipes.
+
+Moves are accepted with the Metropolis rule under a geometric cooling
+schedule over the iteration or time budget, whichever runs out first. The
+run stops early once the best cost has not improved for `patience` moves.
+"""
+import math
+import random
+import time
+
+from plan_generator import (LAYOUT_RATIOS, PROPORTIONS_GENERAL, ROOM_TYPES_BY_KEY, Plan, Rect, add_room,
+                            check_room_validity, compile_settings)
+from plan_search import AREA_WEIGHT, ASPECT_FREE, ASPECT_WEIGHT
+
+ANNEAL_LAYOUTS = ("simple_split", "open_concept")
+INVALID_ROOM_COST = 2.0 # Added per room that fails validation
+RATIO_BOUNDS = (0.05, 0.95)
+MAX_STEP = 0.1 # Standard deviation of a ratio move at the initial temperature
+MIN_STEP = 0.005
+INITIAL_TEMPERATURE = 0.05 # Times the initial plan cost
+FINAL_TEMPERATURE = 1e-3 # Times the initial temperature
+DEFAULT_ITERATIONS = 20000
+DEFAULT_PATIENCE = 5000
+
+
+class _Node:
+    """Split-tree node: a split (vertical/horizontal cut at `ratio`) or a room leaf."""
+    __slots__ = ('vertical', 'ratio', 'a', 'b', 'parent', 'room', 'target', 'w', 'h', 'cost')
+
+    def __init__(self, vertical=False, ratio=0.5, a=None, b=None, room=None):
+        self.vertical = vertical
+        self.ratio = ratio
+        self.a = a
+        self.b = b
+        self.parent = None
+        self.room = room # (registry key, name suffix, PROPORTIONS_GENERAL keys, share factor)
+        self.target = 0.0
+        self.w = self.h = self.cost = 0.0
+
+    def leaves(self):
+        if self.room is not None:
+            yield self
+        else:
+            yield from self.a.leaves()
+            yield from self.b.leaves()
+
+    def splits(self):
+        if self.room is None:
+            yield self
+            yield from self.a.splits()
+            yield from self.b.splits()
+
+
+def _room(type_key, suffix="", keys=None, factor=1.0):
+    return _Node(room=(type_key, suffix, keys or (type_key,), factor))
+
+
+def _split(vertical, ratio, a, b):
+    return _Node(vertical, ratio, a, b)
+
+
+def _simple_split_tree(house_w, house_l, settings, r):
+    """Split tree of _generate_layout_simple_split (including its one-bedroom and bathroom-only fallbacks)."""
+    if house_l * r['bedrooms_h'] < settings['min_room_dim'] * 1.1 * 1.5:
+        bedrooms = _room("Master Bedroom", keys=("Master Bedroom", "Bedroom 2"))
+    else:
+        bedrooms = _split(True, r['bedroom_split'], _room("Bedroom", " ۱", ("Master Bedroom",)),
+                          _room("Bedroom", " ۲", ("Bedroom 2",)))
+    if house_w * (1 - r['living_w']) * r['bath_split'] >= settings['min_bath_dim']:
+        baths = _split(True, r['bath_split'], _room("Bathroom"), _room("Balcony"))
+    else:
+        baths = _room("Bathroom", keys=("Bathroom", "Balcony"))
+    # The recipe cuts the private area in three; the hallway is the first part of what the bedrooms leave
+    rest = _split(False, r['hallway_h'] / (1 - r['bedrooms_h']), _room("Hallway/Corridor"), baths)
+    return _split(True, r['living_w'],
+                  _split(False, r['living_h'], _room("Living Room"), _room("Kitchen")),
+                  _split(False, r['bedrooms_h'], bedrooms, rest))
+
+
+def _open_concept_tree(house_w, house_l, settings, r):
+    """Split tree of _generate_layout_open_concept for the orientation the recipe picks."""
+    is_wide = house_w > house_l * 1.2
+    if is_wide:
+        bedrooms_w = baths_w = house_w * (1 - r['open'])
+    else:
+        bedrooms_w, baths_w = house_w * r['bedrooms'], house_w * (1 - r['bedrooms'])
+    hallway = min(bedrooms_w * 0.15, settings['min_room_dim'] * 1.2)
+    bath_hallway = min(baths_w * 0.15, settings['min_room_dim'] * 1.2)
+    bedrooms = _split(True, 1 - hallway / bedrooms_w if bedrooms_w > 0 else 0.85,
+                      _split(True, r['bedroom_split'], _room("Master Bedroom"),
+                             _room("Bedroom", " ۲", ("Bedroom 2",))),
+                      _room("Hallway/Corridor", " اتاق‌ها", factor=0.5))
+    baths = _split(True, 1 - bath_hallway / baths_w if baths_w > 0 else 0.85,
+                   _split(True, r['bath_split'], _room("Bathroom"), _room("Balcony")),
+                   _room("Service Hallway", keys=("Hallway/Corridor",), factor=0.5))
+    open_area = _split(not is_wide, r['kitchen'], _room("Kitchen", " (باز)"), _room("Living Room", " (باز)"))
+    return _split(is_wide, r['open'], open_area, _split(not is_wide, r['bedrooms'], bedrooms, baths))
+
+
+_TREE_BUILDERS = {"simple_split": _simple_split_tree, "open_concept": _open_concept_tree}
+
+
+class _Annealer:
+    """Split tree with cached subtree sizes and costs."""
+
+    def __init__(self, root, house_w, house_l, settings):
+        self.root = root
+        self.settings = settings
+        self.leaves = list(root.leaves())
+        self.splits = list(root.splits())
+        for node in self.splits:
+            node.a.parent = node.b.parent = node
+        house_area = house_w * house_l
+        shares = [sum(PROPORTIONS_GENERAL[key] for key in leaf.room[2]) * leaf.room[3] for leaf in self.leaves]
+        total_share = sum(shares)
+        for leaf, share in zip(self.leaves, shares):
+            leaf.target = share / total_share * house_area
+        self.room_checks = 0
+        self._proposal = None # (node, ratio, [(subtree node, w, h, cost), ...]) of the last propose()
+        self.layout(root, house_w, house_l)
+
+    def leaf_cost(self, leaf, w, h):
+        self.room_checks += 1
+        rect = Rect(0, 0, w, h)
+        cost = AREA_WEIGHT * abs(w * h - leaf.target) / leaf.target
+        cost += ASPECT_WEIGHT * max(0.0, min(rect.aspect_ratio(), 1e6) - ASPECT_FREE)
+        if not check_room_validity({'rect': rect, 'type': ROOM_TYPES_BY_KEY[leaf.room[0]].id}, self.settings):
+            cost += INVALID_ROOM_COST
+        return cost
+
+    def subtree_cost(self, node, w, h, sizes):
+        """
+        Cost of `node`'s rooms in a w x h rect with the current ratios. The (node, w, h, cost)
+        of every node in the subtree are appended to `sizes`; no cached state is changed.
+        """
+        # Sizes as Rect.split_vertical/split_horizontal compute them, so the recipe's plan is reproduced exactly
+        if node.room is not None:
+            cost = self.leaf_cost(node, w, h)
+        elif node.vertical:
+            a = w * node.ratio
+            cost = self.subtree_cost(node.a, a, h, sizes) + self.subtree_cost(node.b, w - a, h, sizes)
+        else:
+            a = h * node.ratio
+            cost = self.subtree_cost(node.a, w, a, sizes) + self.subtree_cost(node.b, w, h - a, sizes)
+        sizes.append((node, w, h, cost))
+        return cost
+
+    def layout(self, node, w, h):
+        """Re-sizes `node`'s subtree to w x h, caching sizes and costs; returns the subtree cost."""
+        node.w, node.h = w, h
+        if node.room is not None:
+            node.cost = self.leaf_cost(node, w, h)
+        elif node.vertical:
+            a = w * node.ratio
+            node.cost = self.layout(node.a, a, h) + self.layout(node.b, w - a, h)
+        else:
+            a = h * node.ratio
+            node.cost = self.layout(node.a, w, a) + self.layout(node.b, w, h - a)
+        return node.cost
+
+    def propose(self, node, ratio):
+        """
+        Total plan cost if `node`'s ratio were `ratio`. Only `node`'s subtree is re-scored;
+        its sizes and costs are kept for apply() of the same move.
+        """
+        old_ratio, node.ratio = node.ratio, ratio
+        sizes = []
+        cost = self.subtree_cost(node, node.w, node.h, sizes)
+        node.ratio = old_ratio
+        self._proposal = (node, ratio, sizes)
+        # Summed up the tree as layout() and apply() do, so the result equals the cost after apply()
+        child, parent = node, node.parent
+        while parent is not None:
+            cost = cost + parent.b.cost if parent.a is child else parent.a.cost + cost
+            child, parent = parent, parent.parent
+        return cost
+
+    def apply(self, node, ratio):
+        """Sets `node`'s ratio and updates the cached sizes and costs of its subtree and ancestors."""
+        proposal, self._proposal = self._proposal, None
+        node.ratio = ratio
+        if proposal is not None and proposal[0] is node and proposal[1] == ratio:
+            for subtree_node, w, h, cost in proposal[2]:
+                subtree_node.w, subtree_node.h, subtree_node.cost = w, h, cost
+        else:
+            self.layout(node, node.w, node.h)
+        parent = node.parent
+        while parent is not None:
+            parent.cost = parent.a.cost + parent.b.cost
+            parent = parent.parent
+
+    def ratios(self):
+        return [node.ratio for node in self.splits]
+
+    def set_ratios(self, ratios):
+        for node, ratio in zip(self.splits, ratios):
+            node.ratio = ratio
+        self._proposal = None
+        self.layout(self.root, self.root.w, self.root.h)
+
+    def to_plan(self, layout_name):
+        """Plan of the current split positions; rooms that fail validation are left out."""
+        plan = Plan(layout=layout_name)
+        stack = [(self.root, 0.0, 0.0)]
+        while stack:
+            node, x, y = stack.pop()
+            if node.room is not None:
+                add_room(plan, node.room[0], Rect(x, y, node.w, node.h), self.settings, node.room[1])
+            elif node.vertical:
+                stack.append((node.b, x + node.a.w, y))
+                stack.append((node.a, x, y))
+            else:
+                stack.append((node.b, x, y + node.a.h))
+                stack.append((node.a, x, y))
+        return plan
+
+
+def anneal_layout(house_w, house_l, settings, layout_name="simple_split", iterations=DEFAULT_ITERATIONS,
+                  time_budget=None, seed=0, patience=DEFAULT_PATIENCE, should_cancel=None):
+    """
+    Optimizes the split positions of one recipe (ANNEAL_LAYOUTS) for a lot.
+    Runs at most `iterations` moves and `time_budget` seconds (None = no limit).
+    Returns (plan, report): the best plan found (a Plan with the recipe's layout
+    name and the report in plan.derived['anneal']) and a dict with the initial
+    and best cost, move counts, moves per second, why the run stopped
+    ('iterations', 'time', 'converged' or 'cancelled') and `history`, the
+    (iteration, best cost) pairs of every improvement.
+    """
+    if layout_name not in _TREE_BUILDERS:
+        raise ValueError(f"Layout '{layout_name}' cannot be annealed (choose from {', '.join(ANNEAL_LAYOUTS)})")
+    settings = compile_settings(settings)
+    start = time.perf_counter()
+    tree = _TREE_BUILDERS[layout_name](house_w, house_l, settings, LAYOUT_RATIOS[layout_name])
+    state = _Annealer(tree, house_w, house_l, settings)
+    rng = random.Random(seed)
+    lo, hi = RATIO_BOUNDS
+
+    cost = initial_cost = state.root.cost
+    best_cost, best_ratios = cost, state.ratios()
+    history = [(0, best_cost)]
+    t0 = max(1e-6, INITIAL_TEMPERATURE * initial_cost)
+    deadline = None if time_budget is None else start + time_budget
+    accepted = since_best = iteration = 0
+    temperature = t0
+    stopped = "iterations"
+    while iteration < iterations:
+        now = time.perf_counter()
+        if deadline is not None and now >= deadline:
+            stopped = "time"
+            break
+        if since_best >= patience:
+            stopped = "converged"
+            break
+        if should_cancel is not None and iteration % 256 == 0 and should_cancel():
+            stopped = "cancelled"
+            break
+        progress = iteration / iterations
+        if deadline is not None:
+            progress = max(progress, (now - start) / time_budget)
+        temperature = t0 * FINAL_TEMPERATURE ** progress
+        step = max(MIN_STEP, MAX_STEP * math.sqrt(temperature / t0))
+
+        node = state.splits[rng.randrange(len(state.splits))]
+        ratio = min(hi, max(lo, node.ratio + rng.gauss(0.0, step)))
+        new_cost = state.propose(node, ratio)
+        delta = new_cost - cost
+        iteration += 1
+        since_best += 1
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            state.apply(node, ratio)
+            cost = state.root.cost
+            accepted += 1
+            if cost < best_cost - 1e-12:
+                best_cost, best_ratios = cost, state.ratios()
+                history.append((iteration, best_cost))
+                since_best = 0
+
+    state.set_ratios(best_ratios)
+    best_cost = state.root.cost # Re-scored from scratch for the reported plan
+    elapsed = time.perf_counter() - start
+    report = {'layout': layout_name, 'initial_cost': initial_cost, 'best_cost': best_cost,
+              'iterations': iteration, 'accepted': accepted, 'room_checks': state.room_checks,
+              'final_temperature': temperature, 'elapsed': elapsed,
+              'moves_per_second': iteration / elapsed if elapsed > 0 else 0.0,
+              'stopped': stopped, 'history': history}
+    plan = state.to_plan(layout_name)
+    plan.derived['anneal'] = report
+    return plan, report
@@ -0,0 +1,178 @@
+"""
+Vectorized plan scoring against PROPORTIONS_GENERAL.
+
+Plans are packed into dense (N, S) arrays (N plans, up to S rooms each) and
+scored in one NumPy pass, so ranking thousands of candidates per lot costs a
+few array operations. Per plan it measures:
+
+  area_deviation     half the L1 distance between the area shares of the room
+                     categories and their PROPORTIONS_GENERAL targets (0..1)
+  aspect_penalty     area-weighted mean of the aspect ratio above ASPECT_FREE
+  wasted_share       uncovered house area plus unallocated/error rooms, as a
+                     share of the house area
+  circulation_share  hallway area as a share of the house area
+  cost / score       weighted sum of the above (circulation only counts above its
+                     target) and score = 1 / (1 + cost), higher is better
+
+Rooms are painted in plan order, so where rooms overlap (e.g. the kitchen
+drawn inside the L-shaped living room) the overlap counts only towards the
+later room: every room is scored by its visible area.
+Requires NumPy.
+"""
+import numpy as np
+
+from plan_generator import PROPORTIONS_GENERAL, ROOM_TYPES, RoomTable, room_type_of
+from plan_integrity import room_overlaps
+
+# Score categories and the PROPORTIONS_GENERAL keys that make up their target share
+CATEGORIES = (
+    ("living", ("Living Room",)),
+    ("kitchen", ("Kitchen",)),
+    ("dining", ("Dining Area",)),
+    ("master", ("Master Bedroom",)),
+    ("bedroom", ("Bedroom 2", "Bedroom 3")),
+    ("bathroom", ("Bathroom",)),
+    ("balcony", ("Balcony",)),
+    ("circulation", ("Hallway/Corridor",)),
+    ("storage", ("Utility/Storage",)),
+    ("waste", ()),
+)
+# Room-type registry key -> category
+TYPE_CATEGORIES = {
+    "Living Room": "living", "Kitchen": "kitchen", "Dining Area": "dining",
+    "Master Bedroom": "master", "Bedroom": "bedroom", "Bathroom": "bathroom", "Balcony": "balcony",
+    "Hallway/Corridor": "circulation", "Service Hallway": "circulation",
+    "Storage": "storage", "Utility": "storage", "Unallocated": "waste", "Error": "waste",
+}
+
+CATEGORY_NAMES = tuple(name for name, _ in CATEGORIES)
+_CATEGORY_INDEX = {name: i for i, name in enumerate(CATEGORY_NAMES)}
+# Room-type id -> category index
+TYPE_CATEGORY = np.array([_CATEGORY_INDEX[TYPE_CATEGORIES[t.key]] for t in ROOM_TYPES], dtype=np.intp)
+_targets = np.array([sum(PROPORTIONS_GENERAL[key] for key in keys) for _, keys in CATEGORIES])
+TARGET_SHARES = _targets / _targets.sum()
+
+ASPECT_FREE = 1.5 # Aspect ratios up to this are not penalised
+SCORE_WEIGHTS = {'area_deviation': 2.0, 'aspect_penalty': 0.5, 'wasted_share': 2.0, 'circulation_excess': 1.0}
+SCORE_FIELDS = ('area_deviation', 'aspect_penalty', 'wasted_share', 'circulation_share', 'cost', 'score')
+
+
+def covered_areas(rects, valid):
+    """
+    (N, S) area of each room slot covered by later slots, for rects (N, S, 4)
+    of x, y, w, h and the `valid` mask. Loops over slots, vectorized over plans.
+    """
+    x0, y0 = rects[..., 0], rects[..., 1]
+    x1, y1 = x0 + rects[..., 2], y0 + rects[..., 3]
+    covered = np.zeros(valid.shape)
+    for i in range(valid.shape[1] - 1):
+        dx = np.minimum(x1[:, i, None], x1[:, i + 1:]) - np.maximum(x0[:, i, None], x0[:, i + 1:])
+        dy = np.minimum(y1[:, i, None], y1[:, i + 1:]) - np.maximum(y0[:, i, None], y0[:, i + 1:])
+        both = valid[:, i, None] & valid[:, i + 1:]
+        covered[:, i] = np.where(both, np.maximum(dx, 0.0) * np.maximum(dy, 0.0), 0.0).sum(axis=1)
+    return covered
+
+
+def score_arrays(w, h, type_ids, valid, house_w, house_l, covered=None):
+    """
+    Scores N plans given as dense arrays: room widths/heights `w`, `h` (N, S),
+    room-type ids `type_ids` ((N, S) or (S,) when shared by all plans), `valid`
+    (N, S) bool mask of rooms that exist, and house dimensions (scalars or (N,)).
+    `covered` (N, S) is the area of each room hidden under later rooms, which
+    is taken off its area. Returns a dict of (N,) float arrays keyed by SCORE_FIELDS.
+    """
+    w = np.asarray(w, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+    valid = np.asarray(valid, dtype=bool) & (w > 0) & (h > 0)
+    n = w.shape[0]
+    house_area = np.broadcast_to(np.asarray(house_w, dtype=np.float64) * np.asarray(house_l, dtype=np.float64), (n,))
+    categories = np.broadcast_to(TYPE_CATEGORY[np.asarray(type_ids, dtype=np.intp)], w.shape)
+
+    area = np.where(valid, w * h, 0.0)
+    if covered is not None:
+        area = np.maximum(area - covered, 0.0)
+    category_area = np.zeros((n, len(CATEGORY_NAMES)))
+    np.add.at(category_area, (np.broadcast_to(np.arange(n)[:, None], w.shape), categories), area)
+    room_area = area.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = category_area / house_area[:, None]
+        aspect = np.where(valid, np.maximum(w, h) / np.minimum(w, h), 1.0)
+        aspect_penalty = np.where(room_area > 0, (area * np.maximum(aspect - ASPECT_FREE, 0.0)).sum(axis=1) / room_area, 0.0)
+
+    area_deviation = 0.5 * np.abs(shares - TARGET_SHARES).sum(axis=1)
+    waste = _CATEGORY_INDEX["waste"]
+    wasted_share = np.maximum(house_area - room_area, 0.0) / house_area + shares[:, waste]
+    circulation = _CATEGORY_INDEX["circulation"]
+    circulation_share = shares[:, circulation]
+    cost = (SCORE_WEIGHTS['area_deviation'] * area_deviation
+            + SCORE_WEIGHTS['aspect_penalty'] * aspect_penalty
+            + SCORE_WEIGHTS['wasted_share'] * wasted_share
+            + SCORE_WEIGHTS['circulation_excess'] * np.maximum(circulation_share - TARGET_SHARES[circulation], 0.0))
+    return {'area_deviation': area_deviation, 'aspect_penalty': aspect_penalty, 'wasted_share': wasted_share,
+            'circulation_share': circulation_share, 'cost': cost, 'score': 1.0 / (1.0 + cost)}
+
+
+def pack_plans(plans):
+    """
+    Packs plans (room-dict lists, Plans or RoomTables) into dense
+    (w, h, type_ids, valid, covered) arrays; see score_arrays. Overlaps are
+    taken from the plan's integrity report when it has one.
+    """
+    n = len(plans)
+    s = max((len(plan) for plan in plans), default=0)
+    w = np.zeros((n, s))
+    h = np.zeros((n, s))
+    type_ids = np.zeros((n, s), dtype=np.intp)
+    valid = np.zeros((n, s), dtype=bool)
+    covered = np.zeros((n, s))
+    for i, plan in enumerate(plans):
+        m = len(plan)
+        report = getattr(plan, 'integrity', None)
+        for under, _, overlap, _ in (report.overlaps if report is not None else room_overlaps(plan)):
+            covered[i, under] += overlap
+        if isinstance(plan, RoomTable):
+            # Zero-copy views of the table columns
+            w[i, :m] = np.frombuffer(plan.w, dtype=np.float64)
+            h[i, :m] = np.frombuffer(plan.h, dtype=np.float64)
+            type_ids[i, :m] = np.frombuffer(plan.kind, dtype=np.uint32)
+            valid[i, :m] = True
+            continue
+        for j, room in enumerate(plan):
+            rect = room.get('rect')
+            if rect is None:
+                continue
+            w[i, j], h[i, j] = rect.w, rect.h
+            type_ids[i, j] = room_type_of(room).id
+            valid[i, j] = True
+    return w, h, type_ids, valid, covered
+
+
+def score_plans(plans, house_w, house_l):
+    """
+    Scores a batch of plans in one call; dimensions are scalars (same lot) or
+    per-plan sequences. Returns a dict of (N,) arrays keyed by SCORE_FIELDS.
+    """
+    w, h, type_ids, valid, covered = pack_plans(plans)
+    return score_arrays(w, h, type_ids, valid, house_w, house_l, covered)
+
+
+def rank_plans(plans, house_w, house_l):
+    """Returns the plan indices ordered from best to worst score."""
+    return np.argsort(-score_plans(plans, house_w, house_l)['score'], kind='stable')
+
+
+def attach_scores(plans, house_w, house_l):
+    """Scores `plans` in one batch and caches each plan's scores dict in its `derived` data."""
+    scores = score_plans(plans, house_w, house_l)
+    for i, plan in enumerate(plans):
+        derived = getattr(plan, 'derived', None)
+        if derived is not None:
+            derived['scores'] = {field: float(scores[field][i]) for field in SCORE_FIELDS}
+    return scores
+
+
+def score_vector_layout(layout):
+    """Scores every lot of a plan_vectorized.VectorLayout without materializing plans."""
+    type_ids = np.array([t.id for t in layout.room_types], dtype=np.intp)
+    return score_arrays(layout.rects[..., 2], layout.rects[..., 3], type_ids, layout.valid,
+                        layout.widths, layout.lengths, covered_areas(layout.rects, layout.valid))
@@ -0,0 +1,206 @@
+"""
+Layout search: many candidate plans for the PROPORTIONS_GENERAL room programme.
+
+Instead of the three fixed recipes, the house is cut recursively (guillotine
+cuts) into the rooms of the programme, kept in a fixed zone order (public rooms,
+hallway, private rooms, service rooms). Every node of the split tree tries each
+cut point of its room sequence, both orientations and a few ratio variations
+around the target area shares (a first pass uses the exact shares only; the
+variations are explored with the time that is left, reusing the first pass's
+memoised subproblems). Optional rooms are left out in some programme variants.
+
+Subtrees are pruned as soon as a partial rect cannot hold its rooms: a group
+rect that is smaller than the most lenient minimums of its rooms (or than the
+sum of their minimum areas) is not split further, and a single room is kept
+only if it passes check_room_validity. The cost of a plan is a sum of per-room
+terms that do not depend on position, so every subproblem keeps only its top-K
+partial layouts, memoised by rect size and room range with room positions
+relative to the rect; combining them gives the top-K plans of the whole tree.
+The time budget is shared between the programme variants; a variant stops
+expanding when its share runs out and contributes the best plans found so far.
+"""
+import heapq
+import itertools
+import time
+
+from plan_generator import (PROPORTIONS_GENERAL, ROOM_TYPES_BY_KEY, Plan, Rect, add_room, check_room_validity,
+                            compile_settings)
+
+# Room programme in zone order: (PROPORTIONS_GENERAL key, registry key, name suffix)
+SEARCH_PROGRAMME = (
+    ("Living Room", "Living Room", ""),
+    ("Dining Area", "Dining Area", ""),
+    ("Kitchen", "Kitchen", ""),
+    ("Hallway/Corridor", "Hallway/Corridor", ""),
+    ("Master Bedroom", "Master Bedroom", ""),
+    ("Bedroom 2", "Bedroom", " ۲"),
+    ("Bedroom 3", "Bedroom", " ۳"),
+    ("Bathroom", "Bathroom", ""),
+    ("Utility/Storage", "Storage", ""),
+    ("Balcony", "Balcony", ""),
+)
+OPTIONAL_ROOMS = frozenset({"Dining Area", "Bedroom 3", "Utility/Storage"})
+
+RATIO_JITTER = (1.0, 0.9, 1.1) # Split ratios tried around the target share, best guess first
+AREA_WEIGHT = 1.0 # Cost per unit of relative area deviation
+ASPECT_WEIGHT = 0.5 # Cost per unit of aspect ratio above ASPECT_FREE
+ASPECT_FREE = 1.5
+OMITTED_ROOM_COST = 0.5 # Cost of leaving out an optional room
+DEFAULT_TIME_BUDGET = 1.0 # seconds
+DEFAULT_TOP_K = 3
+
+
+class _Search:
+    """State of one search; `run` is called once per programme variant."""
+    def __init__(self, house_w, house_l, settings, top_k, deadline, should_cancel):
+        self.house_w = house_w
+        self.house_l = house_l
+        self.house_area = house_w * house_l
+        self.settings = settings
+        self.top_k = top_k
+        self.deadline = deadline
+        self.should_cancel = should_cancel
+        self.memos = {} # programme -> memo, kept across passes
+        self.timed_out = False
+        self.any_timed_out = False
+        self.nodes = 0
+        self.pruned = 0
+
+    def out_of_time(self):
+        if not self.timed_out and (time.perf_counter() > self.deadline
+                                   or (self.should_cancel is not None and self.should_cancel())):
+            self.timed_out = self.any_timed_out = True
+        return self.timed_out
+
+    def run(self, programme, deadline, jitter):
+        """
+        Top-K (cost, leaves) for one programme variant, trying the split ratio
+        factors `jitter`; leaves are (programme index, x, y, w, h).
+        """
+        self.deadline = deadline
+        self.timed_out = False
+        self.jitter = jitter
+        self.programme = programme
+        total_share = sum(PROPORTIONS_GENERAL[key] for key, _, _ in programme)
+        self.targets = [PROPORTIONS_GENERAL[key] / total_share * self.house_area for key, _, _ in programme]
+        self.shares = [0.0]
+        for key, _, _ in programme:
+            self.shares.append(self.shares[-1] + PROPORTIONS_GENERAL[key])
+        types = [ROOM_TYPES_BY_KEY[type_key].id for _, type_key, _ in programme]
+        s = self.settings
+        self.min_w = [s.min_w[t] for t in types]
+        self.min_h = [s.min_h[t] for t in types]
+        self.memo = self.memos.setdefault(programme, {})
+        return self.solve(self.house_w, self.house_l, 0, len(programme))
+
+    def leaf(self, w, h, i):
+        _, type_key, suffix = self.programme[i]
+        rect = Rect(0, 0, w, h)
+        room = {'rect': rect, 'type': ROOM_TYPES_BY_KEY[type_key].id}
+        if not check_room_validity(room, self.settings):
+            self.pruned += 1
+            return []
+        cost = AREA_WEIGHT * abs(w * h - self.targets[i]) / self.targets[i]
+        cost += ASPECT_WEIGHT * max(0.0, rect.aspect_ratio() - ASPECT_FREE)
+        return [(cost, ((i, 0.0, 0.0, w, h),))]
+
+    def feasible(self, w, h, i, j):
+        """Cheap lower bounds for rooms i..j-1 in a w x h rect."""
+        return (w >= min(self.min_w[i:j]) and h >= min(self.min_h[i:j])
+                and w * h >= sum(a * b for a, b in zip(self.min_w[i:j], self.min_h[i:j])))
+
+    def solve(self, w, h, i, j):
+        """
+        Top-K (cost, leaves) for rooms i..j-1 in a w x h rect; leaf positions are relative to the rect.
+        Memo entries hold the jitter they were solved with; an entry of an earlier pass seeds the search.
+        """
+        key = (round(w, 4), round(h, 4), i, j)
+        cached = self.memo.get(key)
+        if cached is not None and (cached[0] == self.jitter or j - i == 1):
+            return cached[1]
+        self.nodes += 1
+        if j - i == 1:
+            result = self.leaf(w, h, i)
+            self.memo[key] = (self.jitter, result)
+            return result
+
+        # leaves -> cost, for deduplication of identical geometry
+        best = {leaves: cost for cost, leaves in cached[1]} if cached is not None else {}
+        total = self.shares[j] - self.shares[i]
+        for k in range(i + 1, j):
+            if self.out_of_time():
+                break
+            target_ratio = (self.shares[k] - self.shares[i]) / total
+            # Split across the longer side first
+            for vertical in ((True, False) if w >= h else (False, True)):
+                for jitter in self.jitter:
+                    ratio = min(0.95, max(0.05, target_ratio * jitter))
+                    if vertical:
+                        a, b, dx, dy = (w * ratio, h), (w * (1 - ratio), h), w * ratio, 0.0
+                    else:
+                        a, b, dx, dy = (w, h * ratio), (w, h * (1 - ratio)), 0.0, h * ratio
+                    if not (self.feasible(*a, i, k) and self.feasible(*b, k, j)):
+                        self.pruned += 1
+                        continue
+                    left = self.solve(*a, i, k)
+                    if not left:
+                        continue
+                    right = self.solve(*b, k, j)
+                    for (cost_a, leaves_a), (cost_b, leaves_b) in itertools.product(left, right):
+                        leaves = leaves_a + tuple((m, rx + dx, ry + dy, rw, rh) for m, rx, ry, rw, rh in leaves_b)
+                        cost = cost_a + cost_b
+                        if cost < best.get(leaves, float('inf')):
+                            best[leaves] = cost
+        result = heapq.nsmallest(self.top_k, ((cost, leaves) for leaves, cost in best.items()))
+        if not self.timed_out: # Partial results of an interrupted node must not be reused
+            self.memo[key] = (self.jitter, result)
+        return result
+
+
+def _programme_variants():
+    """Programme variants with every subset of the optional rooms (fullest programme first)."""
+    optional = [entry for entry in SEARCH_PROGRAMME if entry[0] in OPTIONAL_ROOMS]
+    for n_omitted in range(len(optional) + 1):
+        for omitted in itertools.combinations(optional, n_omitted):
+            yield n_omitted, tuple(entry for entry in SEARCH_PROGRAMME if entry not in omitted)
+
+
+def search_layouts(house_w, house_l, settings, top_k=DEFAULT_TOP_K, time_budget=DEFAULT_TIME_BUDGET,
+                   should_cancel=None):
+    """
+    Searches split trees for the best `top_k` plans (lowest cost first) within
+    `time_budget` seconds. Returns (plans, stats); each plan is a Plan with layout
+    "search" and its cost and score (1 / (1 + cost)) in `plan.derived`.
+    `stats` reports the explored nodes, pruned branches, elapsed time and whether
+    the budget ran out.
+    """
+    settings = compile_settings(settings)
+    start = time.perf_counter()
+    deadline = start + time_budget
+    search = _Search(house_w, house_l, settings, top_k, deadline, should_cancel)
+    variants = list(_programme_variants())
+    candidates = {}
+    # Exact target ratios first (cheap, usually complete), then the jittered ratios with the time left
+    passes = (RATIO_JITTER[:1], RATIO_JITTER) if len(RATIO_JITTER) > 1 else (RATIO_JITTER,)
+    for jitter in passes:
+        for n, (n_omitted, programme) in enumerate(variants):
+            now = time.perf_counter()
+            if now >= deadline or (should_cancel is not None and should_cancel()):
+                search.any_timed_out = True
+                break
+            # Equal share of the remaining budget, so unused time rolls over to later variants
+            for cost, leaves in search.run(programme, now + (deadline - now) / (len(variants) - n), jitter):
+                candidates[programme, leaves] = cost + OMITTED_ROOM_COST * n_omitted
+
+    plans = []
+    for (programme, leaves), cost in heapq.nsmallest(top_k, candidates.items(), key=lambda c: c[1]):
+        plan = Plan(layout="search")
+        for i, x, y, w, h in leaves:
+            _, type_key, suffix = programme[i]
+            add_room(plan, type_key, Rect(x, y, w, h), settings, suffix)
+        plan.derived['search_cost'] = cost
+        plan.derived['search_score'] = 1.0 / (1.0 + cost)
+        plans.append(plan)
+    stats = {'nodes': search.nodes, 'pruned': search.pruned, 'candidates': len(candidates),
+             'elapsed': time.perf_counter() - start, 'timed_out': search.any_timed_out}
+    return plans, stats
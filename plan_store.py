@@ -0,0 +1,341 @@
+"""
+Persistent on-disk store of generated plans and app settings (SQLite).
+
+Plans are stored per PlanCache key, i.e. the quantized dimensions, the
+settings hash and the generation options, as one zlib-compressed pickle of
+the lot's plans. Rooms are pickled as plain (name, color, type, x, y, w, h)
+tuples, which load several times faster than room dicts holding Rect objects;
+caches that are cheap to recompute (RECOMPUTED_DERIVED) are not stored.
+Nothing is read up front: the database is opened on first use and a lot's
+plans are only loaded when they are asked for. The store is capped at
+`max_bytes` of plan data; when a write goes over the cap the least recently
+used lots are evicted down to EVICT_TO of it. Reads record their use in
+memory and write it back in batches (with the next write, every TOUCH_BATCH
+reads, and on close), so a warm read costs no write transaction.
+
+Several processes (batch workers, a running app) can share one store file;
+SQLite serialises the writes. Store errors never break generation: they are
+reported through plan_trace.error and treated as a miss.
+
+Plans are pickled, so only open store files you trust. Bump STORE_VERSION
+when a change to the generator makes stored plans obsolete.
+
+Usage:
+    store = PlanStore("plans.sqlite3")
+    cache = PlanCache(store=store)
+    python -m plan_store info plans.sqlite3
+"""
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import plan_trace
+from plan_generator import Plan, Rect, RoomTable
+
+STORE_VERSION = 1 # Part of every key: plans stored by an older generator are never returned
+DEFAULT_STORE_PATH = os.environ.get("HOUSE_PLAN_STORE") or os.path.join(os.path.expanduser("~"), ".house_plan",
+                                                                         "plans.sqlite3")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+EVICT_TO = 0.9 # Eviction frees space down to this fraction of max_bytes, so it does not run on every write
+BUSY_TIMEOUT = 30.0 # Seconds to wait for another process holding the write lock
+TOUCH_BATCH = 256 # Reads whose last_used update is written back at once
+RESYNC_WRITES = 64 # Writes after which the stored size is re-read, as other processes write too
+COMPRESS_LEVEL = 1 # zlib level: plans compress well already at the fastest setting
+RECOMPUTED_DERIVED = frozenset({'adjacency'}) # plan.derived entries rebuilt on demand instead of stored
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    key TEXT PRIMARY KEY,
+    width REAL NOT NULL,
+    length REAL NOT NULL,
+    settings_hash TEXT NOT NULL,
+    options TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def store_key(key):
+    """Text key of a PlanCache key (width, length, settings_hash, options)."""
+    width, length, digest, options = key
+    return json.dumps([STORE_VERSION, width, length, digest, [list(item) for item in options]], default=repr)
+
+
+def encode_entry(entry):
+    """Compressed payload of a lot's [(layout_name, plan), ...] (Plans or RoomTables)."""
+    records = []
+    for layout_name, plan in entry:
+        rooms = plan.to_rooms() if isinstance(plan, RoomTable) else plan
+        derived = {k: v for k, v in plan.derived.items() if k not in RECOMPUTED_DERIVED}
+        records.append((layout_name, isinstance(plan, RoomTable), plan.layout, plan.size, plan.integrity, derived,
+                        [(room['name'], room['color'], room.get('type'), room['rect'].x, room['rect'].y,
+                          room['rect'].w, room['rect'].h) for room in rooms]))
+    return zlib.compress(pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+
+
+def decode_entry(payload):
+    """Inverse of encode_entry."""
+    entry = []
+    for layout_name, is_table, layout, size, integrity, derived, rooms in pickle.loads(zlib.decompress(payload)):
+        room_dicts = []
+        for name, color, type_id, x, y, w, h in rooms:
+            room = {'name': name, 'rect': Rect(x, y, w, h), 'color': color}
+            if type_id is not None:
+                room['type'] = type_id
+            room_dicts.append(room)
+        plan = RoomTable(room_dicts, layout, size) if is_table else Plan(room_dicts, layout, size)
+        plan.integrity = integrity
+        plan.derived.update(derived)
+        entry.append((layout_name, plan))
+    return entry
+
+
+class PlanStore:
+    """
+    SQLite-backed plan and settings store. Methods are thread-safe; the
+    connection is opened lazily and can be shared with one worker thread.
+    """
+    def __init__(self, path=DEFAULT_STORE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self._conn = None
+        self._lock = threading.Lock()
+        self._total = None # Plan bytes in the store as last seen by this process
+        self._touched = {} # Store key -> last read time, not yet written back
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self.disabled = False # Set when the store cannot be opened; it then acts as always empty
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL") # Readers do not block the writer
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _failed(self, action, error):
+        self.errors += 1
+        if self._conn is None:
+            self.disabled = True
+            action = "opening the store"
+        plan_trace.error(f"Plan store {self.path}: {action} failed: {error}")
+
+    def get(self, key):
+        """The stored [(layout_name, plan), ...] for a PlanCache key, or None."""
+        if self.disabled:
+            return None
+        text = store_key(key)
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT payload FROM plans WHERE key = ?", (text,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._touched[text] = time.time()
+                if len(self._touched) >= TOUCH_BATCH:
+                    with conn:
+                        self._write_touched(conn)
+            except (sqlite3.Error, OSError) as e:
+                self._failed("read", e)
+                return None
+        try:
+            entry = decode_entry(row[0])
+        except Exception as e: # Written by an incompatible version: drop it
+            with self._lock:
+                self._failed("decoding a stored entry", e)
+            self.discard(key)
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Stores the [(layout_name, plan), ...] of a PlanCache key, evicting old lots over the size cap."""
+        if self.max_bytes == 0 or self.disabled:
+            return
+        width, length, digest, options = key
+        payload = encode_entry(entry)
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                with conn:
+                    self._write_touched(conn)
+                    old = conn.execute("SELECT size FROM plans WHERE key = ?", (store_key(key),)).fetchone()
+                    conn.execute("INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (store_key(key), width, length, digest, json.dumps(options, default=repr),
+                                  payload, len(payload), now, now))
+                self.writes += 1
+                if self._total is None or self.writes % RESYNC_WRITES == 0:
+                    self._total = self._stored_bytes(conn)
+                else:
+                    self._total += len(payload) - (old[0] if old else 0)
+                if self._total > self.max_bytes:
+                    self._evict(conn)
+            except (sqlite3.Error, OSError) as e:
+                self._failed("write", e)
+
+    def _write_touched(self, conn):
+        if self._touched:
+            conn.executemany("UPDATE plans SET last_used = ? WHERE key = ?",
+                             [(t, key) for key, t in self._touched.items()])
+            self._touched.clear()
+
+    def _stored_bytes(self, conn):
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM plans").fetchone()[0]
+
+    def _evict(self, conn):
+        """Deletes the least recently used lots until the store is back under EVICT_TO of the cap."""
+        with conn:
+            self._write_touched(conn) # Lots read since the last write count as recently used
+        total = self._stored_bytes(conn) # Other processes may have written too
+        target = self.max_bytes * EVICT_TO
+        doomed = []
+        if total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM plans ORDER BY last_used"):
+                if total <= target:
+                    break
+                doomed.append((key,))
+                total -= size
+        with conn:
+            conn.executemany("DELETE FROM plans WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+        self._total = total
+
+    def discard(self, key):
+        """Removes one lot's plans."""
+        with self._lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM plans WHERE key = ?", (store_key(key),))
+                self._total = None
+            except (sqlite3.Error, OSError) as e:
+                self._failed("delete", e)
+
+    def __contains__(self, key):
+        if self.disabled:
+            return False
+        with self._lock:
+            try:
+                return self._connect().execute("SELECT 1 FROM plans WHERE key = ?",
+                                               (store_key(key),)).fetchone() is not None
+            except (sqlite3.Error, OSError) as e:
+                self._failed("read", e)
+                return False
+
+    def load_settings(self, name="app"):
+        """The settings dict saved under `name`, or {} if there is none."""
+        if self.disabled:
+            return {}
+        with self._lock:
+            try:
+                row = self._connect().execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+            except (sqlite3.Error, OSError) as e:
+                self._failed("reading settings", e)
+                return {}
+        return json.loads(row[0]) if row else {}
+
+    def save_settings(self, settings, name="app"):
+        """Saves a JSON-serialisable settings dict under `name`."""
+        if self.disabled:
+            return
+        value = json.dumps(dict(settings), sort_keys=True, ensure_ascii=False)
+        with self._lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (name, value))
+            except (sqlite3.Error, OSError) as e:
+                self._failed("saving settings", e)
+
+    def clear(self):
+        """Deletes all stored plans (settings are kept)."""
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM plans")
+            self._total = 0
+
+    def info(self):
+        """Counters plus the number of stored lots and their size in bytes."""
+        lots, size = None, None
+        with self._lock:
+            try:
+                if not self.disabled:
+                    lots, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+            except (sqlite3.Error, OSError) as e:
+                self._failed("read", e)
+        return {'path': self.path, 'lots': lots, 'bytes': size, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                'misses': self.misses, 'writes': self.writes, 'evictions': self.evictions, 'errors': self.errors}
+
+    def flush(self):
+        """Writes back the pending last-used times."""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    with self._conn:
+                        self._write_touched(self._conn)
+                except (sqlite3.Error, OSError) as e:
+                    self._failed("write", e)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # Worker processes get their own connection
+    def __getstate__(self):
+        return {'path': self.path, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['max_bytes'])
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m plan_store", description="Inspect or clear a plan store.")
+    parser.add_argument("command", choices=("info", "clear"))
+    parser.add_argument("path", nargs="?", default=DEFAULT_STORE_PATH, help="Store file")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.path):
+        print(f"Error: {args.path} does not exist", file=sys.stderr)
+        return 1
+    with PlanStore(args.path) as store:
+        if args.command == "clear":
+            store.clear()
+        info = store.info()
+    print(f"{info['path']}: {info['lots']} lot(s), {info['bytes'] / 1024:.1f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
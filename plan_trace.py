@@ -0,0 +1,243 @@
+"""
+Instrumentation for the generation pipeline: stage timers, counters and trace events.
+
+Disabled by default. While disabled, hooks on hot paths are a single flag
+check (`if plan_trace.enabled:`), `span()` returns a shared no-op context
+manager and `count()`/`note()` return immediately, so generation prints
+nothing and runs at full speed. Only `error()` always reports (to stderr).
+
+When enabled it collects:
+  stages    per span name: calls, total/min/max seconds
+  counters  per (name, labels), e.g. rooms_rejected{rule=min_width, layout=open_concept}
+  events    (with events=True) complete and instant events in the Chrome trace
+            event format, viewable in chrome://tracing or ui.perfetto.dev
+
+Usage:
+    import plan_trace
+    plan_trace.enable(events=True)
+    generate_plans(12, 15, settings)
+    print(plan_trace.report())
+    plan_trace.export_chrome_trace("trace.json")
+"""
+import os
+import sys
+import threading
+import time
+
+enabled = False
+MAX_MESSAGES = 1000 # Notes kept for report(); older ones are dropped
+
+_events_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_origin = time.perf_counter()
+_stages = {} # name -> [calls, total, min, max]
+_counters = {} # (name, ((label, value), ...)) -> count
+_events = []
+_messages = []
+
+
+class _Span:
+    """Times one stage; `args` end up in the trace event."""
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def set(self, **args):
+        """Adds result details (room counts, costs, ...) to the span's event."""
+        self.args.update(args)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _local.stack.pop()
+        duration = end - self.start
+        with _lock:
+            stage = _stages.get(self.name)
+            if stage is None:
+                _stages[self.name] = [1, duration, duration, duration]
+            else:
+                stage[0] += 1
+                stage[1] += duration
+                stage[2] = min(stage[2], duration)
+                stage[3] = max(stage[3], duration)
+            if _events_enabled:
+                if exc_type is not None:
+                    self.args['error'] = exc_type.__name__
+                _events.append({'name': self.name, 'ph': "X", 'ts': (self.start - _origin) * 1e6,
+                                'dur': duration * 1e6, 'pid': os.getpid(), 'tid': threading.get_ident(),
+                                'args': _jsonable(self.args)})
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _jsonable(args):
+    return {k: v if isinstance(v, (str, int, float, bool, type(None))) else repr(v) for k, v in args.items()}
+
+
+def span(name, **args):
+    """Context manager timing the stage `name` (a no-op while disabled)."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def context(key, default=None):
+    """Value of `key` in the innermost active span of this thread that has it (e.g. the current layout)."""
+    for active in reversed(getattr(_local, 'stack', ())):
+        if key in active.args:
+            return active.args[key]
+    return default
+
+
+def count(name, n=1, **labels):
+    """Adds `n` to the counter `name` with the given labels."""
+    if not enabled or not n:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def note(message, **args):
+    """Records a diagnostic message (what used to be printed) as an instant event."""
+    if not enabled:
+        return
+    with _lock:
+        _messages.append(message)
+        if len(_messages) > MAX_MESSAGES:
+            del _messages[:len(_messages) - MAX_MESSAGES]
+        if _events_enabled:
+            _events.append({'name': message, 'ph': "i", 's': "t", 'ts': (time.perf_counter() - _origin) * 1e6,
+                            'pid': os.getpid(), 'tid': threading.get_ident(), 'args': _jsonable(args)})
+
+
+def error(message, exc_info=False):
+    """Reports an error on stderr (also while disabled) and counts it."""
+    import traceback
+    text = message + ("\n" + traceback.format_exc().rstrip() if exc_info else "")
+    print(text, file=sys.stderr)
+    count("errors")
+    note(message)
+
+
+def enable(events=False):
+    """Turns instrumentation on; `events` also keeps every span as a trace event."""
+    global enabled, _events_enabled
+    _events_enabled = events
+    enabled = True
+
+
+def disable():
+    global enabled, _events_enabled
+    enabled = False
+    _events_enabled = False
+
+
+def reset():
+    """Clears the collected stages, counters, events and notes."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _events.clear()
+        _messages.clear()
+
+
+def drain():
+    """
+    Takes the collected data out of this process (clearing it) in a picklable form
+    for merge(), e.g. to send a worker process's stages and events to its parent.
+    """
+    with _lock:
+        data = {'origin': _origin, 'stages': dict(_stages), 'counters': dict(_counters),
+                'events': list(_events), 'messages': list(_messages)}
+        _stages.clear()
+        _counters.clear()
+        _events.clear()
+        _messages.clear()
+    return data
+
+
+def merge(data):
+    """Adds data from drain() (possibly of another process) to this process's collections."""
+    shift = (data['origin'] - _origin) * 1e6 # perf_counter is system-wide, only the origins differ
+    with _lock:
+        for name, (calls, total, lo, hi) in data['stages'].items():
+            stage = _stages.get(name)
+            if stage is None:
+                _stages[name] = [calls, total, lo, hi]
+            else:
+                stage[0] += calls
+                stage[1] += total
+                stage[2] = min(stage[2], lo)
+                stage[3] = max(stage[3], hi)
+        for key, n in data['counters'].items():
+            _counters[key] = _counters.get(key, 0) + n
+        if _events_enabled:
+            _events.extend(dict(event, ts=event['ts'] + shift) for event in data['events'])
+        _messages.extend(data['messages'])
+        if len(_messages) > MAX_MESSAGES:
+            del _messages[:len(_messages) - MAX_MESSAGES]
+
+
+def stats():
+    """Snapshot of the collected data: {'stages': {...}, 'counters': {...}}."""
+    with _lock:
+        stages = {name: {'calls': calls, 'total': total, 'mean': total / calls, 'min': lo, 'max': hi}
+                  for name, (calls, total, lo, hi) in _stages.items()}
+        counters = {_counter_name(name, labels): n for (name, labels), n in sorted(_counters.items())}
+    return {'stages': stages, 'counters': counters}
+
+
+def _counter_name(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ", ".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def report():
+    """Human-readable summary of the stages and counters."""
+    data = stats()
+    lines = [f"{'stage':<24}{'calls':>8}{'total ms':>11}{'mean µs':>11}{'max µs':>11}"]
+    for name, s in sorted(data['stages'].items(), key=lambda item: -item[1]['total']):
+        lines.append(f"{name:<24}{s['calls']:>8}{s['total'] * 1e3:>11.2f}{s['mean'] * 1e6:>11.1f}{s['max'] * 1e6:>11.1f}")
+    if data['counters']:
+        lines.append("")
+        lines.extend(f"{n:>8}  {name}" for name, n in data['counters'].items())
+    return "\n".join(lines)
+
+
+def export_chrome_trace(path):
+    """Writes the trace events (plus stages and counters) as Chrome trace-event JSON."""
+    import json
+    with _lock:
+        events = list(_events)
+    document = {'traceEvents': events, 'displayTimeUnit': "ms", 'otherData': stats()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False)
+    return len(events)
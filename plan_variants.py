@@ -0,0 +1,134 @@
+"""
+Seeded stochastic variants of the layout recipes.
+
+Each variant runs one of the layout functions with its split ratios
+(LAYOUT_RATIOS) jittered around the defaults, and may transpose the lot
+(the recipe is run on the swapped dimensions) and mirror the result in x
+and/or y. A variant run always starts with the unjittered recipes (the plans
+of the "fixed" mode); they come on top of the requested number of variants.
+
+Randomness comes from an explicit seed: every lot draws from its own
+random.Random stream, derived from (seed, stream id) by hashing, where the
+stream id defaults to the lot dimensions. The plans of a lot therefore do
+not depend on which worker process generates it or in which order, so
+parallel batch runs are reproducible.
+
+Variants with the same geometry (plan_fingerprint of the rounded rects) are
+dropped before they are finished, rendered or scored.
+"""
+import hashlib
+import random
+import time
+
+import plan_trace
+from plan_generator import (LAYOUT_FUNCTIONS, LAYOUT_NAMES, LAYOUT_RATIOS, Plan, Rect, check_room_validity,
+                            compile_settings, plan_fingerprint)
+
+RATIO_JITTER = 0.15 # Split ratios are scaled by a uniform factor in 1 ± RATIO_JITTER
+RATIO_BOUNDS = (0.1, 0.9)
+TRANSPOSE_PROBABILITY = 0.25
+FLIP_PROBABILITY = 0.5
+MAX_ATTEMPTS_PER_VARIANT = 8 # Attempts before giving up on finding `count` distinct variants
+DEFAULT_VARIANTS = 6
+DEFAULT_SEED = 0
+
+
+def lot_stream(width, length):
+    """Default stream id of a lot: its dimensions, so equal lots get equal variants."""
+    return f"{float(width):.4f}x{float(length):.4f}"
+
+
+def stream_seed(seed, stream):
+    """64-bit seed of the random stream `stream` under the run seed `seed`."""
+    digest = hashlib.sha256(f"{seed}:{stream}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def variant_rng(seed, stream):
+    """Independent random.Random for one stream (lot) of a seeded run."""
+    return random.Random(stream_seed(seed, stream))
+
+
+def sample_variant(rng, layout_name):
+    """Draws jittered ratios and an orientation for one layout; always consumes the same number of draws."""
+    lo, hi = RATIO_BOUNDS
+    ratios = {key: min(hi, max(lo, value * rng.uniform(1 - RATIO_JITTER, 1 + RATIO_JITTER)))
+              for key, value in sorted(LAYOUT_RATIOS[layout_name].items())}
+    return {'layout': layout_name, 'ratios': ratios,
+            'transpose': rng.random() < TRANSPOSE_PROBABILITY,
+            'flip_x': rng.random() < FLIP_PROBABILITY,
+            'flip_y': rng.random() < FLIP_PROBABILITY}
+
+
+def build_variant(width, length, settings, variant):
+    """Runs the variant's layout function and applies its orientation. Returns a Plan (possibly empty)."""
+    func = LAYOUT_FUNCTIONS[LAYOUT_NAMES.index(variant['layout'])]
+    transpose = variant.get('transpose', False)
+    flip_x = variant.get('flip_x', False)
+    flip_y = variant.get('flip_y', False)
+    if transpose:
+        rooms = func(length, width, settings, variant.get('ratios'))
+    else:
+        rooms = func(width, length, settings, variant.get('ratios'))
+
+    plan = Plan(layout=variant['layout'])
+    for room in rooms:
+        rect = room['rect']
+        x, y, w, h = (rect.y, rect.x, rect.h, rect.w) if transpose else (rect.x, rect.y, rect.w, rect.h)
+        if flip_x:
+            x = width - x - w
+        if flip_y:
+            y = length - y - h
+        room = dict(room, rect=Rect(x, y, w, h))
+        # Width-specific minimums (e.g. hallways) can fail once the room is turned
+        if transpose and not check_room_validity(room, settings):
+            continue
+        plan.append(room)
+    return plan
+
+
+def generate_variants(width, length, settings, count=DEFAULT_VARIANTS, seed=DEFAULT_SEED, stream=None,
+                      should_cancel=None):
+    """
+    Generates the unjittered recipe plans followed by up to `count` distinct jittered
+    variants for one lot. `stream` selects the
+    random stream (default: lot_stream(width, length)). Returns (plans, stats); each
+    plan carries its variant parameters and fingerprint in `plan.derived`, and
+    `stats` counts the attempts, duplicates and empty variants.
+    """
+    settings = compile_settings(settings)
+    start = time.perf_counter()
+    rng = variant_rng(seed, lot_stream(width, length) if stream is None else stream)
+    plans, seen = [], set()
+    recipes, variants = len(LAYOUT_NAMES), 0
+    stats = {'attempts': 0, 'duplicates': 0, 'empty': 0}
+    for attempt in range(recipes + count * MAX_ATTEMPTS_PER_VARIANT):
+        if (attempt >= recipes and variants >= count) or (should_cancel is not None and should_cancel()):
+            break
+        layout_name = LAYOUT_NAMES[attempt % len(LAYOUT_NAMES)]
+        if attempt < recipes:
+            variant = {'layout': layout_name, 'ratios': None, 'transpose': False, 'flip_x': False, 'flip_y': False}
+        else:
+            variant = sample_variant(rng, layout_name)
+        stats['attempts'] += 1
+        try:
+            with plan_trace.span("variant", layout=layout_name, attempt=attempt):
+                plan = build_variant(width, length, settings, variant)
+        except Exception as e:
+            plan_trace.error(f"ERROR generating variant {attempt} ({layout_name}): {e}")
+            plan = None
+        if not plan:
+            stats['empty'] += 1
+            continue
+        fingerprint = plan_fingerprint(plan)
+        if fingerprint in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(fingerprint)
+        plan.derived['variant'] = dict(variant, seed=seed, attempt=attempt)
+        plan.derived['fingerprint'] = fingerprint
+        plans.append(plan)
+        if attempt >= recipes:
+            variants += 1
+    stats['elapsed'] = time.perf_counter() - start
+    return plans, stats
@@ -0,0 +1,296 @@
+"""
+Vectorized layout engine.
+
+Evaluates the three layout recipes of `plan_generator` for whole arrays of
+house widths and lengths in one NumPy pass: every room rectangle, whether the
+recipe attempted the room, and whether it passes `check_room_validity`.
+Results match the scalar `_generate_layout_*` functions room for room; the
+split ratios are read from the same LAYOUT_RATIOS table.
+
+Requires NumPy.
+"""
+import numpy as np
+
+from plan_generator import BEDROOM_TYPE_IDS, LAYOUT_RATIOS, ROOM_COLORS, ROOM_TYPES_BY_KEY, Rect, compile_settings
+
+EPS = 1e-6
+
+
+class _Slots:
+    """Accumulates per-slot geometry and masks while a layout is evaluated."""
+    def __init__(self, n):
+        self.n = n
+        self.keys, self.suffixes = [], []
+        self.rects, self.attempted = [], []
+
+    def add(self, key, rect, attempted, suffix=""):
+        """Registers a room slot; `attempted` marks lots where add_room gets a non-None rect."""
+        x, y, w, h = (np.broadcast_to(np.asarray(v, dtype=np.float64), (self.n,)) for v in rect)
+        self.keys.append(key)
+        self.suffixes.append(suffix)
+        self.rects.append(np.stack([x, y, np.maximum(w, 0.0), np.maximum(h, 0.0)], axis=-1))
+        self.attempted.append(np.broadcast_to(attempted, (self.n,)))
+
+
+def _is_valid(w, h, min_dim=0.1):
+    """Vectorized Rect.is_valid."""
+    return (w >= min_dim) & (h >= min_dim)
+
+
+def _split(length, s):
+    """Existence mask of Rect.split_vertical/split_horizontal at `s` along a side of `length`."""
+    return (s > 0) & (s < length) & (s > EPS) & (length - s > EPS)
+
+
+def _room_validity(rects, room_types, settings):
+    """Vectorized check_room_validity for rects of shape (N, S, 4) with one RoomType per slot."""
+    ids = [t.id for t in room_types]
+    min_w = np.take(settings.min_w, ids)
+    min_h = np.take(settings.min_h, ids)
+    limit = np.take(settings.aspect_limit, ids)
+
+    w, h = rects[..., 2], rects[..., 3]
+    dims_ok = (w >= min_w) & (h >= min_h)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aspect = np.maximum(w / h, h / w)
+    aspect = np.where((w <= EPS) | (h <= EPS), np.inf, aspect)
+    return dims_ok & (aspect <= limit)
+
+
+class VectorLayout:
+    """
+    One layout evaluated over N lots.
+
+    rects      (N, S, 4) float64 x, y, w, h of every room slot
+    attempted  (N, S) bool: the recipe tried to add the room
+    valid      (N, S) bool: attempted and passing check_room_validity
+    """
+    def __init__(self, layout, slots, widths, lengths, settings):
+        self.layout = layout
+        self.widths = widths
+        self.lengths = lengths
+        self.keys = tuple(slots.keys)
+        self.suffixes = tuple(slots.suffixes)
+        self.room_types = tuple(ROOM_TYPES_BY_KEY[key] for key in self.keys)
+        self.rects = np.stack(slots.rects, axis=1)
+        self.attempted = np.stack(slots.attempted, axis=1)
+        self.valid = self.attempted & _room_validity(self.rects, self.room_types, settings)
+
+    @property
+    def feasible(self):
+        """(N,) bool: every room the recipe attempted is valid."""
+        return np.all(self.valid | ~self.attempted, axis=1)
+
+    @property
+    def room_count(self):
+        """(N,) number of valid rooms."""
+        return self.valid.sum(axis=1)
+
+    def names(self):
+        """Persian display names per slot, as add_room builds them."""
+        return [t.persian_name + suffix for t, suffix in zip(self.room_types, self.suffixes)]
+
+    def plan(self, i):
+        """Materializes lot i as a list of room dicts, like the scalar layout function."""
+        rooms = []
+        for slot, name in enumerate(self.names()):
+            if self.valid[i, slot]:
+                room_type = self.room_types[slot]
+                color = ROOM_COLORS["Bedroom"] if room_type.id in BEDROOM_TYPE_IDS else room_type.color
+                rooms.append({'name': name, 'rect': Rect(*self.rects[i, slot]), 'color': color, 'type': room_type.id})
+        # Plan 3 promotes the second bedroom when the master bedroom is rejected
+        if self.layout == "l_shape_living":
+            master = self.keys.index("Master Bedroom")
+            if not self.valid[i, master] and self.valid[i, master + 1]:
+                for room in rooms:
+                    if room['name'] == self.names()[master + 1]:
+                        room['name'] = ROOM_TYPES_BY_KEY["Master Bedroom"].persian_name
+        return rooms
+
+
+def _layout_simple_split(W, L, settings):
+    n = W.shape[0]
+    s = _Slots(n)
+    min_room, min_bath = settings['min_room_dim'], settings['min_bath_dim']
+    r = LAYOUT_RATIOS["simple_split"]
+    ok = _is_valid(W, L)
+    zero = np.zeros(n)
+
+    # Living area | private area
+    split_w_1 = W * r['living_w']
+    has_areas = ok & _split(W, split_w_1)
+    live_w, priv_x, priv_w = split_w_1, split_w_1, W - split_w_1
+
+    split_h_1 = L * r['living_h']
+    has_lk = has_areas & _split(L, split_h_1)
+    s.add("Living Room", (zero, zero, live_w, split_h_1), has_lk)
+    s.add("Kitchen", (zero, split_h_1, live_w, L - split_h_1), has_lk)
+
+    min_bedroom_size = min_room * 1.1
+    two_bedrooms = ~(L * r['bedrooms_h'] < min_bedroom_size * 1.5)
+    split_h_2 = L * r['bedrooms_h']
+    split_h_3 = L * r['hallway_h']
+    bath_y = split_h_2 + split_h_3
+    bath_h = L - split_h_2 - split_h_3
+
+    beds_ok = has_areas & _is_valid(priv_w, split_h_2)
+    split_w_2 = priv_w * r['bedroom_split']
+    has_beds = beds_ok & two_bedrooms & _split(priv_w, split_w_2)
+    s.add("Bedroom", (priv_x, zero, split_w_2, split_h_2), has_beds, suffix=" ۱")
+    s.add("Bedroom", (priv_x + split_w_2, zero, priv_w - split_w_2, split_h_2), has_beds, suffix=" ۲")
+    s.add("Master Bedroom", (priv_x, zero, priv_w, split_h_2), beds_ok & ~two_bedrooms)
+
+    s.add("Hallway/Corridor", (priv_x, split_h_2, priv_w, split_h_3), has_areas & (split_h_3 >= min_room * 0.5))
+
+    baths_ok = has_areas & _is_valid(priv_w, bath_h)
+    two_baths = priv_w * r['bath_split'] >= min_bath
+    split_w_3 = priv_w * r['bath_split']
+    has_baths = baths_ok & two_baths & _split(priv_w, split_w_3)
+    s.add("Bathroom", (priv_x, bath_y, split_w_3, bath_h), has_baths)
+    s.add("Balcony", (priv_x + split_w_3, bath_y, priv_w - split_w_3, bath_h), has_baths)
+    s.add("Bathroom", (priv_x, bath_y, priv_w, bath_h), baths_ok & ~two_baths)
+    return s
+
+
+def _layout_open_concept(W, L, settings):
+    n = W.shape[0]
+    s = _Slots(n)
+    min_room = settings['min_room_dim']
+    r = LAYOUT_RATIOS["open_concept"]
+    ok = _is_valid(W, L)
+    zero = np.zeros(n)
+
+    is_wide = W > L * 1.2
+    open_w = np.where(is_wide, W * r['open'], W)
+    open_h = np.where(is_wide, L, L * r['open'])
+    priv_x = np.where(is_wide, W * r['open'], 0.0)
+    priv_y = np.where(is_wide, 0.0, L * r['open'])
+    priv_w = np.where(is_wide, W - W * r['open'], W)
+    priv_h = np.where(is_wide, L, L - L * r['open'])
+
+    # Open area: kitchen + living (split across the short side)
+    open_big = ok & _is_valid(open_w, open_h, min_room * 0.8)
+    k_split = np.where(is_wide, open_h * r['kitchen'], open_w * r['kitchen'])
+    has_kl = open_big & _split(np.where(is_wide, open_h, open_w), k_split)
+    k_rect = (zero, zero, np.where(is_wide, open_w, k_split), np.where(is_wide, k_split, open_h))
+    l_rect = (np.where(is_wide, 0.0, k_split), np.where(is_wide, k_split, 0.0),
+              np.where(is_wide, open_w, open_w - k_split), np.where(is_wide, open_h - k_split, open_h))
+    s.add("Kitchen", k_rect, has_kl, suffix=" (باز)")
+    s.add("Living Room", l_rect, has_kl, suffix=" (باز)")
+    s.add("Unallocated", (zero, zero, open_w, open_h), ok & ~open_big & _is_valid(open_w, open_h), suffix=" (باز)")
+
+    # Private area: bedrooms | bathrooms
+    priv_big = ok & _is_valid(priv_w, priv_h, min_room)
+    p_split = np.where(is_wide, priv_h * r['bedrooms'], priv_w * r['bedrooms'])
+    has_bb = priv_big & _split(np.where(is_wide, priv_h, priv_w), p_split)
+    beds_x, beds_y = priv_x, priv_y
+    beds_w = np.where(is_wide, priv_w, p_split)
+    beds_h = np.where(is_wide, p_split, priv_h)
+    baths_x = np.where(is_wide, priv_x, priv_x + p_split)
+    baths_y = np.where(is_wide, priv_y + p_split, priv_y)
+    baths_w = np.where(is_wide, priv_w, priv_w - p_split)
+    baths_h = np.where(is_wide, priv_h - p_split, priv_h)
+
+    def hallway_split(x, y, w, h, ratio, hallway_key, hallway_suffix, first_key, first_suffix, second_key,
+                      second_suffix):
+        hallway_size = np.minimum(w * 0.15, min_room * 1.2)
+        cut = w - hallway_size
+        has_cut = has_bb & _split(w, cut)
+        s.add(hallway_key, (x + cut, y, w - cut, h), has_cut, suffix=hallway_suffix)
+        half = cut * ratio
+        has_pair = has_cut & _split(cut, half)
+        s.add(first_key, (x, y, half, h), has_pair, suffix=first_suffix)
+        s.add(second_key, (x + half, y, cut - half, h), has_pair, suffix=second_suffix)
+
+    hallway_split(beds_x, beds_y, beds_w, beds_h, r['bedroom_split'],
+                  "Hallway/Corridor", " اتاق‌ها", "Master Bedroom", "", "Bedroom", " ۲")
+    hallway_split(baths_x, baths_y, baths_w, baths_h, r['bath_split'],
+                  "Service Hallway", "", "Bathroom", "", "Balcony", "")
+    s.add("Unallocated", (priv_x, priv_y, priv_w, priv_h), ok & ~priv_big & _is_valid(priv_w, priv_h))
+    return s
+
+
+def _layout_l_shape_living(W, L, settings):
+    n = W.shape[0]
+    s = _Slots(n)
+    min_room = settings['min_room_dim']
+    r = LAYOUT_RATIOS["l_shape_living"]
+    ok = _is_valid(W, L)
+    zero = np.zeros(n)
+
+    hallway_w = np.minimum(1.0, W * 0.15)
+    public_h = L * r['public_h']
+    private_h = L - public_h
+    s.add("Living Room", (zero, zero, W, public_h), ok)
+    kitchen_w = np.maximum(min_room, W * r['kitchen_w'])
+    kitchen_h = np.maximum(min_room, public_h * r['kitchen_h'])
+    s.add("Kitchen", (zero, zero, kitchen_w, kitchen_h), ok)
+
+    hallway_h = private_h * r['hallway_h']
+    hallway_x = (W - hallway_w) / 2
+    s.add("Hallway/Corridor", (hallway_x, public_h, hallway_w, hallway_h), ok)
+
+    side_w = (W - hallway_w) / 2
+    bed_h = hallway_h * r['bed_h']
+    right_x = hallway_x + hallway_w
+    s.add("Master Bedroom", (zero, public_h, side_w, bed_h), ok)
+    s.add("Bedroom", (right_x, public_h, side_w, bed_h), ok, suffix=" ۲")
+
+    bath_y = public_h + bed_h
+    bath_h = private_h - bed_h
+    s.add("Bathroom", (zero, bath_y, side_w, bath_h), ok)
+    s.add("Balcony", (right_x, bath_y, side_w, bath_h), ok)
+    return s
+
+
+LAYOUTS = {
+    "simple_split": _layout_simple_split,
+    "open_concept": _layout_open_concept,
+    "l_shape_living": _layout_l_shape_living,
+}
+
+
+def _add_fallback(s, W, L, settings, layout):
+    """Appends the 'Unallocated' whole-house slot used when a recipe produced no valid room."""
+    probe = VectorLayout(layout, s, W, L, settings)
+    empty = ~probe.valid.any(axis=1)
+    if layout == "simple_split":
+        empty &= _is_valid(W, L)
+    if layout != "open_concept":
+        zero = np.zeros(W.shape[0])
+        s.add("Unallocated", (zero, zero, W, L), empty)
+    return s
+
+
+def evaluate_layouts(widths, lengths, settings, layouts=None):
+    """
+    Evaluates the layout recipes for every (width, length) pair.
+    `widths` and `lengths` are broadcast together and flattened; returns
+    {layout_name: VectorLayout}. `layouts` restricts which recipes are run.
+    """
+    W, L = np.broadcast_arrays(np.asarray(widths, dtype=np.float64), np.asarray(lengths, dtype=np.float64))
+    W, L = W.ravel(), L.ravel()
+    settings = compile_settings(settings)
+    results = {}
+    for name in (layouts or LAYOUTS):
+        slots = _add_fallback(LAYOUTS[name](W, L, settings), W, L, settings, name)
+        results[name] = VectorLayout(name, slots, W, L, settings)
+    return results
+
+
+def too_small_mask(widths, lengths, settings):
+    """Lots that generate_plans rejects outright (either side below 1.5 x min_room_dim)."""
+    W, L = np.broadcast_arrays(np.asarray(widths, dtype=np.float64), np.asarray(lengths, dtype=np.float64))
+    min_dim_req = settings['min_room_dim'] * 1.5
+    return ((W < min_dim_req) | (L < min_dim_req)).ravel()
+
+
+def evaluate_grid(widths, lengths, settings, layouts=None):
+    """
+    Evaluates every combination of `widths` x `lengths` (1-D arrays).
+    Returns (results, shape) where masks reshape to `shape` = (len(widths), len(lengths)).
+    """
+    widths = np.asarray(widths, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.float64)
+    W, L = np.meshgrid(widths, lengths, indexing="ij")
+    return evaluate_layouts(W, L, settings, layouts), W.shape
@@ -0,0 +1,68 @@
+"""The per-line sweep of plan_adjacency against brute-force shared-edge detection."""
+import itertools
+import random
+
+import pytest
+
+from plan_adjacency import MIN_SHARED_LENGTH, build_adjacency
+from plan_generator import Rect, generate_plans
+from plan_batch import DEFAULT_SETTINGS
+
+
+def _brute_force(plan):
+    """{(i, j): shared wall length} by comparing every pair of rooms on all four sides."""
+    rects = [(i, room['rect']) for i, room in enumerate(plan) if room['rect'].w > 0 and room['rect'].h > 0]
+    edges = {}
+    for (i, a), (j, b) in itertools.combinations(rects, 2):
+        length = 0.0
+        for a_line, b_line, lo, hi in (
+                (a.x + a.w, b.x, max(a.y, b.y), min(a.y + a.h, b.y + b.h)),
+                (b.x + b.w, a.x, max(a.y, b.y), min(a.y + a.h, b.y + b.h)),
+                (a.y + a.h, b.y, max(a.x, b.x), min(a.x + a.w, b.x + b.w)),
+                (b.y + b.h, a.y, max(a.x, b.x), min(a.x + a.w, b.x + b.w))):
+            if round(a_line, 6) == round(b_line, 6) and hi - lo > MIN_SHARED_LENGTH:
+                length += hi - lo
+        if length:
+            edges[(i, j)] = length
+    return edges
+
+
+def _random_rooms(rng, n, step):
+    """Rooms on a coarse grid, so many edges are collinear; rooms may overlap or coincide."""
+    def coord(k):
+        return rng.randint(0, k) * step
+    return [{'rect': Rect(coord(12), coord(12), coord(5) + step, coord(5) + step)} for _ in range(n)]
+
+
+def _assert_same_edges(graph, expected):
+    assert graph.edges.keys() == expected.keys()
+    for key, length in expected.items():
+        assert graph.edges[key] == pytest.approx(length), key
+
+
+@pytest.mark.parametrize("seed", range(15))
+@pytest.mark.parametrize("n", [2, 12, 60, 150])
+@pytest.mark.parametrize("step", [1.0, 0.3], ids=["metre", "fraction"])
+def test_build_adjacency_matches_brute_force(seed, n, step):
+    rooms = _random_rooms(random.Random(seed), n, step)
+    _assert_same_edges(build_adjacency(rooms), _brute_force(rooms))
+
+
+def test_corridor_with_many_open_edges():
+    # Long edges overlapping along one line, next to a corridor, next to a stack of short rooms
+    n = 50
+    rooms = [{'rect': Rect(0, i, 5, 1)} for i in range(n)]
+    rooms.append({'rect': Rect(5, 0, 1, n)})
+    rooms += [{'rect': Rect(6, i * 0.25, 3, n - i * 0.25)} for i in range(n)]
+    _assert_same_edges(build_adjacency(rooms), _brute_force(rooms))
+
+
+def test_corner_contact_is_not_adjacency():
+    rooms = [{'rect': Rect(0, 0, 2, 2)}, {'rect': Rect(2, 2, 2, 2)}, {'rect': Rect(2, 0, 2, 2)}]
+    assert build_adjacency(rooms).edges == {(0, 2): 2.0, (1, 2): 2.0}
+
+
+def test_generated_plans_match_brute_force():
+    for width, length in [(8, 9), (10, 12), (12, 15), (20, 25)]:
+        for plan in generate_plans(width, length, DEFAULT_SETTINGS):
+            _assert_same_edges(build_adjacency(plan), _brute_force(plan))
@@ -0,0 +1,81 @@
+"""Round trip of plans through plan_archive (write_archive, then PlanArchive[n])."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from plan_archive import PlanArchive, write_archive
+from plan_batch import DEFAULT_SETTINGS
+from plan_generator import Plan, Rect, RoomTable, generate_plans
+
+
+def _float32(value):
+    return float(np.float32(value))
+
+
+def _assert_same_rooms(read, written):
+    assert len(read) == len(written)
+    for got, room in zip(read, written):
+        assert got['name'] == room['name']
+        assert got['color'] == (room.get('color') or "")
+        assert got.get('type') == room.get('type')
+        for attr in ('x', 'y', 'w', 'h'):
+            value = getattr(room['rect'], attr)
+            assert getattr(got['rect'], attr) == _float32(value) # Stored as float32 ...
+            assert getattr(got['rect'], attr) == pytest.approx(value, rel=1e-6, abs=1e-6) # ... within its precision
+
+
+@pytest.fixture
+def plans():
+    dict_plans = generate_plans(10.37, 14.91, DEFAULT_SETTINGS)
+    table_plans = generate_plans(23.13, 7.77, DEFAULT_SETTINGS, table=True)
+    untyped = Plan([{'name': "انبار", 'rect': Rect(0.1, 0.2, 1.234567, 2.345678), 'color': "#D5DBDB"},
+                    {'name': "custom room", 'rect': Rect(1.3345678, 0.2, 3, 2)}]) # No 'type', no color
+    return [(0, plan) for plan in dict_plans] + [(1, plan) for plan in table_plans] + [(7, untyped)]
+
+
+def test_round_trip(tmp_path, plans):
+    path = str(tmp_path / "plans.hpa")
+    assert write_archive(path, plans) == len(plans)
+    with PlanArchive(path) as archive:
+        assert len(archive) == len(plans)
+        for n, (lot, plan) in enumerate(plans):
+            read = archive[n]
+            assert isinstance(read, Plan)
+            assert read.layout == plan.layout == archive.layout(n)
+            assert read.size == plan.size
+            assert int(archive.index[n]['lot']) == lot
+            _assert_same_rooms(read, list(plan))
+        assert archive.lot_plans(1).tolist() == [n for n, (lot, _) in enumerate(plans) if lot == 1]
+        assert archive[-1].size is None and archive[-1].layout is None
+        assert 'type' not in archive[-1][0]
+
+
+def test_table_and_dict_plans_store_the_same_records(tmp_path):
+    plans = generate_plans(12.0, 15.0, DEFAULT_SETTINGS)
+    tables = [RoomTable(plan) for plan in plans]
+    write_archive(str(tmp_path / "dicts.hpa"), plans)
+    write_archive(str(tmp_path / "tables.hpa"), tables)
+    with PlanArchive(str(tmp_path / "dicts.hpa")) as dicts, PlanArchive(str(tmp_path / "tables.hpa")) as from_tables:
+        assert dicts.rooms.tobytes() == from_tables.rooms.tobytes()
+        assert dicts.index.tobytes() == from_tables.index.tobytes()
+        assert dicts.strings == from_tables.strings
+
+
+def test_coords_view_and_close(tmp_path, plans):
+    path = str(tmp_path / "plans.hpa")
+    write_archive(path, plans)
+    archive = PlanArchive(path)
+    first = list(plans[0][1])[0]['rect']
+    assert archive.coords[0].tolist() == [_float32(v) for v in (first.x, first.y, first.w, first.h)]
+    assert archive.plan_rooms(0)['x'][0] == archive.coords[0, 0]
+    assert "plans" in repr(archive)
+    archive.close()
+    assert "closed" in repr(archive)
+    archive.close() # Closing twice is harmless
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not-an-archive.hpa"
+    path.write_bytes(b"x" * 100)
+    with pytest.raises(ValueError):
+        PlanArchive(str(path))
@@ -0,0 +1,50 @@
+"""The sweep-line overlap search of plan_integrity against a brute-force pairwise check."""
+import itertools
+import random
+
+import pytest
+
+from plan_generator import Rect, generate_plans
+from plan_batch import DEFAULT_SETTINGS
+from plan_integrity import PAIRWISE_MAX_ROOMS, _overlap, _room_rects, check_plan_integrity, find_overlaps
+
+
+def _brute_force(rects):
+    return sorted(filter(None, (_overlap(a, b) for a, b in itertools.combinations(rects, 2))))
+
+
+def _random_rooms(rng, n, grid):
+    """Rooms with float coordinates, or with small integer ones (shared edges, touching and identical rooms)."""
+    if grid:
+        return [{'rect': Rect(rng.randint(0, 10), rng.randint(0, 10), rng.randint(1, 4), rng.randint(1, 4))}
+                for _ in range(n)]
+    rooms = [{'rect': Rect(rng.uniform(0, 30), rng.uniform(0, 30), rng.uniform(0.1, 6), rng.uniform(0.1, 6))}
+             for _ in range(n)]
+    rooms.append({'rect': Rect(5, 0, 2, 30)}) # A tall room meeting many others
+    return rooms
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("n", [PAIRWISE_MAX_ROOMS + 1, 60, 250])
+@pytest.mark.parametrize("grid", [False, True], ids=["float", "grid"])
+def test_find_overlaps_matches_brute_force(seed, n, grid):
+    rects = _room_rects(_random_rooms(random.Random(seed), n, grid))
+    assert find_overlaps(rects) == _brute_force(rects)
+
+
+def test_overlap_predicate():
+    touching = _room_rects([{'rect': Rect(0, 0, 2, 2)}, {'rect': Rect(2, 0, 2, 2)}])
+    assert _overlap(*touching) is None
+    sliver = _room_rects([{'rect': Rect(0, 0, 2, 2)}, {'rect': Rect(1.9999999, 0, 2, 2)}])
+    assert _overlap(*sliver) is None # Below AREA_TOLERANCE
+    i, j, area, nested = _overlap(*_room_rects([{'rect': Rect(0, 0, 4, 4)}, {'rect': Rect(1, 1, 2, 2)}]))
+    assert (i, j, nested) == (0, 1, True) and area == pytest.approx(4.0)
+    i, j, area, nested = _overlap(*_room_rects([{'rect': Rect(0, 0, 2, 2)}, {'rect': Rect(1, 1, 2, 2)}]))
+    assert (i, j, nested) == (0, 1, False) and area == pytest.approx(1.0)
+
+
+def test_generated_plans_match_brute_force():
+    for width, length in [(8, 9), (10, 12), (12, 15), (20, 25)]:
+        for plan in generate_plans(width, length, DEFAULT_SETTINGS):
+            rects = _room_rects(plan)
+            assert check_plan_integrity(plan, width, length).overlaps == _brute_force(rects)
@@ -0,0 +1,48 @@
+"""The NumPy layout engine (plan_vectorized) against the scalar layout recipes."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from plan_batch import DEFAULT_SETTINGS
+from plan_generator import LAYOUT_FUNCTIONS, LAYOUT_NAMES
+from plan_vectorized import LAYOUTS, evaluate_grid, evaluate_layouts
+
+STRICT_SETTINGS = dict(DEFAULT_SETTINGS, min_room_dim=3.2, min_bath_dim=2.2, min_stor_balc_dim=1.54,
+                       aspect_ratio_limit=2.0)
+
+
+def _rooms(plan):
+    return [(room['name'], room['color'], room.get('type'), room['rect'].x, room['rect'].y, room['rect'].w,
+             room['rect'].h) for room in plan]
+
+
+def _lots():
+    """A regular grid over typical lot sizes plus random lots, including some below the minimum."""
+    axis = np.arange(2.0, 24.01, 0.5)
+    W, L = np.meshgrid(axis, axis, indexing="ij")
+    random_lots = np.random.default_rng(0).uniform(0.5, 30, (2, 300))
+    return np.concatenate([W.ravel(), random_lots[0]]), np.concatenate([L.ravel(), random_lots[1]])
+
+
+def test_layouts_cover_the_scalar_recipes():
+    assert list(LAYOUTS) == LAYOUT_NAMES
+
+
+@pytest.mark.parametrize("settings", [DEFAULT_SETTINGS, STRICT_SETTINGS], ids=["default", "strict"])
+def test_layouts_match_scalar_recipes(settings):
+    widths, lengths = _lots()
+    results = evaluate_layouts(widths, lengths, settings)
+    for name, layout_function in zip(LAYOUT_NAMES, LAYOUT_FUNCTIONS):
+        layout = results[name]
+        for i, (width, length) in enumerate(zip(widths.tolist(), lengths.tolist())):
+            expected = _rooms(layout_function(width, length, settings))
+            assert _rooms(layout.plan(i)) == expected, (name, width, length)
+            assert layout.room_count[i] == len(expected)
+
+
+def test_evaluate_grid_shape():
+    widths, lengths = np.array([8.0, 10.0, 12.0]), np.array([9.0, 15.0])
+    results, shape = evaluate_grid(widths, lengths, DEFAULT_SETTINGS)
+    assert shape == (3, 2)
+    layout = results["simple_split"]
+    assert _rooms(layout.plan(3)) == _rooms(LAYOUT_FUNCTIONS[0](10.0, 15.0, DEFAULT_SETTINGS))